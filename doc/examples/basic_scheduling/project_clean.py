@@ -1,7 +1,5 @@
-import yaml
-import shutil
-from automatic_university_scheduler.utils import Messages
+# Equivalent to `aus clean`
+from automatic_university_scheduler.pipeline import clean_pipeline
 
-db_info = yaml.safe_load(open("setup.yaml"))
-shutil.rmtree(db_info["output_dir"], ignore_errors=True)
-print(f"Output directory removed => {Messages.SUCCESS}")
+if __name__ == "__main__":
+    clean_pipeline()
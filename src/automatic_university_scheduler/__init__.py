@@ -1,10 +1,42 @@
-from . import (
-    datetimeutils,
-    scheduling,
-    validation,
-    utils,
-    preprocessing,
-    postprocessing,
-    optimize,
-    database,
-)
+import importlib
+
+# Submodules are imported on first access (PEP 562): `import
+# automatic_university_scheduler.database` does not pull in the solver, and
+# `automatic_university_scheduler.optimize` still works as an attribute.
+__all__ = [
+    "datetimeutils",
+    "scheduling",
+    "validation",
+    "utils",
+    "preprocessing",
+    "postprocessing",
+    "optimize",
+    "multiresolution",
+    "greedy",
+    "database",
+    "feasibility",
+    "propagation",
+    "telemetry",
+    "snapshot",
+    "slot_calendar",
+    "extraction",
+    "timetables",
+    "graph_analysis",
+    "graph_rendering",
+    "validation_emails",
+    "model_schema",
+    "model_directory",
+    "pipeline",
+    "cli",
+    "benchmarks",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,4 @@
+import sys
+from automatic_university_scheduler.cli import main
+
+sys.exit(main())
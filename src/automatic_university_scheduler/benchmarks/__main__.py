@@ -0,0 +1,66 @@
+import argparse
+import sys
+from automatic_university_scheduler.benchmarks.harness import (
+    SIZES,
+    run_benchmarks,
+    read_results,
+    compare_results,
+    write_results,
+)
+from automatic_university_scheduler.benchmarks.startup import measure_startup
+from automatic_university_scheduler.utils import Messages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m automatic_university_scheduler.benchmarks",
+        description="Runs the scheduling benchmarks on synthetic instances.",
+    )
+    parser.add_argument(
+        "sizes",
+        nargs="*",
+        metavar="SIZE",
+        help=f"one of {', '.join(SIZES)} (default: small)",
+    )
+    parser.add_argument("-o", "--output", default="benchmarks.jsonl")
+    parser.add_argument("-t", "--time-limit", type=float, default=10.0)
+    parser.add_argument("-w", "--workers", type=int, default=8)
+    parser.add_argument("-s", "--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("-b", "--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="measures the import time of the package entry points instead",
+    )
+    args = parser.parse_args(argv)
+    # Checked here: argparse rejects an empty list of `choices` with nargs="*"
+    for size in args.sizes:
+        if size not in SIZES:
+            parser.error(f"invalid size {size!r} (choose from {', '.join(SIZES)})")
+
+    if args.startup:
+        write_results(measure_startup(), args.output)
+        return 0
+
+    results = run_benchmarks(
+        {size: SIZES[size] for size in args.sizes or ["small"]},
+        output=args.output,
+        time_limit=args.time_limit,
+        num_workers=args.workers,
+        seeds=args.seeds,
+    )
+    if args.baseline is not None:
+        regressions = compare_results(
+            read_results(args.baseline), results, tolerance=args.tolerance
+        )
+        if len(regressions) > 0:
+            print(f"REGRESSIONS => {Messages.ERROR}")
+            print(regressions.to_string(index=False))
+            return 1
+        print(f"NO REGRESSION => {Messages.SUCCESS}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import datetime
+import numpy as np
+import pandas as pd
+from automatic_university_scheduler.preprocessing import USMB_SLOT_STRING_KEY
+
+WEEKDAYS_FR = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+
+ACTIVITY_KINDS = {
+    "CM": {"duration": 6, "allowed_start_time_slots": [33, 40, 53, 60, 67]},
+    "TD": {"duration": 6, "allowed_start_time_slots": [33, 40, 53, 60, 67]},
+    "TP": {"duration": 16, "allowed_start_time_slots": [32, 53, 57]},
+}
+
+
+def _day_string(open_from, open_to, time_slots_per_day=96):
+    return "".join(
+        "1" if open_from <= i < open_to else "0" for i in range(time_slots_per_day)
+    )
+
+
+def _iso_str(date, time="08:00"):
+    year, week, weekday = date.isocalendar()
+    return f"{year}-W{week:02}-{weekday} {time}"
+
+
+def generate_model(
+    n_courses=4,
+    sessions_per_course=6,
+    n_atomic_students=8,
+    n_promotions=1,
+    td_group_size=4,
+    tp_group_size=2,
+    n_teachers=4,
+    teachers_per_course=2,
+    n_room_pools=2,
+    rooms_per_pool=2,
+    precedence_density=0.5,
+    teacher_unavailability=0.5,
+    n_imported=0,
+    weeks=4,
+    origin="2024-W36-1 08:00",
+    seed=0,
+):
+    """
+    Generates a synthetic scheduling instance.
+
+    Parameters:
+    n_courses (int): The number of courses.
+    sessions_per_course (int): The number of sessions (CM, TD or TP) per course.
+    n_atomic_students (int): The number of atomic students.
+    n_promotions (int): The number of promotions the atomic students are split in.
+    td_group_size (int): The number of atomic students per TD group.
+    tp_group_size (int): The number of atomic students per TP group.
+    n_teachers (int): The number of teachers.
+    teachers_per_course (int): The number of teachers in the pool of each course.
+    n_room_pools (int): The number of room pools used by TD and TP sessions.
+    rooms_per_pool (int): The number of rooms in each pool.
+    precedence_density (float): The probability that a session starts after the
+                                previous one, decreasing with the distance for
+                                earlier sessions.
+    teacher_unavailability (float): The probability that a teacher has a weekly
+                                    unavailable half day.
+    n_imported (int): The number of imported static activities.
+    weeks (int): The number of weeks between the origin and the horizon.
+    origin (str): The origin datetime, a Monday.
+    seed (int): The random seed.
+
+    Returns:
+    tuple: The model, as read from a model.yaml file, and the imported static
+    activities as a USMB formatted DataFrame.
+    """
+    rng = np.random.default_rng(seed)
+    origin_date = datetime.datetime.strptime(origin[:10] + " 08:00", "%G-W%V-%u %H:%M")
+    horizon_date = origin_date + datetime.timedelta(weeks=weeks - 1, days=4)
+
+    week_structure = [_day_string(32, 76)] * 5 + [_day_string(0, 0)] * 2
+    setup = {
+        "origin_datetime": origin,
+        "horizon_datetime": _iso_str(horizon_date, "19:00"),
+        "week_structure": week_structure,
+        "activity_kinds": {
+            kind: {"allowed_start_time_slots": data["allowed_start_time_slots"]}
+            for kind, data in ACTIVITY_KINDS.items()
+        },
+        "succession_constraint_relaxation_factor": 1.0,
+    }
+
+    # STUDENTS
+    atomic_students = [f"S{i:04}" for i in range(n_atomic_students)]
+    promotions = {}
+    groups = {}
+    for p, students in enumerate(np.array_split(atomic_students, n_promotions)):
+        students = students.tolist()
+        promotion = f"P{p}"
+        groups[promotion] = students
+        td_groups = []
+        for k in range(0, len(students), td_group_size):
+            td_groups.append(f"{promotion}-TD{k // td_group_size}")
+            groups[td_groups[-1]] = students[k : k + td_group_size]
+        tp_groups = []
+        for k in range(0, len(students), tp_group_size):
+            tp_groups.append(f"{promotion}-TP{k // tp_group_size}")
+            groups[tp_groups[-1]] = students[k : k + tp_group_size]
+        promotions[promotion] = {"TD": td_groups, "TP": tp_groups}
+
+    # TEACHERS
+    teachers = {}
+    for i in range(n_teachers):
+        label = f"T{i:03}"
+        teachers[label] = {
+            "full_name": f"TEACHER {i:03}",
+            "email": f"teacher.{i:03}@example.com",
+        }
+        if rng.random() < teacher_unavailability:
+            day = origin_date + datetime.timedelta(days=int(rng.integers(0, 5)))
+            start, end = (
+                ("08:00", "12:00") if rng.random() < 0.5 else ("14:00", "18:00")
+            )
+            teachers[label]["unavailable"] = [
+                {
+                    "kind": "datetime",
+                    "start": _iso_str(day, start),
+                    "end": _iso_str(day, end),
+                    "repeat": weeks,
+                    "offset": "1w",
+                }
+            ]
+    teachers_labels = list(teachers)
+
+    # ROOMS
+    room_pools = {"room_amphi": [f"AMPHI{i}" for i in range(n_promotions)]}
+    for p in range(n_room_pools):
+        room_pools[f"room_pool{p}"] = [f"R{p:02}-{r:02}" for r in range(rooms_per_pool)]
+    pools_labels = [label for label in room_pools if label != "room_amphi"]
+
+    # COURSES
+    courses = {}
+    for c in range(n_courses):
+        promotion = list(promotions)[c % n_promotions]
+        course_teachers = rng.choice(
+            teachers_labels, size=min(teachers_per_course, n_teachers), replace=False
+        ).tolist()
+        activities = {}
+        inner_activity_groups = {}
+        constraints = []
+        for s in range(sessions_per_course):
+            kind = str(rng.choice(list(ACTIVITY_KINDS), p=[0.3, 0.4, 0.3]))
+            session = f"{kind}{s}"
+            if kind == "CM":
+                targets = [(session, promotion, "room_amphi", course_teachers[:1])]
+            else:
+                pool = str(rng.choice(pools_labels))
+                targets = [
+                    (f"{session}-{k}", group, pool, course_teachers)
+                    for k, group in enumerate(promotions[promotion][kind])
+                ]
+            for label, students, pool, pool_teachers in targets:
+                activities[label] = {
+                    "kind": kind,
+                    "duration": ACTIVITY_KINDS[kind]["duration"],
+                    "teachers": {"pool": pool_teachers, "count": 1},
+                    "rooms": {"pool": pool, "count": 1},
+                    "students": students,
+                }
+            inner_activity_groups[session] = [label for label, *_ in targets]
+            sessions = list(inner_activity_groups)
+            for previous in range(s):
+                density = precedence_density / (s - previous)
+                if rng.random() < density:
+                    constraints.append(
+                        {
+                            "kind": "succession",
+                            "activities": [session],
+                            "start_after": [sessions[previous]],
+                            "min_offset": str(rng.choice(["15m", "1d"])),
+                            "max_offset": "2w" if rng.random() < 0.2 else None,
+                        }
+                    )
+        courses[f"C{c:03}"] = {
+            "manager": "M0",
+            "planner": "P0",
+            "color": "blue",
+            "activities": activities,
+            "inner_activity_groups": inner_activity_groups,
+            "constraints": constraints,
+        }
+
+    model = {
+        "setup": setup,
+        "aliases": {"room_pools": room_pools},
+        "students": {"groups": groups, "constraints": {}},
+        "teachers": teachers,
+        "managers": {"M0": {"full_name": "MANAGER 0", "email": "m0@example.com"}},
+        "planners": {"P0": {"full_name": "PLANNER 0", "email": "p0@example.com"}},
+        "courses": courses,
+    }
+    rooms = [room for pool in room_pools.values() for room in pool]
+    imported = generate_imported_activities(
+        n_imported,
+        origin_date,
+        weeks,
+        rooms=rooms,
+        teachers=[t["full_name"] for t in teachers.values()],
+        students_groups=list(groups),
+        rng=rng,
+    )
+    return model, imported
+
+
+def generate_imported_activities(
+    n_imported, origin_date, weeks, rooms, teachers, students_groups, rng=None
+):
+    """
+    Generates static activities as found in a USMB (ADE) extraction, involving
+    random rooms, teachers and students groups of the project along with
+    untracked ones.
+    """
+    if rng is None:
+        rng = np.random.default_rng(0)
+    rows = []
+    for i in range(n_imported):
+        day = origin_date + datetime.timedelta(
+            weeks=int(rng.integers(0, weeks)), days=int(rng.integers(0, 5))
+        )
+        year, week, weekday = day.isocalendar()
+        start = int(rng.integers(32, 68))
+        duration = int(rng.choice([4, 6, 8, 16]))
+        duration = min(duration, 76 - start)
+        slots = "0" * start + "1" * duration + "0" * (96 - start - duration)
+        room = str(rng.choice(rooms)) if rng.random() < 0.7 else "UNTRACKED-ROOM"
+        teacher = str(rng.choice(teachers)) if rng.random() < 0.5 else "UNKNOWN TEACHER"
+        group = str(rng.choice(students_groups)) if rng.random() < 0.5 else ""
+        rows.append(
+            {
+                "Année": year,
+                "Semaine": week,
+                "Jour": WEEKDAYS_FR[weekday - 1],
+                USMB_SLOT_STRING_KEY: slots,
+                "Liste des salles": room,
+                "Nom des groupes étudiants": group,
+                "_Bloc Liste Enseignants (étape 4)": teacher,
+                "Composantes groupes étudiants": "POLYTECH Annecy",
+                "Libellé Activité": f"IMPORTED {i:04}",
+            }
+        )
+    columns = [
+        "Année",
+        "Semaine",
+        "Jour",
+        USMB_SLOT_STRING_KEY,
+        "Liste des salles",
+        "Nom des groupes étudiants",
+        "_Bloc Liste Enseignants (étape 4)",
+        "Composantes groupes étudiants",
+        "Libellé Activité",
+    ]
+    return pd.DataFrame(rows, columns=columns)
@@ -0,0 +1,285 @@
+import json
+import os
+import platform
+import time
+import pandas as pd
+from ortools.sat.python import cp_model
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from automatic_university_scheduler.benchmarks.generator import generate_model
+from automatic_university_scheduler.database import (
+    Base,
+    StaticActivity,
+    load_project,
+)
+from automatic_university_scheduler.optimize import build_model
+from automatic_university_scheduler.preprocessing import (
+    create_project,
+    extract_constraints_from_table,
+)
+from automatic_university_scheduler.telemetry import model_size
+from automatic_university_scheduler.utils import create_instance, create_directory
+
+# Instance sizes, as keyword arguments of generate_model
+SIZES = {
+    "tiny": dict(
+        n_courses=2,
+        sessions_per_course=4,
+        n_atomic_students=4,
+        td_group_size=2,
+        tp_group_size=2,
+        n_teachers=2,
+        n_room_pools=1,
+        rooms_per_pool=2,
+        n_imported=10,
+        weeks=2,
+    ),
+    "small": dict(
+        n_courses=6,
+        sessions_per_course=8,
+        n_atomic_students=8,
+        n_promotions=2,
+        td_group_size=4,
+        tp_group_size=2,
+        n_teachers=8,
+        n_room_pools=2,
+        rooms_per_pool=3,
+        n_imported=50,
+        weeks=6,
+    ),
+    "medium": dict(
+        n_courses=16,
+        sessions_per_course=12,
+        n_atomic_students=24,
+        n_promotions=3,
+        td_group_size=4,
+        tp_group_size=2,
+        n_teachers=20,
+        n_room_pools=4,
+        rooms_per_pool=4,
+        n_imported=300,
+        weeks=10,
+    ),
+    "large": dict(
+        n_courses=40,
+        sessions_per_course=16,
+        n_atomic_students=48,
+        n_promotions=4,
+        td_group_size=6,
+        tp_group_size=3,
+        n_teachers=50,
+        n_room_pools=6,
+        rooms_per_pool=6,
+        n_imported=1500,
+        weeks=15,
+    ),
+}
+
+# Columns compared by compare_results, lower is better
+TIMING_COLUMNS = [
+    "load_time",
+    "extract_time",
+    "fetch_time",
+    "build_time",
+    "first_solution_time",
+]
+
+
+class FirstSolutionTimer(cp_model.CpSolverSolutionCallback):
+    """
+    Records the wall time and objective of each solution found by the solver.
+    """
+
+    def __init__(self):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.solutions = []
+
+    def on_solution_callback(self):
+        self.solutions.append((self.WallTime(), self.ObjectiveValue()))
+
+
+def run_instance(
+    name="instance",
+    time_limit=10.0,
+    num_workers=8,
+    seed=0,
+    telemetry=None,
+    **params,
+):
+    """
+    Generates an instance and times its whole pipeline: loading the model into an
+    in-memory database, importing the static activities, fetching the project
+    with the solve loader profile, building the CP model and solving it for
+    `time_limit` seconds.
+
+    Returns:
+    dict: The instance parameters, the sizes of the project and the model, the
+    duration of each step, the time to the first solution and the objective,
+    bound and status reached within the time limit.
+    """
+    result = {"instance": name, "seed": seed, "time_limit": time_limit, **params}
+
+    t0 = time.perf_counter()
+    model_data, imported = generate_model(seed=seed, **params)
+    result["generate_time"] = time.perf_counter() - t0
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+
+    t0 = time.perf_counter()
+    project = create_project(session, model_data, label=name)
+    result["load_time"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    _, _, static_activities_kwargs = extract_constraints_from_table(imported, project)
+    for kwargs in static_activities_kwargs:
+        create_instance(session, StaticActivity, **kwargs)
+    session.commit()
+    result["extract_time"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    project = load_project(session, profile="solve", label=name)
+    result["fetch_time"] = time.perf_counter() - t0
+
+    result["activities"] = len(project.activities)
+    result["static_activities"] = len(project.static_activities)
+    result["starts_after_constraints"] = len(project.starts_after_constraints)
+
+    t0 = time.perf_counter()
+    model, variables = build_model(project, telemetry=telemetry)
+    result["build_time"] = time.perf_counter() - t0
+    result.update(model_size(model))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = num_workers
+    solver.parameters.random_seed = seed
+    if telemetry is not None:
+        telemetry.attach(solver, keep_log=False)
+    timer = FirstSolutionTimer()
+    status = solver.Solve(model, timer)
+    if telemetry is not None:
+        telemetry.status(solver, status)
+    result["status"] = solver.StatusName(status)
+    result["solve_time"] = solver.WallTime()
+    result["solutions"] = len(timer.solutions)
+    if len(timer.solutions) > 0:
+        result["first_solution_time"] = timer.solutions[0][0]
+        result["objective"] = solver.ObjectiveValue()
+        result["bound"] = solver.BestObjectiveBound()
+    else:
+        result["first_solution_time"] = None
+        result["objective"] = None
+        result["bound"] = None
+    session.close()
+    engine.dispose()
+    return result
+
+
+def run_benchmarks(
+    instances,
+    output=None,
+    time_limit=10.0,
+    num_workers=8,
+    seeds=(0,),
+    verbose=True,
+):
+    """
+    Runs `run_instance` on several instances and seeds.
+
+    Parameters:
+    instances (dict): The instances parameters (see `generate_model`) by name.
+    output (str): Path of the results file, JSON lines (.jsonl) or CSV (.csv).
+    time_limit (float): The solver time limit in seconds.
+    num_workers (int): The number of solver workers.
+    seeds (iterable): The random seeds of each instance.
+    verbose (bool): Prints a summary of each run.
+
+    Returns:
+    pd.DataFrame: One row per run.
+    """
+    results = []
+    for name, params in instances.items():
+        for seed in seeds:
+            result = run_instance(
+                name=name,
+                time_limit=time_limit,
+                num_workers=num_workers,
+                seed=seed,
+                **params,
+            )
+            result["python"] = platform.python_version()
+            results.append(result)
+            if verbose:
+                print(
+                    f"{name} (seed={seed}): {result['activities']} activities, "
+                    f"load {result['load_time']:.2f}s, build {result['build_time']:.2f}s, "
+                    f"first solution {result['first_solution_time']}, "
+                    f"{result['status']} {result['objective']}"
+                )
+    results = pd.DataFrame(results)
+    if output is not None:
+        write_results(results, output)
+    return results
+
+
+def write_results(results, path):
+    """
+    Writes benchmark results as JSON lines or CSV depending on the extension of
+    `path`.
+    """
+    directory = os.path.dirname(path)
+    if directory != "":
+        create_directory(directory)
+    if path.endswith(".csv"):
+        results.to_csv(path, index=False)
+    else:
+        with open(path, "w") as f:
+            for record in results.to_dict(orient="records"):
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+def read_results(path):
+    """
+    Reads benchmark results written by `write_results`.
+    """
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_json(path, lines=True)
+
+
+def compare_results(baseline, results, tolerance=0.25, min_time=0.05):
+    """
+    Compares benchmark results with a baseline, run by run (instance and seed).
+
+    A timing is a regression when it exceeds the baseline by more than
+    `tolerance` (relative) and `min_time` seconds, and an objective when it is
+    worse than the baseline one or missing.
+
+    Returns:
+    pd.DataFrame: The regressions with the instance, seed, metric, baseline and
+    current values.
+    """
+    keys = ["instance", "seed"]
+    merged = results.merge(baseline, on=keys, suffixes=("", "_baseline"))
+    regressions = []
+    for _, row in merged.iterrows():
+        for column in TIMING_COLUMNS:
+            current, reference = row[column], row[f"{column}_baseline"]
+            if pd.isna(reference):
+                continue
+            if pd.isna(current) or (
+                current > reference * (1 + tolerance) and current - reference > min_time
+            ):
+                regressions.append(
+                    (row["instance"], row["seed"], column, reference, current)
+                )
+        current, reference = row["objective"], row["objective_baseline"]
+        if not pd.isna(reference) and (pd.isna(current) or current > reference):
+            regressions.append(
+                (row["instance"], row["seed"], "objective", reference, current)
+            )
+    return pd.DataFrame(
+        regressions, columns=["instance", "seed", "metric", "baseline", "current"]
+    )
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+import pandas as pd
+
+# Entry points of the scripts and jobs whose import time matters
+STARTUP_MODULES = [
+    "automatic_university_scheduler",
+    "automatic_university_scheduler.datetimeutils",
+    "automatic_university_scheduler.database",
+    "automatic_university_scheduler.preprocessing",
+    "automatic_university_scheduler.postprocessing",
+    "automatic_university_scheduler.timetables",
+    "automatic_university_scheduler.validation",
+    "automatic_university_scheduler.optimize",
+]
+
+# Third party packages that are slow to import
+HEAVY_MODULES = ["ortools", "scipy", "mermaid", "pandas", "networkx", "sqlalchemy"]
+
+_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def measure_import(module, repeat=5, python=sys.executable):
+    """
+    Measures the import time of a module in fresh interpreters.
+
+    Returns:
+    tuple: The best import time in seconds over `repeat` runs and the list of the
+    HEAVY_MODULES it loaded.
+    """
+    times = []
+    heavy = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [python, "-c", _SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        times.append(float(output[0]))
+        heavy = output[1].split(",") if len(output) > 1 else []
+    return min(times), heavy
+
+
+def measure_startup(modules=STARTUP_MODULES, repeat=5, verbose=True):
+    """
+    Measures the import time of the package entry points (see `measure_import`).
+
+    Returns:
+    pd.DataFrame: One row per module with its `import_time` (seconds) and the
+    `heavy_modules` it loads.
+    """
+    results = []
+    for module in modules:
+        import_time, heavy = measure_import(module, repeat=repeat)
+        results.append(
+            {
+                "module": module,
+                "import_time": import_time,
+                "heavy_modules": ", ".join(heavy),
+            }
+        )
+        if verbose:
+            print(f"{module}: {import_time:.3f}s ({', '.join(heavy)})")
+    return pd.DataFrame(results)
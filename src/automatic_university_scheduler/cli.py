@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+
+
+def main(argv=None):
+    """
+    Command line entry point (`aus`): runs the scheduling pipeline of a project
+    directory holding a setup.yaml and a model.yaml.
+    """
+    parser = argparse.ArgumentParser(
+        prog="aus",
+        description="Runs the automatic university scheduling pipeline.",
+    )
+    parser.add_argument(
+        "-C",
+        "--directory",
+        default=".",
+        help="project directory (default: current directory)",
+    )
+    parser.add_argument("--setup", default="setup.yaml", help="setup file")
+    parser.add_argument("--model", default="model.yaml", help="model file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser(
+        "run", help="brings stages (default: all) and their dependencies up to date"
+    )
+    run.add_argument("stages", nargs="*", metavar="STAGE")
+    run.add_argument(
+        "-f",
+        "--force",
+        nargs="*",
+        default=None,
+        metavar="STAGE",
+        help="reruns the given stages (all the selected ones if none is given)",
+    )
+    run.add_argument(
+        "-n", "--dry-run", action="store_true", help="only shows what would run"
+    )
+    commands.add_parser("status", help="shows which stages are out of date")
+    commands.add_parser("clean", help="removes the outputs and the pipeline state")
+    commands.add_parser("stages", help="lists the stages and their dependencies")
+    args = parser.parse_args(argv)
+
+    # Imported here to keep `aus --help` fast
+    from automatic_university_scheduler.pipeline import (
+        PIPELINE_STAGES,
+        clean_pipeline,
+        run_pipeline,
+        stages_order,
+    )
+
+    os.chdir(args.directory)
+    if args.command == "clean":
+        clean_pipeline(setup_file=args.setup)
+        return 0
+    if args.command == "stages":
+        for name in stages_order(PIPELINE_STAGES):
+            depends = ", ".join(PIPELINE_STAGES[name].depends)
+            print(f"{name}" + (f" (after {depends})" if depends != "" else ""))
+        return 0
+    stages = None
+    force = ()
+    dry_run = args.command == "status"
+    if args.command == "run":
+        stages = args.stages if len(args.stages) > 0 else None
+        dry_run = args.dry_run
+        if args.force is not None:
+            force = (
+                args.force
+                if len(args.force) > 0
+                else stages_order(PIPELINE_STAGES, stages)
+            )
+    try:
+        run_pipeline(
+            stages,
+            force=force,
+            dry_run=dry_run,
+            setup_file=args.setup,
+            model_file=args.model,
+        )
+    except ValueError as error:
+        parser.error(str(error))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,28 +10,85 @@ from sqlalchemy import (
     Column,
     Table,
     DateTime,
+    LargeBinary,
 )
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import event
+from dataclasses import dataclass, fields
 import datetime
 from automatic_university_scheduler.datetimeutils import DateTime as DT
-from automatic_university_scheduler.datetimeutils import TimeDelta, datetime_to_slot
+from automatic_university_scheduler.datetimeutils import (
+    TimeDelta,
+    datetime_to_slot,
+    slots_to_datetime64,
+    datetime64_to_slots,
+)
+from automatic_university_scheduler.slot_calendar import build_slot_calendar
 import math
 import numpy as np
-import networkx as nx
-import pandas as pd
+
+
+def pack_bits(array):
+    """
+    Packs a boolean (or 0/1) array into bytes, in row major order, for bit mask
+    columns.
+    """
+    return np.packbits(np.asarray(array, dtype=bool).ravel()).tobytes()
+
+
+def unpack_bits(data, shape):
+    """
+    Unpacks bytes written by `pack_bits` into a 0/1 array of a given shape.
+    """
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=math.prod(shape))
+    return bits.reshape(shape)
 
 
 class Base(DeclarativeBase):
     pass
 
 
+@dataclass(frozen=True, eq=False)
+class ProjectSetup:
+    """
+    Immutable time setup of a project, computed once from the database and cached
+    by `Project.setup`. Fields can also be read with the upper case keys of the
+    setup dictionary, e.g. `setup["ORIGIN_MONDAY"]`.
+    """
+
+    week_structure: np.ndarray
+    days_per_week: int
+    time_slots_per_day: int
+    origin_datetime: DT
+    horizon_datetime: DT
+    origin_monday: DT
+    max_weeks: int
+    time_slot_duration: TimeDelta
+    time_slots_per_week: int
+    horizon: int
+    succession_constraint_relaxation_factor: float
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key.lower())
+        except AttributeError:
+            raise KeyError(key)
+
+    def keys(self):
+        return [f.name.upper() for f in fields(self)]
+
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+
 # ASSOSIATION TABLES
 
 activity_room_pool_association_table = Table(
@@ -109,6 +166,9 @@ class Project(Base):
     horizon: Mapped[int] = mapped_column(Integer, nullable=False)
     time_slot_duration_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
     succession_constraint_relaxation_factor: Mapped[float] = mapped_column(Float, nullable=False, default=1.0)
+    # Open slots of the week, (time slots per day, 7) bits (see `pack_bits`). The
+    # week_structure table is only read by projects stored without it.
+    week_structure_bits: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
     activities: Mapped[List["Activity"]] = relationship(
         "Activity", back_populates="project"
     )
@@ -150,6 +210,9 @@ class Project(Base):
         "Manager", back_populates="project"
     )
     rooms: Mapped[List["Room"]] = relationship("Room", back_populates="project")
+    model_files: Mapped[List["ModelFile"]] = relationship(
+        "ModelFile", back_populates="project"
+    )
 
     __table_args__ = (UniqueConstraint(*_unique_columns, name="_unique_project"),)
 
@@ -179,45 +242,123 @@ class Project(Base):
 
     @property
     def week_structure(self):
-        spw = self.time_slots_per_week
-        spd = self.time_slots_per_day
-        ws = np.zeros((spd, 7), dtype=int)
-        for slot in self.week_slots_availability:
-            if slot.available:
-                ws[slot.daily_slot_id - 1, slot.week_day_id - 1] = 1
-        return ws
+        return self.setup.week_structure
+
+    @week_structure.setter
+    def week_structure(self, week_structure):
+        week_structure = np.asarray(week_structure)
+        if week_structure.shape != (self.time_slots_per_day, 7):
+            raise ValueError(
+                f"Expected a week structure of shape {(self.time_slots_per_day, 7)}, "
+                f"got {week_structure.shape}"
+            )
+        self.week_structure_bits = pack_bits(week_structure)
 
     @property
     def setup(self):
         """
-        Load the setup file.
+        Returns the cached setup of the project, computed on first access and
+        after any change of the time fields or of the week structure.
         """
+        setup = self.__dict__.get("_setup")
+        if setup is None:
+            setup = self._compute_setup()
+            self.__dict__["_setup"] = setup
+        return setup
+
+    @property
+    def calendar(self):
+        """
+        Returns the cached calendar of the slots [0, HORIZON] of the project (see
+        `slot_calendar.SlotCalendar`), invalidated with the setup.
+        """
+        calendar = self.__dict__.get("_calendar")
+        if calendar is None:
+            setup = self.setup
+            calendar = build_slot_calendar(
+                setup.origin_datetime,
+                setup.time_slot_duration,
+                setup.horizon,
+                setup.week_structure,
+                self.datetime_to_slot(setup.origin_monday, round="floor"),
+            )
+            self.__dict__["_calendar"] = calendar
+        return calendar
+
+    def clear_setup_cache(self):
+        self.__dict__.pop("_setup", None)
+        self.__dict__.pop("_calendar", None)
+
+    def planification_calendar(self, start, end):
+        """
+        Returns the ISO year, week, weekday and the start and end clocks of an
+        activity from its start and end slots.
+        """
+        calendar = self.calendar
+        if 0 <= start <= calendar.horizon and 0 <= end <= calendar.horizon:
+            start_clock, end_clock = calendar.clock([start, end])
+            return (
+                int(calendar.year[start]),
+                int(calendar.week[start]),
+                int(calendar.weekday[start]),
+                start_clock,
+                end_clock,
+            )
+        start = self.slots_to_datetime(start)
+        end = self.slots_to_datetime(end)
+        start_isocalendar = start.isocalendar()
+        return (
+            start_isocalendar.year,
+            start_isocalendar.week,
+            start_isocalendar.weekday,
+            f"{start.hour:02d}:{start.minute:02d}",
+            f"{end.hour:02d}:{end.minute:02d}",
+        )
+
+    def _compute_setup(self):
         horizon = self.horizon
         origin_datetime = self.origin
         time_slot_duration = self.time_slot_duration
-        horizon_datetime = self.origin + horizon * time_slot_duration
+        horizon_datetime = origin_datetime + horizon * time_slot_duration
         origin_monday = DT.fromisocalendar(
             origin_datetime.isocalendar().year, origin_datetime.isocalendar().week, 1
         )
         horizon_monday = DT.fromisocalendar(
             horizon_datetime.isocalendar().year, horizon_datetime.isocalendar().week, 1
         )
-        out = {}
-        out["WEEK_STRUCTURE"] = self.week_structure
-        ONE_WEEK = TimeDelta.from_str("1w")
-        ONE_DAY = TimeDelta.from_str("1d")
-        out["DAYS_PER_WEEK"] = 7
-        out["TIME_SLOTS_PER_DAY"] = ONE_DAY // time_slot_duration
-        out["ORIGIN_DATETIME"] = origin_datetime
-        out["HORIZON_DATETIME"] = horizon_datetime
-        # out["HORIZON_MONDAY"] = horizon_monday
-        out["ORIGIN_MONDAY"] = origin_monday
-        out["MAX_WEEKS"] = (horizon_monday - origin_monday) // ONE_WEEK + 1
-        out["TIME_SLOT_DURATION"] = time_slot_duration
-        out["TIME_SLOTS_PER_WEEK"] = out["DAYS_PER_WEEK"] * out["TIME_SLOTS_PER_DAY"]
-        out["HORIZON"] = horizon
-        out["SUCCESSION_CONSTRAINT_RELAXATION_FACTOR"] = self.succession_constraint_relaxation_factor
-        return out
+        time_slots_per_day = datetime.timedelta(days=1) // time_slot_duration
+        if self.week_structure_bits is not None:
+            week_structure = unpack_bits(
+                self.week_structure_bits, (time_slots_per_day, 7)
+            ).astype(int)
+        else:
+            week_structure = self._week_structure_from_table(time_slots_per_day)
+        week_structure.flags.writeable = False
+        return ProjectSetup(
+            week_structure=week_structure,
+            days_per_week=7,
+            time_slots_per_day=time_slots_per_day,
+            origin_datetime=origin_datetime,
+            horizon_datetime=horizon_datetime,
+            origin_monday=origin_monday,
+            max_weeks=(horizon_monday - origin_monday) // datetime.timedelta(weeks=1)
+            + 1,
+            time_slot_duration=time_slot_duration,
+            time_slots_per_week=7 * time_slots_per_day,
+            horizon=horizon,
+            succession_constraint_relaxation_factor=self.succession_constraint_relaxation_factor,
+        )
+
+    def _week_structure_from_table(self, time_slots_per_day):
+        week_structure = np.zeros((time_slots_per_day, 7), dtype=int)
+        available = [
+            (slot.daily_slot_id - 1, slot.week_day_id - 1)
+            for slot in self.week_slots_availability
+            if slot.available
+        ]
+        if len(available) > 0:
+            week_structure[tuple(np.array(available).T)] = 1
+        return week_structure
 
     def duration_to_slots(self, duration):
         if type(duration) == int:
@@ -248,13 +389,23 @@ class Project(Base):
     def datetime_to_slot(self, dt, round="floor"):
         if type(dt) == str:
             dt = DT.from_str(dt)
-        slot = (dt - self.origin_datetime).to_slots(
-            slot_duration=self.time_slot_duration
+        return datetime_to_slot(
+            dt, self.origin_datetime, self.time_slot_duration, round=round
+        )
+
+    def slots_to_datetime64(self, slots):
+        """
+        Converts an array of slots to an array of datetime64.
+        """
+        return slots_to_datetime64(slots, self.origin_datetime, self.time_slot_duration)
+
+    def datetime64_to_slots(self, datetimes, round="floor"):
+        """
+        Converts an array of datetime64 to an array of slots.
+        """
+        return datetime64_to_slots(
+            datetimes, self.origin_datetime, self.time_slot_duration, round=round
         )
-        if round == "ceil":
-            return math.ceil(slot)
-        elif round == "floor":
-            return math.floor(slot)
 
 
 class AtomicStudent(Base):
@@ -265,6 +416,7 @@ class AtomicStudent(Base):
     label: Mapped[str] = mapped_column(String(30), unique=True)
     project_id: Mapped[int] = mapped_column(ForeignKey("project.id"))
     project: Mapped["Project"] = relationship(back_populates="atomic_students")
+    headcount: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     __table_args__ = (
         UniqueConstraint(*_unique_columns, name="_unique_atomic_student"),
@@ -314,6 +466,17 @@ class StudentsGroup(Base):
         name = self.__class__.__name__
         return f"<{name}: id={self.id}, label={self.label}>"
 
+    @property
+    def headcount(self):
+        """
+        The number of students of the group, None if the headcount of one of its
+        atomic students is unknown.
+        """
+        headcounts = [student.headcount for student in self.students]
+        if None in headcounts:
+            return None
+        return sum(headcounts)
+
 
 class StaticActivity(Base):
     __tablename__ = "static_activity"
@@ -324,6 +487,10 @@ class StaticActivity(Base):
     kind: Mapped[str] = mapped_column(String(30), nullable=True)
     start: Mapped[int] = mapped_column(Integer, nullable=True)
     duration: Mapped[int] = mapped_column(Integer, nullable=False)
+    # RECURRENCE: `count` occurrences starting every `period` slots, `start`
+    # and `end` being those of the first one
+    period: Mapped[int] = mapped_column(Integer, nullable=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     course: Mapped[str] = mapped_column(String(30), nullable=True)
     students_id: Mapped[int] = mapped_column(
         ForeignKey("students_group.id"), nullable=True
@@ -353,6 +520,17 @@ class StaticActivity(Base):
     def end(self):
         return self.start + self.duration
 
+    @property
+    def starts(self):
+        """
+        The starts of the occurrences of the static activity.
+        """
+        if self.start is None:
+            return []
+        if self.count is None or self.count == 1:
+            return [self.start]
+        return [self.start + k * self.period for k in range(self.count)]
+
     @property
     def start_datetime(self):
         return self.project.slots_to_datetime(self.start)
@@ -367,14 +545,8 @@ class StaticActivity(Base):
 
     @property
     def planification_to_series(self):
-        start = self.start_datetime
-        end = self.end_datetime
-        start_isocalendar = start.isocalendar()
-        week = start_isocalendar.week
-        weekday = start_isocalendar.weekday
-        year = start_isocalendar.year
-        start_clock = f"{start.hour:02d}:{start.minute:02d}"
-        end_clock = f"{end.hour:02d}:{end.minute:02d}"
+        calendar = self.project.planification_calendar(self.start, self.end)
+        year, week, weekday, start_clock, end_clock = calendar
         duration = self.duration_timedelta.to_str()
         if self.students is not None:
             students = self.students.label
@@ -397,6 +569,8 @@ class StaticActivity(Base):
             ),
             "allocated_rooms": ", ".join([r.label for r in self.allocated_rooms]),
         }
+        import pandas as pd
+
         return pd.Series(out)
 
 
@@ -496,18 +670,14 @@ class Activity(Base):
             "earliest_start": self.earliest_start,
             "start": self.start_datetime,
         }
+        import pandas as pd
+
         return pd.Series(out)
 
     @property
     def planification_to_series(self):
-        start = self.start_datetime
-        end = self.end_datetime
-        start_isocalendar = start.isocalendar()
-        week = start_isocalendar.week
-        weekday = start_isocalendar.weekday
-        year = start_isocalendar.year
-        start_clock = f"{start.hour:02d}:{start.minute:02d}"
-        end_clock = f"{end.hour:02d}:{end.minute:02d}"
+        calendar = self.project.planification_calendar(self.start, self.end)
+        year, week, weekday, start_clock, end_clock = calendar
         duration = self.duration_timedelta.to_str()
         out = {
             "id": self.id,
@@ -530,6 +700,8 @@ class Activity(Base):
             "room_pool": ", ".join([r.label for r in self.room_pool]),
             "room_count": self.room_count,
         }
+        import pandas as pd
+
         return pd.Series(out)
 
 
@@ -565,6 +737,8 @@ class Course(Base):
 
     @property
     def activity_graph(self):
+        import networkx as nx
+
         G = nx.DiGraph()
 
         ag = self.activity_groups
@@ -629,7 +803,8 @@ class Room(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     label: Mapped[str] = mapped_column(String(30), unique=True)
-    capacity: Mapped[int] = mapped_column(Integer, nullable=False)
+    # None if unknown
+    capacity: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     project_id: Mapped[int] = mapped_column(ForeignKey("project.id"))
     project: Mapped["Project"] = relationship(back_populates="rooms")
     activities_pools: Mapped[List["Activity"]] = relationship(
@@ -665,11 +840,35 @@ class ActivityKind(Base):
         secondary=activity_kind_daily_slots_association_table,
         back_populates="allowed_by",
     )
+    # Bit i is set if the kind can start at daily slot i + 1 (see `pack_bits`),
+    # the allowed_daily_start_slots table being only read without it.
+    allowed_start_slots_bits: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
 
     def __repr__(self) -> str:
         name = self.__class__.__name__
         return f"<{name}: id={self.id}, label={self.label}>"
 
+    @property
+    def allowed_start_slots(self):
+        """
+        Returns the sorted daily slots (numbered from 1) the kind can start at.
+        """
+        if self.allowed_start_slots_bits is None:
+            return np.array(
+                sorted(slot.id for slot in self.allowed_daily_start_slots), dtype=int
+            )
+        bits = np.unpackbits(np.frombuffer(self.allowed_start_slots_bits, np.uint8))
+        return np.flatnonzero(bits) + 1
+
+    @allowed_start_slots.setter
+    def allowed_start_slots(self, slots):
+        slots = np.asarray(slots, dtype=int)
+        if (slots < 1).any():
+            raise ValueError("Daily slots are numbered from 1")
+        mask = np.zeros(slots.max(initial=0), dtype=bool)
+        mask[slots - 1] = True
+        self.allowed_start_slots_bits = pack_bits(mask)
+
 
 class DailySlot(Base):
     __tablename__ = "daily_slot"
@@ -824,3 +1023,217 @@ class StartsAfterConstraint(Base):
         from_label = self.from_activity_group.label
         to_label = self.to_activity_group.label
         return f"<{name}: id={self.id}, label={self.label}, min_offset={self.min_offset}, max_offset={self.max_offset}, from={from_label}, to={to_label}>"
+
+
+class ModelFile(Base):
+    """
+    A file of a model directory (see `model_directory`) and the hash of the
+    content it was last loaded from. `course` is the label of the course it
+    defines, None for the shared project file.
+    """
+
+    __tablename__ = "model_file"
+    _unique_columns = ["project_id", "path"]
+    __table_args__ = (UniqueConstraint(*_unique_columns, name="_unique_model_file"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    project_id: Mapped[int] = mapped_column(ForeignKey("project.id"))
+    project: Mapped["Project"] = relationship(back_populates="model_files")
+    path: Mapped[str] = mapped_column(String(255), nullable=False)
+    course: Mapped[str] = mapped_column(String(30), nullable=True)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    def __repr__(self) -> str:
+        name = self.__class__.__name__
+        return f"<{name}: id={self.id}, path={self.path}, course={self.course}>"
+
+
+# LOADER PROFILES
+
+
+def _activities_options(loader, allocations=True):
+    options = [
+        joinedload(Activity.kind),
+        joinedload(Activity.course),
+        joinedload(Activity.students).selectinload(StudentsGroup.students),
+        selectinload(Activity.room_pool),
+        selectinload(Activity.teacher_pool),
+    ]
+    if allocations:
+        options += [
+            selectinload(Activity.allocated_rooms),
+            selectinload(Activity.allocated_teachers),
+        ]
+    return loader.options(*options)
+
+
+def _static_activities_options(loader):
+    return loader.options(
+        joinedload(StaticActivity.students).selectinload(StudentsGroup.students),
+        selectinload(StaticActivity.allocated_rooms),
+        selectinload(StaticActivity.allocated_teachers),
+    )
+
+
+def _starts_after_options(loader):
+    return loader.options(
+        joinedload(StartsAfterConstraint.from_activity_group).selectinload(
+            ActivityGroup.activities
+        ),
+        joinedload(StartsAfterConstraint.to_activity_group).selectinload(
+            ActivityGroup.activities
+        ),
+    )
+
+
+def _solve_profile():
+    """
+    Everything read while building and solving the CP model.
+    """
+    return [
+        _activities_options(selectinload(Project.activities)),
+        _static_activities_options(selectinload(Project.static_activities)),
+        _starts_after_options(selectinload(Project.starts_after_constraints)),
+        selectinload(Project.activity_kinds).options(
+            selectinload(ActivityKind.activities),
+        ),
+        selectinload(Project.activity_groups).selectinload(ActivityGroup.activities),
+        selectinload(Project.atomic_students),
+        selectinload(Project.students_groups).selectinload(StudentsGroup.students),
+        selectinload(Project.teachers),
+        selectinload(Project.rooms),
+        selectinload(Project.courses),
+    ]
+
+
+def _export_profile():
+    """
+    Everything read while exporting the planification per course, teacher, room
+    and students.
+    """
+    return [
+        selectinload(Project.courses).options(
+            joinedload(Course.manager),
+            joinedload(Course.planner),
+            _activities_options(selectinload(Course.activities)),
+        ),
+        _static_activities_options(selectinload(Project.static_activities)),
+        selectinload(Project.atomic_students)
+        .selectinload(AtomicStudent.groups)
+        .selectinload(StudentsGroup.activities),
+        selectinload(Project.students_groups).options(
+            selectinload(StudentsGroup.students),
+            selectinload(StudentsGroup.activities),
+        ),
+        selectinload(Project.teachers).selectinload(Teacher.activities_allocations),
+        selectinload(Project.rooms).selectinload(Room.activities_allocations),
+    ]
+
+
+def _solution_profile():
+    """
+    Everything read while writing or dumping a solution: the activities with
+    their course and allocations, the rooms and the teachers.
+    """
+    return [
+        selectinload(Project.activities).options(
+            joinedload(Activity.course),
+            selectinload(Activity.allocated_rooms),
+            selectinload(Activity.allocated_teachers),
+        ),
+        selectinload(Project.rooms),
+        selectinload(Project.teachers),
+    ]
+
+
+def _validate_profile():
+    """
+    Everything read while validating the courses models with their managers:
+    activity graphs, activities ressources and contacts.
+    """
+    return [
+        selectinload(Project.courses).options(
+            joinedload(Course.manager),
+            joinedload(Course.planner),
+            _activities_options(selectinload(Course.activities), allocations=False),
+            selectinload(Course.activity_groups).options(
+                selectinload(ActivityGroup.activities),
+                _starts_after_options(selectinload(ActivityGroup.starts_after)),
+                selectinload(ActivityGroup.is_before),
+            ),
+        ),
+    ]
+
+
+LOADER_PROFILES = {
+    "solve": _solve_profile,
+    "export": _export_profile,
+    "solution": _solution_profile,
+    "validate": _validate_profile,
+}
+
+
+def load_project(session, profile="solve", label=None):
+    """
+    Loads a project with all the relationships used by a given task, in a fixed
+    number of queries instead of one query per lazy relationship access.
+
+    Parameters:
+    session (Session): The database session.
+    profile (str): The loader profile, one of "solve", "export", "solution",
+                   "validate", or None to load the project alone (lazy
+                   relationships).
+    label (str): The label of the project, the first project if None.
+
+    Returns:
+    Project: The loaded project, or None if there is no such project.
+    """
+    statement = select(Project)
+    if label is not None:
+        statement = statement.where(Project.label == label)
+    if profile is not None:
+        if profile not in LOADER_PROFILES:
+            raise ValueError(
+                f"Unknown loader profile {profile}, expected one of {list(LOADER_PROFILES)}"
+            )
+        statement = statement.options(*LOADER_PROFILES[profile]())
+    return session.execute(statement).scalars().first()
+
+
+# SETUP CACHE INVALIDATION
+
+
+def _clear_project_setup(project):
+    if project is not None:
+        project.clear_setup_cache()
+
+
+for _attribute in (
+    Project.origin_datetime,
+    Project.horizon,
+    Project.time_slot_duration_seconds,
+    Project.succession_constraint_relaxation_factor,
+    Project.week_structure_bits,
+):
+    event.listen(_attribute, "set", lambda target, *args: _clear_project_setup(target))
+
+for _event in ("append", "remove", "bulk_replace"):
+    event.listen(
+        Project.week_slots_availability,
+        _event,
+        lambda target, *args: _clear_project_setup(target),
+    )
+event.listen(Project, "expire", lambda target, *args: _clear_project_setup(target))
+event.listen(Project, "refresh", lambda target, *args: _clear_project_setup(target))
+
+
+@event.listens_for(WeekSlotsAvailabiblity.available, "set")
+def _week_slot_availability_set(target, value, oldvalue, initiator):
+    _clear_project_setup(target.project)
+
+
+@event.listens_for(WeekSlotsAvailabiblity.project, "set")
+def _week_slot_project_set(target, value, oldvalue, initiator):
+    _clear_project_setup(value)
+    if isinstance(oldvalue, Project):
+        _clear_project_setup(oldvalue)
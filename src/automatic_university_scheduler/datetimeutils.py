@@ -1,5 +1,5 @@
 import datetime
-import math
+import numpy as np
 
 
 class MetaTime:
@@ -17,10 +17,10 @@ class MetaTime:
         """
         Propagate the type of the object to the output.
         """
-        if out.__class__ == datetime.timedelta:
+        if out.__class__ is datetime.timedelta:
             return TimeDelta.from_timedelta(out)
-        elif out.__class__ == datetime.datetime:
-            return DateTime.from_str(out.to_str())
+        elif out.__class__ is datetime.datetime:
+            return DateTime.from_datetime(out)
         else:
             return out
 
@@ -114,11 +114,14 @@ class TimeDelta(MetaTime, datetime.timedelta):
 
     def to_slots(self, slot_duration=None) -> int:
         """
-        Convert a TimeDelta object to slots. Default: 15min slots.
+        Convert a TimeDelta object to slots (rounded down). Default: 15min slots.
         """
         if slot_duration is None:
-            slot_duration = TimeDelta(minutes=15)
-        return self.total_seconds() // slot_duration.total_seconds()
+            slot_duration = _QUARTER_HOUR
+        return self // slot_duration
+
+
+_QUARTER_HOUR = TimeDelta(minutes=15)
 
 
 class TimeInterval:
@@ -154,11 +157,9 @@ class TimeInterval:
         if start == end:  # If the interval is empty
             return None
         else:  # If the interval is not empty
-            start_slot = math.floor(
-                (start - origin_datetime).to_slots(slot_duration=slot_duration)
-            )
-            end_slot = math.ceil(
-                (end - origin_datetime).to_slots(slot_duration=slot_duration)
+            start_slot = datetime_to_slot(start, origin_datetime, slot_duration)
+            end_slot = datetime_to_slot(
+                end, origin_datetime, slot_duration, round="ceil"
             )
             return start_slot, end_slot
 
@@ -182,14 +183,12 @@ def datetime_to_slot(
     datetime: DateTime, origin_datetime: DateTime, slot_duration: TimeDelta, round=None
 ) -> int:
     """
-    Convert a DateTime object to a 15min slot.
+    Convert a DateTime object to a slot, rounded down unless `round` is "ceil".
     """
-    slot = (datetime - origin_datetime).to_slots(slot_duration=slot_duration)
+    delta = datetime - origin_datetime
     if round == "ceil":
-        return math.ceil(slot)
-    elif round == "floor":
-        return math.floor(slot)
-    return slot
+        return -(-delta // slot_duration)
+    return delta // slot_duration
 
 
 def slot_to_datetime(slot, origin_datetime, time_slot_duration):
@@ -197,3 +196,60 @@ def slot_to_datetime(slot, origin_datetime, time_slot_duration):
     Converts a slot to a datetime.
     """
     return origin_datetime + slot * time_slot_duration
+
+
+# VECTORIZED CONVERSIONS
+
+
+def to_datetime64(dt) -> np.datetime64:
+    """
+    Converts a datetime to a NumPy datetime64 with a second resolution.
+    """
+    if isinstance(dt, np.datetime64):
+        return dt.astype("datetime64[s]")
+    return np.datetime64(
+        datetime.datetime(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second),
+        "s",
+    )
+
+
+def _slot_seconds(slot_duration) -> int:
+    return slot_duration.days * 86400 + slot_duration.seconds
+
+
+def slots_to_datetime64(slots, origin_datetime, slot_duration) -> np.ndarray:
+    """
+    Converts an array of slots to an array of datetime64 (second resolution).
+    """
+    slots = np.asarray(slots, dtype=np.int64)
+    step = np.timedelta64(_slot_seconds(slot_duration), "s")
+    return to_datetime64(origin_datetime) + slots * step
+
+
+def datetime64_to_slots(datetimes, origin_datetime, slot_duration, round="floor"):
+    """
+    Converts an array of datetime64 to an array of slots, rounded down or up
+    (`round="ceil"`), using integer arithmetic only.
+    """
+    seconds = (
+        np.asarray(datetimes, dtype="datetime64[s]") - to_datetime64(origin_datetime)
+    ).astype(np.int64)
+    step = _slot_seconds(slot_duration)
+    if round == "ceil":
+        return -(-seconds // step)
+    return seconds // step
+
+
+def isocalendar_to_datetime64(year, week, weekday) -> np.ndarray:
+    """
+    Converts arrays of ISO years, weeks and weekdays (1 = monday) to an array of
+    datetime64 dates (day resolution).
+    """
+    year = np.asarray(year, dtype=np.int64)
+    week = np.asarray(week, dtype=np.int64)
+    weekday = np.asarray(weekday, dtype=np.int64)
+    # January 4th always belongs to the first ISO week
+    january_4 = (year - 1970).astype("datetime64[Y]").astype("datetime64[D]") + 3
+    # 1970-01-01 is a thursday
+    monday = january_4 - (january_4.astype(np.int64) + 3) % 7
+    return monday + 7 * (week - 1) + (weekday - 1)
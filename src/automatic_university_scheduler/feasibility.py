@@ -0,0 +1,422 @@
+import numpy as np
+import networkx as nx
+import pandas as pd
+from ortools.sat.python import cp_model
+from automatic_university_scheduler.optimize import build_model
+from automatic_university_scheduler.graph_analysis import (
+    project_precedence_graph,
+    strongly_connected_cycles,
+    critical_path,
+)
+from automatic_university_scheduler.propagation import (
+    propagate_start_windows,
+    empty_windows,
+)
+from automatic_university_scheduler.utils import Messages
+
+
+def open_slots_mask(project):
+    """
+    Returns a boolean array of length HORIZON which is True on the slots that are
+    open according to the project's week structure.
+    """
+    return project.calendar.available[: project.horizon].copy()
+
+
+def static_busy_masks(project):
+    """
+    Returns the slots blocked by static activities for each teacher, room and
+    atomic student as boolean arrays of length HORIZON.
+
+    As in `create_static_activities_overlap_constraints`, static activities are
+    only enforced on ressources that own more than one of them (counting each
+    occurrence of the recurring ones).
+    """
+    horizon = project.horizon
+    intervals = {"teachers": {}, "rooms": {}, "students": {}}
+    for static_activity in project.static_activities:
+        occurrences = [
+            (
+                min(max(start, 0), horizon),
+                min(max(start + static_activity.duration, 0), horizon),
+            )
+            for start in static_activity.starts
+        ]
+        for teacher in static_activity.allocated_teachers:
+            intervals["teachers"].setdefault(teacher.id, []).extend(occurrences)
+        for room in static_activity.allocated_rooms:
+            intervals["rooms"].setdefault(room.id, []).extend(occurrences)
+        if static_activity.students is not None:
+            for student in static_activity.students.students:
+                intervals["students"].setdefault(student.id, []).extend(occurrences)
+    out = {}
+    for kind, ressources_intervals in intervals.items():
+        out[kind] = {}
+        for rid, ressource_intervals in ressources_intervals.items():
+            if len(ressource_intervals) > 1:
+                mask = np.zeros(horizon, dtype=bool)
+                for start, end in ressource_intervals:
+                    mask[start:end] = True
+                out[kind][rid] = mask
+    return out
+
+
+def _issue(check, subject, required, available, message):
+    return {
+        "check": check,
+        "subject": subject,
+        "required": required,
+        "available": available,
+        "message": message,
+    }
+
+
+def check_ressources_load(project, open_mask=None, busy_masks=None):
+    """
+    Compares the load of each atomic student, teacher and room with the number
+    of slots it can actually use. Teachers and rooms are only charged with the
+    activities they cannot escape, i.e. those whose count equals their pool size.
+    """
+    horizon = project.horizon
+    if open_mask is None:
+        open_mask = open_slots_mask(project)
+    if busy_masks is None:
+        busy_masks = static_busy_masks(project)
+    free = np.ones(horizon, dtype=bool)
+    loads = {"teachers": {}, "rooms": {}, "students": {}}
+    labels = {"teachers": {}, "rooms": {}, "students": {}}
+
+    def charge(kind, ressource, activity):
+        # (total load, load restricted to the week structure)
+        load = loads[kind].setdefault(ressource.id, [0, 0])
+        labels[kind][ressource.id] = ressource.label
+        load[0] += activity.duration
+        if len(activity.students.students) > 0:
+            load[1] += activity.duration
+
+    for activity in project.activities:
+        for student in activity.students.students:
+            charge("students", student, activity)
+        if activity.teacher_count == len(activity.teacher_pool):
+            for teacher in activity.teacher_pool:
+                charge("teachers", teacher, activity)
+        if activity.room_count == len(activity.room_pool):
+            for room in activity.room_pool:
+                charge("rooms", room, activity)
+
+    issues = []
+    for kind, ressources_loads in loads.items():
+        for rid, (load, open_load) in ressources_loads.items():
+            busy = busy_masks[kind].get(rid)
+            available = free if busy is None else ~busy
+            capacity = int(available.sum())
+            open_capacity = int((available & open_mask).sum())
+            label = labels[kind][rid]
+            if load > capacity:
+                issues.append(
+                    _issue(
+                        f"{kind} load",
+                        label,
+                        load,
+                        capacity,
+                        f"{label} needs {load} slots but only {capacity} are free",
+                    )
+                )
+            elif open_load > open_capacity:
+                issues.append(
+                    _issue(
+                        f"{kind} load",
+                        label,
+                        open_load,
+                        open_capacity,
+                        f"{label} needs {open_load} slots but only {open_capacity} are open in the week structure",
+                    )
+                )
+    return issues
+
+
+def check_pools(project):
+    """
+    Checks that every activity asks for no more teachers and rooms than its pools
+    contain, that its largest rooms can hold its students (when capacities and
+    headcounts are known) and that its start window is not empty.
+    """
+    horizon = project.horizon
+    issues = []
+    for activity in project.activities:
+        subject = f"{activity.course.label}/{activity.label}"
+        for kind, count, pool in (
+            ("teachers", activity.teacher_count, activity.teacher_pool),
+            ("rooms", activity.room_count, activity.room_pool),
+        ):
+            if count > len(pool):
+                issues.append(
+                    _issue(
+                        f"{kind} pool",
+                        subject,
+                        count,
+                        len(pool),
+                        f"{subject} needs {count} {kind} but its pool only has {len(pool)}",
+                    )
+                )
+        headcount = activity.students.headcount
+        capacities = [room.capacity for room in activity.room_pool]
+        if (
+            headcount is not None
+            and 0 < activity.room_count <= len(capacities)
+            and None not in capacities
+        ):
+            capacity = sum(sorted(capacities)[-activity.room_count :])
+            if capacity < headcount:
+                issues.append(
+                    _issue(
+                        "rooms capacity",
+                        subject,
+                        headcount,
+                        capacity,
+                        f"{subject} has {headcount} students but its rooms only hold {capacity}",
+                    )
+                )
+        earliest = activity.earliest_start_slot
+        latest = activity.latest_start_slot
+        earliest = 0 if earliest is None else earliest
+        latest = (
+            horizon - activity.duration
+            if latest is None
+            else min(latest, horizon - activity.duration)
+        )
+        if earliest > latest:
+            issues.append(
+                _issue(
+                    "start window",
+                    subject,
+                    earliest,
+                    latest,
+                    f"{subject} must start after slot {earliest} and before slot {latest}",
+                )
+            )
+    return issues
+
+
+def _precedence_chain(activity_id, windows, pushed_by):
+    """
+    Walks back the starts after constraints that raised the earliest start of an
+    activity and returns the chain of activity groups as a string.
+    """
+    chain = []
+    seen = set()
+    current = activity_id
+    starts_after = pushed_by[current]
+    while starts_after is not None and starts_after.id not in seen:
+        seen.add(starts_after.id)
+        from_group = starts_after.from_activity_group
+        if current in [a.id for a in from_group.activities]:
+            # Pushed back by a max offset from the to group
+            group = starts_after.to_activity_group
+            critical = max(group.activities, key=lambda a: windows[a.id][0])
+        else:
+            group = from_group
+            critical = max(
+                group.activities, key=lambda a: windows[a.id][0] + a.duration
+            )
+        chain.append(f"{group.course.label}/{group.label}")
+        current = critical.id
+        starts_after = pushed_by[current]
+    return " -> ".join(chain[::-1])
+
+
+def check_precedence_chains(project):
+    """
+    Checks that the chains of starts after constraints fit within the horizon and
+    the earliest/latest starts of the activities.
+    """
+    windows, pushed_by = propagate_start_windows(project)
+    activities_dic = {a.id: a for a in project.activities}
+    issues = []
+    for aid in empty_windows(windows):
+        activity = activities_dic[aid]
+        if activity.earliest_start_slot is not None and (
+            activity.latest_start_slot is not None
+            and activity.earliest_start_slot > activity.latest_start_slot
+        ):
+            # Already reported by check_pools
+            continue
+        subject = f"{activity.course.label}/{activity.label}"
+        earliest, latest = windows[aid]
+        chain = _precedence_chain(aid, windows, pushed_by)
+        after = f" (after {chain})" if chain != "" else ""
+        issues.append(
+            _issue(
+                "precedence chain",
+                subject,
+                earliest,
+                latest,
+                f"{subject} cannot start before slot {earliest}{after} but must start before slot {latest}",
+            )
+        )
+    return issues
+
+
+def check_precedence_graph(project):
+    """
+    Checks that the project-wide precedence graph has no cycle (one issue per
+    strongly connected component) and that its critical path fits within the
+    horizon.
+    """
+    graph = project_precedence_graph(project)
+    labels = nx.get_node_attributes(graph, "label")
+    issues = []
+    for cycle in strongly_connected_cycles(graph):
+        cycle = [labels[node] for node in cycle]
+        subject = cycle[0]
+        issues.append(
+            _issue(
+                "precedence cycle",
+                subject,
+                None,
+                None,
+                f"{subject} starts after itself: {' -> '.join(cycle + [subject])}",
+            )
+        )
+    if len(issues) > 0:
+        return issues
+    length, path = critical_path(graph)
+    if length > project.horizon:
+        subject = f"{labels[path[0]]} -> {labels[path[-1]]}"
+        issues.append(
+            _issue(
+                "critical path",
+                subject,
+                length,
+                project.horizon,
+                f"{' -> '.join(labels[n] for n in path)} needs {length} slots but the horizon is {project.horizon} slots",
+            )
+        )
+    return issues
+
+
+def presolve_checks(project, verbose=True) -> pd.DataFrame:
+    """
+    Runs cheap necessary feasibility conditions on a project before the CP model
+    is built. Returns the detected issues as a DataFrame (empty if none).
+    """
+    open_mask = open_slots_mask(project)
+    busy_masks = static_busy_masks(project)
+    issues = []
+    issues += check_pools(project)
+    issues += check_ressources_load(project, open_mask, busy_masks)
+    graph_issues = check_precedence_graph(project)
+    issues += graph_issues
+    if len(graph_issues) == 0:
+        # Propagating around a cycle only stops at the horizon
+        issues += check_precedence_chains(project)
+    issues = pd.DataFrame(
+        issues, columns=["check", "subject", "required", "available", "message"]
+    )
+    if verbose:
+        if len(issues) == 0:
+            print(f"    PRESOLVE: no infeasibility detected => {Messages.SUCCESS}")
+        for _, issue in issues.iterrows():
+            print(f"    {issue.check.upper()}: {issue.message} => {Messages.ERROR}")
+    return issues
+
+
+def describe_constraint_group(project, key):
+    """
+    Returns a human readable description of a constraint group key as produced
+    by the `literals` argument of the model building functions.
+    """
+    kind, _, ref = key.partition(":")
+    if kind in ("earliest_start", "latest_start"):
+        activity = {a.id: a for a in project.activities}[int(ref)]
+        subject = f"{activity.course.label}/{activity.label}"
+        if kind == "earliest_start":
+            return f"{subject} starts after {activity.earliest_start}"
+        return f"{subject} starts before {activity.latest_start}"
+    if kind == "starts_after":
+        starts_after = {c.id: c for c in project.starts_after_constraints}[int(ref)]
+        from_group = starts_after.from_activity_group
+        to_group = starts_after.to_activity_group
+        return (
+            f"{to_group.course.label}/{to_group.label} starts after "
+            f"{from_group.course.label}/{from_group.label} "
+            f"(min_offset={starts_after.min_offset}, max_offset={starts_after.max_offset})"
+        )
+    if kind == "allowed_start_slots":
+        return f"allowed start slots of activity kind {ref}"
+    if kind == "static_activity":
+        return f"static activities {ref}"
+    if kind == "weekly_unavailability":
+        return "closed slots of the week structure"
+    return key
+
+
+def _solve_with_assumptions(model, literals, keys, max_time_in_seconds, num_workers):
+    model.ClearAssumptions()
+    model.AddAssumptions([literals[key] for key in keys])
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max_time_in_seconds
+    solver.parameters.num_search_workers = num_workers
+    status = solver.Solve(model)
+    if status != cp_model.INFEASIBLE:
+        return status, None
+    indices = set(solver.SufficientAssumptionsForInfeasibility())
+    return status, [key for key in keys if literals[key].Index() in indices]
+
+
+def find_infeasible_core(
+    project,
+    max_time_in_seconds=60.0,
+    num_workers=8,
+    minimize=True,
+    verbose=True,
+):
+    """
+    Extracts a minimal infeasible subset of constraint groups from a project.
+
+    Every relaxable constraint group (earliest/latest starts, starts after
+    constraints, allowed start slots per kind, static activities and the week
+    structure) is guarded by an assumption literal. CP-SAT returns a sufficient
+    set of assumptions for infeasibility, which is then shrunk by deletion: each
+    group is dropped in turn and kept out if the rest is still infeasible.
+
+    Returns a DataFrame with the groups of the core and their description, an
+    empty DataFrame if the infeasibility only involves the ressources overlaps,
+    or None if the model is not proven infeasible within the time limit.
+    """
+    literals = {}
+    model, variables = build_model(project, literals=literals, objective=False)
+
+    status, core = _solve_with_assumptions(
+        model, literals, list(literals), max_time_in_seconds, num_workers
+    )
+    if core is None:
+        if verbose:
+            print(f"    CORE: model not proven infeasible => {Messages.WARNING}")
+        return None
+    if minimize:
+        i = 0
+        while i < len(core):
+            candidate = core[:i] + core[i + 1 :]
+            status, sub_core = _solve_with_assumptions(
+                model, literals, candidate, max_time_in_seconds, num_workers
+            )
+            if sub_core is None:
+                i += 1
+            else:
+                core = sub_core
+    model.ClearAssumptions()
+    core = pd.DataFrame(
+        {
+            "group": core,
+            "description": [describe_constraint_group(project, k) for k in core],
+        }
+    )
+    if verbose:
+        if len(core) == 0:
+            print(
+                f"    CORE: infeasible without any relaxable constraint, check ressources overlaps => {Messages.ERROR}"
+            )
+        for _, row in core.iterrows():
+            print(f"    CORE: {row.description} => {Messages.ERROR}")
+    return core
@@ -0,0 +1,152 @@
+import networkx as nx
+from automatic_university_scheduler.propagation import precedence_edges
+from automatic_university_scheduler.utils import Messages
+
+
+def strongly_connected_cycles(graph) -> list:
+    """
+    Detects the cycles of a directed graph with its strongly connected components
+    (linear time) and returns one witness cycle, as a list of nodes, per
+    component. Unlike `nx.simple_cycles`, the number of cycles returned is at most
+    the number of nodes.
+    """
+    cycles = []
+    for component in nx.strongly_connected_components(graph):
+        if len(component) == 1:
+            node = next(iter(component))
+            if graph.has_edge(node, node):
+                cycles.append([node])
+            continue
+        subgraph = graph.subgraph(component)
+        edges = nx.find_cycle(subgraph, source=next(iter(component)))
+        cycles.append([start for start, _ in edges])
+    return cycles
+
+
+def project_precedence_graph(project) -> nx.DiGraph:
+    """
+    Builds the precedence graph of a whole project, foreign activity groups
+    included, at the activity level.
+
+    Each activity is a node (with its `label` and `duration`). Each starts after
+    constraint with a min offset is a hub node `("starts_after", id)` linked from
+    the activities of its `from` group (weight: their duration) and to those of
+    its `to` group (weight: the min offset), so that the graph stays linear in
+    the size of the groups and a path weight is a lower bound on the slots
+    between the start of its first activity and the start of its last one.
+    Since foreign groups share the activities of other courses, the courses are
+    connected through these activities.
+    """
+    graph = nx.DiGraph()
+    for activity in project.activities:
+        graph.add_node(
+            activity.id,
+            label=f"{activity.course.label}/{activity.label}",
+            duration=activity.duration,
+        )
+    durations = nx.get_node_attributes(graph, "duration")
+    for starts_after, from_ids, to_ids, min_offset, _ in precedence_edges(project):
+        if min_offset is None:
+            continue
+        from_group = starts_after.from_activity_group
+        to_group = starts_after.to_activity_group
+        hub = ("starts_after", starts_after.id)
+        graph.add_node(
+            hub,
+            label=(
+                f"{from_group.course.label}/{from_group.label} => "
+                f"{to_group.course.label}/{to_group.label}"
+            ),
+        )
+        for aid in from_ids:
+            graph.add_edge(aid, hub, weight=durations[aid])
+        for aid in to_ids:
+            graph.add_edge(hub, aid, weight=min_offset)
+    return graph
+
+
+def critical_path(graph):
+    """
+    Computes the longest path of an acyclic precedence graph built by
+    `project_precedence_graph` in linear time, in topological order.
+
+    Returns:
+    tuple: The length of the path in slots (from the start of its first activity
+    to the end of its last one) and its activity nodes, or (None, None) if the
+    graph has cycles.
+    """
+    if not nx.is_directed_acyclic_graph(graph):
+        return None, None
+    distance = {}
+    predecessor = {}
+    for node in nx.topological_sort(graph):
+        distance.setdefault(node, 0)
+        for _, successor, weight in graph.out_edges(node, data="weight"):
+            if distance[node] + weight > distance.get(successor, -1):
+                distance[successor] = distance[node] + weight
+                predecessor[successor] = node
+    durations = nx.get_node_attributes(graph, "duration")
+    if len(durations) == 0:
+        return 0, []
+    last = max(durations, key=lambda node: distance[node] + durations[node])
+    length = distance[last] + durations[last]
+    path = [last]
+    while path[-1] in predecessor:
+        path.append(predecessor[path[-1]])
+    path = [node for node in path[::-1] if node in durations]
+    return length, path
+
+
+def sources_and_sinks(graph):
+    """
+    Returns the sets of activities of a precedence graph without predecessor
+    (sources) and without successor (sinks).
+    """
+    durations = nx.get_node_attributes(graph, "duration")
+    sources = {node for node in durations if graph.in_degree(node) == 0}
+    sinks = {node for node in durations if graph.out_degree(node) == 0}
+    return sources, sinks
+
+
+def analyze_project_graph(project, graph=None, verbose=True) -> dict:
+    """
+    Fast structural check of the precedence graph of a whole project: cycles
+    (one witness per strongly connected component), critical path against the
+    horizon and source/sink activities. All the steps run in linear time.
+
+    Returns:
+    dict: `cycles` (witnesses as lists of labels), `critical_path_length`,
+    `critical_path` (activity labels), `horizon`, `sources` and `sinks`
+    (activity labels).
+    """
+    if graph is None:
+        graph = project_precedence_graph(project)
+    labels = nx.get_node_attributes(graph, "label")
+    cycles = [
+        [labels[node] for node in cycle] for cycle in strongly_connected_cycles(graph)
+    ]
+    length, path = critical_path(graph)
+    sources, sinks = sources_and_sinks(graph)
+    out = {
+        "cycles": cycles,
+        "critical_path_length": length,
+        "critical_path": None if path is None else [labels[n] for n in path],
+        "horizon": project.horizon,
+        "sources": sorted(labels[n] for n in sources),
+        "sinks": sorted(labels[n] for n in sinks),
+    }
+    if verbose:
+        for cycle in cycles:
+            print(f"    CYCLES: {' -> '.join(cycle)} => {Messages.ERROR}")
+        if len(cycles) == 0:
+            print(f"    CYCLES: no cycles detected in graph => {Messages.SUCCESS}")
+            status = Messages.SUCCESS if length <= project.horizon else Messages.ERROR
+            print(
+                f"    CRITICAL PATH: {length} slots for a horizon of "
+                f"{project.horizon} slots => {status}"
+            )
+        print(
+            f"    SOURCES/SINKS: {len(sources)} source and {len(sinks)} sink "
+            f"activities => {Messages.SUCCESS}"
+        )
+    return out
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+import networkx as nx
+from automatic_university_scheduler.utils import create_directory, Messages
+from automatic_university_scheduler.validation import (
+    NODE_CLASSES_COLORS,
+    edge_label,
+    graph_to_mermaid,
+    mermaid_flowchart,
+    node_class,
+)
+
+# Renderers of the image formats: "mermaid.ink" (mermaid package, needs network
+# access), "mmdc" (local mermaid-cli) and "builtin" (offline SVG layout)
+RENDERERS = ("mermaid.ink", "mmdc", "builtin")
+
+# Bump to invalidate the cached renderings when the output changes
+RENDERING_VERSION = 1
+
+CACHE_FILE = ".graph_cache.json"
+
+
+def graph_fingerprint(graph) -> str:
+    """
+    Returns a hash of a constraints graph: its nodes and its edges with their
+    offsets (in slots).
+    """
+    nodes = sorted(graph.nodes)
+    edges = sorted(
+        (
+            start,
+            end,
+            graph.edges[start, end].get("min_offset_slots"),
+            graph.edges[start, end].get("max_offset_slots"),
+        )
+        for start, end in graph.edges
+    )
+    data = json.dumps([nodes, edges], default=str, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+# OFFLINE SVG RENDERER
+
+
+def _layers(graph):
+    """
+    Returns the nodes of a graph by layer, the layer of a node being the longest
+    path to it in the graph of its strongly connected components.
+    """
+    condensation = nx.condensation(graph)
+    component_layer = {}
+    for component in nx.topological_sort(condensation):
+        predecessors = list(condensation.predecessors(component))
+        component_layer[component] = (
+            1 + max(component_layer[p] for p in predecessors) if predecessors else 0
+        )
+    mapping = condensation.graph["mapping"]
+    n_layers = max(component_layer.values(), default=-1) + 1
+    layers = [[] for _ in range(n_layers)]
+    for node in graph.nodes:
+        layers[component_layer[mapping[node]]].append(node)
+    # Orders each layer by the mean position of the predecessors of its nodes
+    position = {}
+
+    def barycenter(node):
+        positions = [position[p] for p in graph.predecessors(node) if p in position]
+        return sum(positions) / len(positions) if positions else 0.0
+
+    for layer in layers:
+        layer.sort(key=barycenter)
+        for i, node in enumerate(layer):
+            position[node] = i - (len(layer) - 1) / 2
+    return layers
+
+
+def graph_to_svg(graph, title="Constraints Graph") -> str:
+    """
+    Renders a constraints graph as a top to bottom layered SVG flowchart, without
+    any external dependency.
+    """
+    char_width, node_height = 8, 30
+    layer_gap, node_gap, margin, title_height = 90, 40, 20, 40
+    layers = _layers(graph)
+    widths = {n: max(60, char_width * len(str(n)) + 20) for n in graph.nodes}
+    layers_widths = [
+        sum(widths[n] for n in layer) + node_gap * (len(layer) - 1) for layer in layers
+    ]
+    width = max(layers_widths + [char_width * len(title)]) + 2 * margin
+    height = title_height + len(layers) * (node_height + layer_gap) + margin
+    boxes = {}
+    for i, layer in enumerate(layers):
+        x = margin + (width - 2 * margin - layers_widths[i]) / 2
+        y = title_height + margin + i * (node_height + layer_gap)
+        for node in layer:
+            boxes[node] = (x, y, widths[node])
+            x += widths[node] + node_gap
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" '
+        f'height="{height:.0f}" viewBox="0 0 {width:.0f} {height:.0f}" '
+        'font-family="sans-serif" font-size="12">',
+        '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" '
+        'markerWidth="8" markerHeight="8" orient="auto-start-reverse">'
+        '<path d="M 0 0 L 10 5 L 0 10 z" fill="#333"/></marker></defs>',
+        f'<text x="{margin}" y="{margin + 8}" font-size="18" '
+        f'font-weight="bold">{escape(title)}</text>',
+    ]
+    for start, end in graph.edges:
+        x1, y1, w1 = boxes[start]
+        x2, y2, w2 = boxes[end]
+        x1, x2 = x1 + w1 / 2, x2 + w2 / 2
+        if y2 > y1:
+            y1, y2 = y1 + node_height, y2
+        elif y2 < y1:
+            y2 = y2 + node_height
+        else:
+            y1, y2 = y1 + node_height / 2, y2 + node_height / 2
+        out.append(
+            f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+            'stroke="#333" marker-end="url(#arrow)"/>'
+        )
+        label = edge_label(graph.edges[start, end])
+        if label is not None:
+            out.append(
+                f'<text x="{(x1 + x2) / 2:.1f}" y="{(y1 + y2) / 2:.1f}" '
+                'text-anchor="middle" font-size="10" fill="#555">'
+                f"{escape(label)}</text>"
+            )
+    for node, (x, y, w) in boxes.items():
+        color = NODE_CLASSES_COLORS.get(node_class(node), "#ececff")
+        out.append(
+            f'<rect x="{x:.1f}" y="{y:.1f}" width="{w}" height="{node_height}" '
+            f'rx="4" fill="{color}" stroke="#333"/>'
+            f'<text x="{x + w / 2:.1f}" y="{y + node_height / 2 + 4:.1f}" '
+            f'text-anchor="middle">{escape(str(node))}</text>'
+        )
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+def _render_mmdc(graph, path, executable="mmdc"):
+    """
+    Renders a constraints graph with a local mermaid-cli, the format being
+    given by the extension of `path`.
+    """
+    script = mermaid_flowchart(graph)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "graph.mmd")
+        with open(source, "w") as f:
+            f.write(script)
+        subprocess.run(
+            [executable, "-i", source, "-o", path],
+            check=True,
+            capture_output=True,
+        )
+
+
+def render_graph(
+    graph, path, title="Constraints Graph", format="html", renderer="mermaid.ink"
+):
+    """
+    Renders a constraints graph to `path` as HTML (Mermaid script, rendered by
+    the browser) or as a PNG or SVG image with a renderer of RENDERERS.
+    """
+    if format == "html":
+        graph_to_mermaid(graph, path, title=title, format="html")
+    elif format not in ["png", "svg"]:
+        raise ValueError(f"Unknown graph format {format}")
+    elif renderer == "builtin":
+        if format != "svg":
+            raise ValueError("The builtin renderer only renders SVG images")
+        with open(path, "w") as f:
+            f.write(graph_to_svg(graph, title=title))
+    elif renderer == "mmdc":
+        _render_mmdc(graph, path)
+    elif renderer == "mermaid.ink":
+        if format == "png":
+            graph_to_mermaid(graph, path, title=title, format="png")
+        else:
+            from mermaid import Mermaid
+            from mermaid.graph import Graph
+
+            script = mermaid_flowchart(graph)
+            Mermaid(Graph(title="simple graph", script=script)).to_svg(path)
+    else:
+        raise ValueError(f"Unknown graph renderer {renderer}")
+    return path
+
+
+class GraphRenderingCache:
+    """
+    On-disk index of the rendered graphs: the key (graph fingerprint, title,
+    format and renderer) of each rendered file, stored as JSON in the output
+    directory.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, CACHE_FILE)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(graph, title, format, renderer):
+        fingerprint = graph_fingerprint(graph)
+        return f"{fingerprint}:{title}:{format}:{renderer}:{RENDERING_VERSION}"
+
+    def is_fresh(self, path, key):
+        name = os.path.basename(path)
+        return self.entries.get(name) == key and os.path.exists(path)
+
+    def update(self, path, key):
+        self.entries[os.path.basename(path)] = key
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+
+
+def render_graphs(
+    graphs,
+    output_dir,
+    formats=("html", "png"),
+    renderer="mermaid.ink",
+    max_workers=8,
+    use_cache=True,
+    verbose=True,
+):
+    """
+    Renders constraints graphs to `output_dir/<name>_graph.<format>`, skipping
+    the files whose graph did not change since they were rendered and rendering
+    the others in a pool of threads (renderers wait on the network or on a
+    subprocess).
+
+    Parameters:
+    graphs (dict): The graphs by name, as (graph, title) tuples.
+    output_dir (str): The output directory, holding the cache index.
+    formats (iterable): "html", "png" and / or "svg".
+    renderer (str): The image renderer, one of RENDERERS.
+    max_workers (int): The number of rendering threads.
+    use_cache (bool): Renders every graph if False.
+    verbose (bool): Prints the number of rendered and cached graphs.
+
+    Returns:
+    dict: The path of each (name, format).
+    """
+    if renderer not in RENDERERS:
+        raise ValueError(f"Unknown graph renderer {renderer}")
+    if renderer == "mmdc" and shutil.which("mmdc") is None:
+        raise RuntimeError("mermaid-cli (mmdc) is not installed")
+    create_directory(output_dir)
+    cache = GraphRenderingCache(output_dir)
+    paths = {}
+    tasks = []
+    for name, (graph, title) in graphs.items():
+        for format in formats:
+            path = os.path.join(output_dir, f"{name}_graph.{format}")
+            paths[name, format] = path
+            key = cache.key(graph, title, format, renderer)
+            if use_cache and cache.is_fresh(path, key):
+                continue
+            tasks.append((graph, path, title, format, key))
+
+    def render(task):
+        graph, path, title, format, key = task
+        render_graph(graph, path, title=title, format=format, renderer=renderer)
+        return path, key
+
+    failures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(render, task) for task in tasks]
+        for task, future in zip(tasks, futures):
+            try:
+                cache.update(*future.result())
+            except Exception as error:
+                failures.append((task[1], error))
+    cache.save()
+    if verbose:
+        print(
+            f"GRAPHS: {len(tasks) - len(failures)} rendered, "
+            f"{len(paths) - len(tasks)} unchanged => {Messages.SUCCESS}"
+        )
+        for path, error in failures:
+            print(f"    GRAPHS: failed to render {path}: {error} => {Messages.ERROR}")
+    return paths
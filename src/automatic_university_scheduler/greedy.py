@@ -0,0 +1,280 @@
+import time
+from dataclasses import dataclass
+import numpy as np
+from automatic_university_scheduler.multiresolution import hinted_snapshot
+from automatic_university_scheduler.optimize import (
+    kinds_start_masks,
+    room_combinations,
+)
+from automatic_university_scheduler.propagation import (
+    activities_bounds,
+    empty_windows,
+    propagate_start_windows,
+)
+from automatic_university_scheduler.snapshot import UNSET, project_snapshot
+from automatic_university_scheduler.utils import Messages
+
+
+@dataclass(frozen=True, eq=False)
+class GreedySchedule:
+    """
+    A schedule built by `greedy_schedule`: the start slot and the allocated rooms
+    and teachers labels of each placed activity id, the ids of the activities
+    that could not be placed being listed in `unplaced`.
+    """
+
+    starts: dict
+    rooms: dict
+    teachers: dict
+    unplaced: list
+
+    def hinted_snapshot(self, project, window=None):
+        """
+        Returns the snapshot of a project hinted with the schedule (see
+        `multiresolution.hinted_snapshot`).
+        """
+        return hinted_snapshot(
+            project, self.starts, self.rooms, self.teachers, window=window
+        )
+
+
+def free_starts(busy, duration):
+    """
+    Returns a boolean array of the length of `busy` which is True on the slots an
+    activity of `duration` slots can start at without meeting a busy slot nor
+    the end of the array.
+    """
+    counts = np.concatenate([[0], np.cumsum(busy)])
+    out = np.zeros(len(busy), dtype=bool)
+    last = len(busy) - duration
+    if last >= 0:
+        out[: last + 1] = counts[duration:] == counts[: last + 1]
+    return out
+
+
+def precedence_depths(project, edges):
+    """
+    Returns the depth of each activity id in the starts after constraints graph,
+    0 for activities starting after no other. Depths are capped by the number of
+    activities on cycles.
+    """
+    depths = dict.fromkeys(project.activity_ids.tolist(), 0)
+    for _ in range(len(depths)):
+        changed = False
+        for _, from_ids, to_ids, _, _ in edges:
+            depth = max(depths[i] for i in from_ids) + 1
+            for i in to_ids:
+                if depth > depths[i]:
+                    depths[i] = depth
+                    changed = True
+        if not changed:
+            break
+    return depths
+
+
+def greedy_schedule(project, verbose=True):
+    """
+    Builds a schedule in one pass, without search. Activities are taken by
+    precedence depth, then from the scarcest in ressources alternatives, and
+    placed at the earliest legal slot: within their start window, at an allowed
+    daily slot of their kind, in the open slots of the week structure if they
+    have students, away from the static activities and the already placed
+    activities of their students, teachers and rooms, and meeting the starts
+    after constraints with the placed activities. The teachers and the smallest
+    rooms combination free at this slot are allocated.
+
+    Parameters:
+    project (Project or ProjectSnapshot): The project.
+    verbose (bool): Prints the number of placed activities.
+
+    Returns:
+    GreedySchedule: The schedule.
+    """
+    t0 = time.time()
+    project = project_snapshot(project)
+    horizon = project.horizon
+    activity_ids = project.activity_ids.tolist()
+    room_ids = project.room_ids.tolist()
+    teacher_ids = project.teacher_ids.tolist()
+    rooms_labels = dict(zip(room_ids, project.room_labels))
+    teachers_labels = dict(zip(teacher_ids, project.teacher_labels))
+    room_capacities = dict(zip(room_ids, project.room_capacities.tolist()))
+    headcounts = project.students_group_headcounts[
+        project.activity_students_groups
+    ].tolist()
+    activities_students = project.activity_students.tolists()
+    room_pools = project.activity_room_pools.tolists()
+    teacher_pools = project.activity_teacher_pools.tolists()
+    kinds_starts = kinds_start_masks(project)
+    durations = dict(zip(activity_ids, project.activity_durations.tolist()))
+
+    # START WINDOWS: the earliest and latest starts alone if the propagated
+    # windows prove the project infeasible, to place as many activities as
+    # possible.
+    edges = project.precedence_edges()
+    windows, _ = propagate_start_windows(project, edges)
+    if len(empty_windows(windows)) > 0:
+        windows = {
+            aid: [
+                0 if earliest is None else earliest,
+                horizon - duration if latest is None else latest,
+            ]
+            for aid, duration, earliest, latest in activities_bounds(project)
+        }
+    successors = {aid: [] for aid in activity_ids}
+    predecessors = {aid: [] for aid in activity_ids}
+    for _, from_ids, to_ids, min_offset, max_offset in edges:
+        for i in from_ids:
+            successors[i].append((to_ids, min_offset, max_offset))
+        for i in to_ids:
+            predecessors[i].append((from_ids, min_offset, max_offset))
+
+    # OCCUPANCY BITMAPS: static activities (enforced on the ressources owning
+    # more than one of them, as in the CP model), then placed activities.
+    busy = {}
+    for kind, ressource_ids in (
+        ("students", project.atomic_student_ids.tolist()),
+        ("teachers", teacher_ids),
+        ("rooms", room_ids),
+    ):
+        busy[kind] = {rid: np.zeros(horizon, dtype=bool) for rid in ressource_ids}
+        for rid, occurrences in project.static_intervals(kind).items():
+            if len(occurrences) > 1:
+                for start, end in occurrences:
+                    busy[kind][rid][max(start, 0) : max(end, 0)] = True
+    closed = ~project.calendar.available[:horizon]
+    atomic_student_ids = project.atomic_student_ids.tolist()
+
+    # ORDER: precedence depth, then scarcity of the ressources alternatives
+    depths = precedence_depths(project, edges)
+    room_alternatives = {}
+    order = []
+    for i, aid in enumerate(activity_ids):
+        pool = [room_ids[j] for j in room_pools[i]]
+        combinations = room_combinations(
+            pool,
+            int(project.activity_room_counts[i]),
+            room_capacities,
+            headcounts[i],
+        )
+        # Smallest rooms first, those of unknown capacity last
+        combinations.sort(
+            key=lambda c: sum(
+                np.inf if room_capacities[r] == UNSET else room_capacities[r] for r in c
+            )
+        )
+        room_alternatives[aid] = combinations
+        teacher_count = int(project.activity_teacher_counts[i])
+        scarcity = len(combinations) * (len(teacher_pools[i]) - teacher_count + 1)
+        order.append((depths[aid], scarcity, -durations[aid], i))
+    order.sort()
+
+    starts, rooms, teachers, unplaced = {}, {}, {}, []
+    for _, _, _, i in order:
+        aid = activity_ids[i]
+        duration = durations[aid]
+        first, last = windows[aid]
+        first, last = max(first, 0), min(last, horizon - duration)
+        for from_ids, min_offset, max_offset in predecessors[aid]:
+            for j in from_ids:
+                if j in starts:
+                    end = starts[j] + durations[j]
+                    if min_offset is not None:
+                        first = max(first, end + min_offset)
+                    if max_offset is not None:
+                        last = min(last, end + max_offset)
+        for to_ids, min_offset, max_offset in successors[aid]:
+            for j in to_ids:
+                if j in starts:
+                    if min_offset is not None:
+                        last = min(last, starts[j] - min_offset - duration)
+                    if max_offset is not None:
+                        first = max(first, starts[j] - max_offset - duration)
+        if first > last:
+            unplaced.append(aid)
+            continue
+        candidates = np.zeros(horizon, dtype=bool)
+        candidates[first : last + 1] = kinds_starts[project.activity_kinds[i]][
+            first : last + 1
+        ]
+        students = [atomic_student_ids[j] for j in activities_students[i]]
+        if len(students) > 0:
+            students_busy = closed.copy()
+            for sid in students:
+                students_busy |= busy["students"][sid]
+            candidates &= free_starts(students_busy, duration)
+        pool = [teacher_ids[j] for j in teacher_pools[i]]
+        teacher_count = int(project.activity_teacher_counts[i])
+        teachers_free = {
+            tid: free_starts(busy["teachers"][tid], duration) for tid in pool
+        }
+        if teacher_count > 0:
+            candidates &= np.sum(list(teachers_free.values()), axis=0) >= (
+                teacher_count
+            )
+        rooms_free = {
+            rid: free_starts(busy["rooms"][rid], duration)
+            for combination in room_alternatives[aid]
+            for rid in combination
+        }
+        combinations_free = [
+            np.logical_and.reduce([rooms_free[rid] for rid in combination])
+            if len(combination) > 0
+            else np.ones(horizon, dtype=bool)
+            for combination in room_alternatives[aid]
+        ]
+        if len(combinations_free) > 0:
+            candidates &= np.logical_or.reduce(combinations_free)
+        else:
+            candidates[:] = False
+        legal = np.flatnonzero(candidates)
+        if len(legal) == 0:
+            unplaced.append(aid)
+            continue
+        start = int(legal[0])
+        chosen_teachers = [tid for tid in pool if teachers_free[tid][start]][
+            :teacher_count
+        ]
+        chosen_rooms = next(
+            combination
+            for combination, free in zip(room_alternatives[aid], combinations_free)
+            if free[start]
+        )
+        slots = slice(start, start + duration)
+        for sid in students:
+            busy["students"][sid][slots] = True
+        for tid in chosen_teachers:
+            busy["teachers"][tid][slots] = True
+        for rid in chosen_rooms:
+            busy["rooms"][rid][slots] = True
+        starts[aid] = start
+        rooms[aid] = [rooms_labels[rid] for rid in chosen_rooms]
+        teachers[aid] = [teachers_labels[tid] for tid in chosen_teachers]
+
+    if verbose:
+        status = Messages.SUCCESS if len(unplaced) == 0 else Messages.WARNING
+        print(
+            f"  Greedy schedule: {len(starts)}/{len(activity_ids)} activities "
+            f"placed in {time.time() - t0:.2f} s => {status}"
+        )
+    return GreedySchedule(
+        starts=starts, rooms=rooms, teachers=teachers, unplaced=unplaced
+    )
+
+
+def export_schedule_to_database(session, project, schedule):
+    """
+    Writes the starts and allocations of a greedy schedule to a project, the
+    starts and allocations of the unplaced activities being cleared.
+    """
+    rooms = {r.label: r for r in project.rooms}
+    teachers = {t.label: t for t in project.teachers}
+    for activity in project.activities:
+        activity.start = schedule.starts.get(activity.id)
+        activity.allocated_rooms = [
+            rooms[label] for label in schedule.rooms.get(activity.id, [])
+        ]
+        activity.allocated_teachers = [
+            teachers[label] for label in schedule.teachers.get(activity.id, [])
+        ]
+    session.commit()
@@ -0,0 +1,428 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+import yaml
+from sqlalchemy import delete, or_, select
+from automatic_university_scheduler.database import (
+    Activity,
+    ActivityGroup,
+    Base,
+    Course,
+    ModelFile,
+    Project,
+    Room,
+    StartsAfterConstraint,
+    activity_groups_association_table,
+    activity_room_allocation_association_table,
+    activity_room_pool_association_table,
+    activity_teacher_allocation_association_table,
+    activity_teacher_pool_association_table,
+)
+from automatic_university_scheduler.model_schema import ModelError, model_errors
+from automatic_university_scheduler.preprocessing import (
+    activity_arguments,
+    create_course_groups_and_constraints,
+    create_project,
+    resolve_room_pools,
+    room_capacity,
+)
+from automatic_university_scheduler.utils import (
+    create_directory,
+    create_instance,
+    load_yaml,
+    Messages,
+)
+
+# A model directory holds the shared sections of model.yaml (setup, aliases,
+# students, teachers, managers and planners) in PROJECT_FILE and one file per
+# course, {label: course data}, in COURSES_DIRECTORY.
+PROJECT_FILE = "project.yaml"
+COURSES_DIRECTORY = "courses"
+
+
+def write_model_directory(model, directory):
+    """
+    Splits a model (the content of a model.yaml file) into a model directory.
+    """
+    create_directory(os.path.join(directory, COURSES_DIRECTORY))
+    shared = {key: value for key, value in model.items() if key != "courses"}
+    with open(os.path.join(directory, PROJECT_FILE), "w") as f:
+        yaml.safe_dump(shared, f, sort_keys=False, allow_unicode=True)
+    for label, course_data in model["courses"].items():
+        path = os.path.join(directory, COURSES_DIRECTORY, f"{label}.yaml")
+        with open(path, "w") as f:
+            yaml.safe_dump({label: course_data}, f, sort_keys=False, allow_unicode=True)
+
+
+def _model_files(directory):
+    """
+    Returns the content of the files of a model directory by path relative to
+    `directory`, PROJECT_FILE first.
+    """
+    paths = [PROJECT_FILE] + [
+        f"{COURSES_DIRECTORY}/{name}"
+        for name in sorted(os.listdir(os.path.join(directory, COURSES_DIRECTORY)))
+        if name.endswith((".yaml", ".yml"))
+    ]
+    contents = {}
+    for path in paths:
+        with open(os.path.join(directory, path), "rb") as f:
+            contents[path] = f.read()
+    return contents
+
+
+def _sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def _parse_document(content):
+    try:
+        return load_yaml(content), None
+    except yaml.YAMLError as error:
+        return None, str(error)
+
+
+def parse_yaml_files(contents, max_workers=None):
+    """
+    Parses YAML documents with a pool of `max_workers` processes (default: one
+    per CPU).
+
+    Parameters:
+    contents (dict): The content (bytes) of the documents by path.
+
+    Returns:
+    tuple: The parsed documents by path and the list of (path, message) parsing
+    errors.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1 or len(contents) < 2:
+        results = [_parse_document(content) for content in contents.values()]
+    else:
+        chunksize = max(1, len(contents) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(_parse_document, contents.values(), chunksize=chunksize)
+            )
+    documents = {}
+    errors = []
+    for path, (data, error) in zip(contents, results):
+        if error is None:
+            documents[path] = data
+        else:
+            errors.append((path, error))
+    return documents, errors
+
+
+def _read_courses(documents, errors, courses=None):
+    """
+    Extracts the courses of parsed course files, each of which must define exactly
+    one course, and returns the course label of each file.
+    """
+    courses = {} if courses is None else courses
+    labels = {}
+    for path, data in documents.items():
+        if type(data) != dict or len(data) != 1:
+            errors.append((path, "must define exactly one course"))
+            continue
+        label, course_data = next(iter(data.items()))
+        if label in courses:
+            errors.append((path, f"course {label} is defined twice"))
+            continue
+        courses[label] = course_data
+        labels[path] = label
+    return courses, labels
+
+
+def read_model_directory(directory, max_workers=None):
+    """
+    Reads and validates a model directory, the course files being parsed by a
+    pool of `max_workers` processes (see parse_yaml_files).
+
+    Returns:
+    tuple: The model, as read from a model.yaml file, and the (sha256, course
+    label) of each file by path relative to `directory` (the course label of
+    PROJECT_FILE being None).
+
+    Raises:
+    ModelError: Listing all the parsing and validation errors.
+    """
+    contents = _model_files(directory)
+    documents, errors = parse_yaml_files(contents, max_workers)
+    model = documents.pop(PROJECT_FILE, None)
+    courses, labels = _read_courses(documents, errors)
+    files = {path: (_sha256(contents[path]), labels.get(path)) for path in contents}
+    if type(model) == dict:
+        model["courses"] = courses
+        errors += model_errors(model)
+    elif PROJECT_FILE in documents:
+        errors.append((PROJECT_FILE, "expected a mapping"))
+    if len(errors) > 0:
+        raise ModelError(errors)
+    return model, files
+
+
+def _delete_groups(session, course_ids):
+    """
+    Deletes the activity groups owned by courses and the starts after
+    constraints between them.
+    """
+    group_ids = select(ActivityGroup.id).where(ActivityGroup.course_id.in_(course_ids))
+    session.execute(
+        delete(StartsAfterConstraint).where(
+            or_(
+                StartsAfterConstraint.from_activity_group_id.in_(group_ids),
+                StartsAfterConstraint.to_activity_group_id.in_(group_ids),
+            )
+        )
+    )
+    session.execute(
+        delete(activity_groups_association_table).where(
+            activity_groups_association_table.c.activity_group_id.in_(group_ids)
+        )
+    )
+    session.execute(
+        delete(ActivityGroup).where(ActivityGroup.course_id.in_(course_ids))
+    )
+
+
+def _delete_activities(session, activity_ids):
+    """
+    Deletes activities and their pools, allocations and groups memberships.
+    """
+    for table in (
+        activity_room_pool_association_table,
+        activity_room_allocation_association_table,
+        activity_teacher_pool_association_table,
+        activity_teacher_allocation_association_table,
+        activity_groups_association_table,
+    ):
+        session.execute(delete(table).where(table.c.activity_id.in_(activity_ids)))
+    session.execute(delete(Activity).where(Activity.id.in_(activity_ids)))
+
+
+def _full_load(session, model, files, label):
+    """
+    Recreates the database and loads a whole model into it.
+    """
+    bind = session.get_bind()
+    session.close()
+    Base.metadata.drop_all(bind)
+    Base.metadata.create_all(bind)
+    project = create_project(session, model, label=label, validate=False)
+    for path, (sha256, course) in files.items():
+        session.add(ModelFile(project=project, path=path, course=course, sha256=sha256))
+    session.commit()
+    return project
+
+
+def load_model_directory(
+    session, directory, label="project", max_workers=None, verbose=True
+):
+    """
+    Loads a model directory into the database, incrementally when possible.
+
+    A hash of each file is stored in the database. If the project file changed
+    (or the project does not exist yet), the database is recreated and the whole
+    model is loaded. Otherwise, only the courses of the changed, new and removed
+    course files are reloaded: their activities are updated in place (their
+    starts and allocations being reset) and their groups and constraints are
+    recreated, as well as the groups of the courses whose foreign groups refer
+    to them. The activities of the other courses, starts included, are left
+    untouched. The parsed files are validated before anything is written.
+
+    Returns:
+    tuple: The project and the sorted labels of the reloaded courses (all of
+    them on a full load).
+
+    Raises:
+    ModelError: Listing all the parsing and validation errors.
+    """
+    contents = _model_files(directory)
+    hashes = {path: _sha256(content) for path, content in contents.items()}
+    Base.metadata.create_all(session.get_bind())
+    project = (
+        session.execute(select(Project).where(Project.label == label)).scalars().first()
+    )
+    stored = {} if project is None else {f.path: f for f in project.model_files}
+    if project is None or (
+        PROJECT_FILE not in stored
+        or stored[PROJECT_FILE].sha256 != hashes[PROJECT_FILE]
+    ):
+        model, files = read_model_directory(directory, max_workers)
+        project = _full_load(session, model, files, label)
+        if verbose:
+            print(
+                f"MODEL: {len(model['courses'])} courses loaded => {Messages.SUCCESS}"
+            )
+        return project, sorted(model["courses"])
+
+    # Only the changed files are parsed: the courses depending on them are
+    # found in the database, through their groups.
+    changed_files = [
+        path
+        for path, sha256 in hashes.items()
+        if path not in stored or stored[path].sha256 != sha256
+    ]
+    removed_files = [path for path in stored if path not in hashes]
+    if len(changed_files) == 0 and len(removed_files) == 0:
+        if verbose:
+            print(f"MODEL: up to date => {Messages.SUCCESS}")
+        return project, []
+    files = {
+        path: (hashes[path], stored[path].course)
+        for path in hashes
+        if path not in changed_files
+    }
+    documents, errors = parse_yaml_files(
+        {path: contents[path] for path in changed_files}, max_workers
+    )
+    courses_data, labels = _read_courses(documents, errors)
+    for path in changed_files:
+        files[path] = (hashes[path], labels.get(path))
+    for path, (_, course_label) in files.items():
+        if course_label in courses_data and labels.get(path) != course_label:
+            errors.append((path, f"course {course_label} is defined twice"))
+    if len(errors) > 0:
+        raise ModelError(errors)
+    changed = set(courses_data)
+    removed = {
+        stored[path].course for path in removed_files + changed_files if path in stored
+    } - {course for _, course in files.values()}
+    touched = changed | removed
+    courses = {c.label: c for c in project.courses}
+    touched_ids = [courses[c].id for c in touched if c in courses]
+    dependents = set(
+        session.execute(
+            select(Course.label)
+            .join(ActivityGroup, ActivityGroup.course_id == Course.id)
+            .join(ActivityGroup.activities)
+            .where(Activity.course_id.in_(touched_ids))
+            .where(Course.id.not_in(touched_ids))
+        ).scalars()
+    )
+    paths = {course: path for path, (_, course) in files.items()}
+    documents, errors = parse_yaml_files(
+        {paths[course]: contents[paths[course]] for course in dependents}, max_workers
+    )
+    _read_courses(documents, errors, courses_data)
+    rebuilt = changed | dependents
+    model = load_yaml(contents[PROJECT_FILE])
+    model["courses"] = courses_data
+    known_activities = [
+        (course_label, activity_label)
+        for course_label, activity_label in session.execute(
+            select(Course.label, Activity.label)
+            .join(Activity.course)
+            .where(Activity.project_id == project.id)
+        )
+        if course_label not in courses_data and course_label not in removed
+    ]
+    errors += model_errors(model, known_activities)
+    if len(errors) > 0:
+        raise ModelError(errors)
+
+    # BULK DELETIONS: groups and constraints of the rebuilt and removed courses,
+    # activities of the removed courses and activities removed from a course
+    session.execute(
+        delete(ModelFile).where(
+            ModelFile.project_id == project.id, ModelFile.path.in_(removed_files)
+        )
+    )
+    _delete_groups(session, [courses[c].id for c in rebuilt | removed if c in courses])
+    obsolete = [
+        a.id
+        for c in touched
+        if c in courses
+        for a in courses[c].activities
+        if c in removed or a.label not in courses_data[c]["activities"]
+    ]
+    _delete_activities(session, obsolete)
+    session.execute(
+        delete(Course).where(Course.project_id == project.id, Course.label.in_(removed))
+    )
+    session.flush()
+    session.expire_all()
+
+    # UPSERTS of the changed courses and their activities
+    changed_data = {c: courses_data[c] for c in courses_data if c in changed}
+    rooms = {r.label: r for r in project.rooms}
+    for room_label in sorted(
+        resolve_room_pools(changed_data, model["aliases"]["room_pools"])
+    ):
+        if room_label not in rooms:
+            rooms[room_label] = create_instance(
+                session,
+                Room,
+                label=room_label,
+                project=project,
+                capacity=room_capacity(model.get("rooms"), room_label),
+            )
+    teachers = {t.label: t for t in project.teachers}
+    managers = {m.label: m for m in project.managers}
+    planners = {p.label: p for p in project.planners}
+    students_groups = {g.label: g for g in project.students_groups}
+    activity_kinds = {k.label: k for k in project.activity_kinds}
+    courses = {c.label: c for c in project.courses}
+    activities_dic = {(a.course.label, a.label): a for a in project.activities}
+    for course_label, course_data in changed_data.items():
+        manager = managers[course_data["manager"]]
+        planner = planners[course_data["planner"]]
+        course = courses.get(course_label)
+        if course is None:
+            course = create_instance(
+                session, Course, label=course_label, project=project
+            )
+            courses[course_label] = course
+        course.manager = manager
+        course.planner = planner
+        for activity_label, activity_data in course_data["activities"].items():
+            activity_args = activity_arguments(
+                project,
+                activity_label,
+                activity_data,
+                rooms,
+                teachers,
+                students_groups,
+                activity_kinds,
+            )
+            activity = activities_dic.get((course_label, activity_label))
+            if activity is None:
+                activity = create_instance(
+                    session, Activity, course=course, project=project, **activity_args
+                )
+                activities_dic[(course_label, activity_label)] = activity
+            else:
+                for key, value in activity_args.items():
+                    setattr(activity, key, value)
+                activity.start = None
+                activity.allocated_rooms = []
+                activity.allocated_teachers = []
+    for course_label in sorted(rebuilt):
+        create_course_groups_and_constraints(
+            session,
+            project,
+            courses[course_label],
+            courses_data[course_label],
+            activities_dic,
+            commit=False,
+        )
+
+    stored = {f.path: f for f in project.model_files}
+    for path in changed_files:
+        sha256, course = files[path]
+        if path in stored:
+            stored[path].sha256 = sha256
+            stored[path].course = course
+        else:
+            session.add(
+                ModelFile(project=project, path=path, course=course, sha256=sha256)
+            )
+    session.commit()
+    session.expire_all()
+    if verbose:
+        print(
+            f"MODEL: {len(changed)} courses reloaded, {len(removed)} removed, "
+            f"{len(dependents)} relinked => {Messages.SUCCESS}"
+        )
+    return project, sorted(changed)
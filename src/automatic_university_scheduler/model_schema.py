@@ -0,0 +1,383 @@
+from automatic_university_scheduler.datetimeutils import DateTime as DT
+from automatic_university_scheduler.datetimeutils import TimeDelta
+
+# A schema is made of:
+# - types (or tuples of types), checked with isinstance,
+# - [item schema] for lists,
+# - {key: schema} for mappings with fixed keys, "key?" marking optional ones
+#   (other keys are ignored),
+# - {str: schema} for mappings of labels,
+# - functions returning an error message (or None) for leaf values.
+# It is compiled once into nested check(value, path, errors) functions that
+# append every (path, message) error found.
+
+
+class ModelError(ValueError):
+    """
+    Raised when a model is invalid, with the list of all the (path, message)
+    errors found in `errors`.
+    """
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        lines = "\n".join(f"  {path}: {message}" for path, message in self.errors)
+        super().__init__(f"{len(self.errors)} error(s) in the model:\n{lines}")
+
+
+def _type_name(value):
+    return "null" if value is None else type(value).__name__
+
+
+def _count(value):
+    if type(value) != int or value < 0:
+        return f"expected a non negative integer, got {value!r}"
+
+
+def _duration(value):
+    if type(value) == int:
+        if value <= 0:
+            return f"expected a positive duration, got {value!r}"
+    elif type(value) == str:
+        try:
+            TimeDelta.from_str(value)
+        except (KeyError, ValueError):
+            return f"invalid duration {value!r}"
+    else:
+        return f"expected a duration, got {_type_name(value)}"
+
+
+def _offset(value):
+    if value is None or value == 0:
+        return None
+    return _duration(value)
+
+
+def _datetime(value):
+    if type(value) != str:
+        return f"expected a date time string, got {_type_name(value)}"
+    try:
+        DT.from_str(value)
+    except ValueError:
+        return f"invalid date time {value!r}"
+
+
+def _week_day(value):
+    if type(value) != str or set(value) - set("01 "):
+        return f"expected a string of 0 and 1, got {value!r}"
+
+
+def _room_pool(value):
+    if type(value) == str:
+        return None
+    if type(value) != list or not all(type(room) == str for room in value):
+        return f"expected a room pool alias or a list of rooms, got {value!r}"
+
+
+def _activity_reference(value):
+    if (
+        type(value) != list
+        or len(value) != 2
+        or not all(type(label) == str for label in value)
+    ):
+        return f"expected a [course, activity] pair, got {value!r}"
+
+
+UNAVAILABLE_SCHEMA = [
+    {
+        "kind?": str,
+        "label?": str,
+        "start": _datetime,
+        "end": _datetime,
+        "repeat?": _count,
+        "offset?": _offset,
+    }
+]
+PERSON_SCHEMA = {"full_name": str, "email?": str}
+ACTIVITY_SCHEMA = {
+    "kind": str,
+    "duration": _duration,
+    "teachers": {"pool": [str], "count": _count},
+    "rooms": {"pool": _room_pool, "count": _count},
+    "students": str,
+    "earliest_start?": _datetime,
+    "latest_start?": _datetime,
+}
+COURSE_SCHEMA = {
+    "manager": str,
+    "planner": str,
+    "activities": {str: ACTIVITY_SCHEMA},
+    "inner_activity_groups": {str: [str]},
+    "foreign_activity_groups?": {str: [_activity_reference]},
+    "constraints": [
+        {
+            "kind": str,
+            "activities": [str],
+            "start_after": [str],
+            "min_offset": _offset,
+            "max_offset?": _offset,
+        }
+    ],
+}
+MODEL_SCHEMA = {
+    "setup": {
+        "origin_datetime": _datetime,
+        "horizon_datetime": _datetime,
+        "week_structure": [_week_day],
+        "activity_kinds": {str: {"allowed_start_time_slots": [int]}},
+        "succession_constraint_relaxation_factor?": (int, float),
+    },
+    "aliases": {"room_pools": {str: [str]}},
+    "rooms?": {str: {"capacity": _count}},
+    "students": {
+        "groups": {str: [str]},
+        "headcounts?": {str: _count},
+        "constraints": {str: {"unavailable?": UNAVAILABLE_SCHEMA}},
+    },
+    "teachers": {str: dict(PERSON_SCHEMA, **{"unavailable?": UNAVAILABLE_SCHEMA})},
+    "managers": {str: PERSON_SCHEMA},
+    "planners": {str: PERSON_SCHEMA},
+    "courses": {str: COURSE_SCHEMA},
+}
+
+
+def compile_schema(schema):
+    """
+    Compiles a schema into a check(value, path, errors) function.
+    """
+    if isinstance(schema, list):
+        check_item = compile_schema(schema[0])
+
+        def check(value, path, errors):
+            if type(value) != list:
+                errors.append((path, f"expected a list, got {_type_name(value)}"))
+                return
+            for index, item in enumerate(value):
+                check_item(item, f"{path}[{index}]", errors)
+
+    elif isinstance(schema, dict) and str in schema:
+        check_value = compile_schema(schema[str])
+
+        def check(value, path, errors):
+            if type(value) != dict:
+                errors.append((path, f"expected a mapping, got {_type_name(value)}"))
+                return
+            for label, item in value.items():
+                check_value(item, f"{path}.{label}", errors)
+
+    elif isinstance(schema, dict):
+        fields = [
+            (key.rstrip("?"), key.endswith("?"), compile_schema(field_schema))
+            for key, field_schema in schema.items()
+        ]
+
+        def check(value, path, errors):
+            if type(value) != dict:
+                errors.append((path, f"expected a mapping, got {_type_name(value)}"))
+                return
+            for key, optional, check_field in fields:
+                if key in value:
+                    check_field(value[key], f"{path}.{key}", errors)
+                elif not optional:
+                    errors.append((f"{path}.{key}", "missing"))
+
+    elif isinstance(schema, (type, tuple)):
+        types = schema if isinstance(schema, tuple) else (schema,)
+        names = " or ".join(t.__name__ for t in types)
+
+        def check(value, path, errors):
+            # YAML booleans are not integers
+            if not isinstance(value, types) or (
+                type(value) == bool and bool not in types
+            ):
+                errors.append((path, f"expected {names}, got {_type_name(value)}"))
+
+    else:
+
+        def check(value, path, errors):
+            message = schema(value)
+            if message is not None:
+                errors.append((path, message))
+
+    return check
+
+
+_SECTIONS_CHECKS = {
+    section.rstrip("?"): compile_schema(schema)
+    for section, schema in MODEL_SCHEMA.items()
+    if section != "courses"
+}
+_OPTIONAL_SECTIONS = {
+    section.rstrip("?") for section in MODEL_SCHEMA if section.endswith("?")
+}
+_COURSE_CHECK = compile_schema(COURSE_SCHEMA)
+
+
+def _check_setup_references(setup, errors):
+    days = [day.replace(" ", "") for day in setup["week_structure"]]
+    if len({len(day) for day in days}) > 1:
+        errors.append(("setup.week_structure", "days have different lengths"))
+    slots_per_day = len(days[0]) if len(days) > 0 else 0
+    for kind, kind_data in setup["activity_kinds"].items():
+        for slot in kind_data["allowed_start_time_slots"]:
+            if not 1 <= slot <= slots_per_day:
+                errors.append(
+                    (
+                        f"setup.activity_kinds.{kind}.allowed_start_time_slots",
+                        f"slot {slot} is not in 1..{slots_per_day}",
+                    )
+                )
+    if DT.from_str(setup["horizon_datetime"]) <= DT.from_str(setup["origin_datetime"]):
+        errors.append(("setup.horizon_datetime", "not after origin_datetime"))
+
+
+def _check_course_references(label, course, labels, activities, errors):
+    """
+    Checks the labels a course refers to. `labels` holds the labels defined by
+    each section of the model (None for an invalid section, not checked).
+    """
+    path = f"courses.{label}"
+
+    def check_label(label_path, value, section, what):
+        if labels[section] is not None and value not in labels[section]:
+            errors.append((label_path, f"undefined {what} {value!r}"))
+
+    check_label(f"{path}.manager", course["manager"], "managers", "manager")
+    check_label(f"{path}.planner", course["planner"], "planners", "planner")
+    for activity_label, activity in course["activities"].items():
+        activity_path = f"{path}.activities.{activity_label}"
+        check_label(f"{activity_path}.kind", activity["kind"], "kinds", "kind")
+        check_label(
+            f"{activity_path}.students", activity["students"], "students", "group"
+        )
+        teachers = activity["teachers"]
+        for teacher in teachers["pool"]:
+            check_label(
+                f"{activity_path}.teachers.pool", teacher, "teachers", "teacher"
+            )
+        if teachers["count"] > len(teachers["pool"]):
+            errors.append(
+                (f"{activity_path}.teachers.count", "greater than the pool size")
+            )
+        rooms = activity["rooms"]
+        pool = rooms["pool"]
+        if type(pool) == str:
+            check_label(f"{activity_path}.rooms.pool", pool, "room_pools", "alias")
+            pool = (labels["room_pools"] or {}).get(pool)
+        if pool is not None and rooms["count"] > len(pool):
+            errors.append(
+                (f"{activity_path}.rooms.count", "greater than the pool size")
+            )
+
+    groups = set(course["inner_activity_groups"])
+    for group, group_activities in course["inner_activity_groups"].items():
+        for activity in group_activities:
+            if (label, activity) not in activities:
+                errors.append(
+                    (
+                        f"{path}.inner_activity_groups.{group}",
+                        f"undefined activity {activity!r}",
+                    )
+                )
+    foreign_groups = course.get("foreign_activity_groups", {})
+    groups.update(foreign_groups)
+    for group, references in foreign_groups.items():
+        for course_label, activity in references:
+            if (course_label, activity) not in activities:
+                errors.append(
+                    (
+                        f"{path}.foreign_activity_groups.{group}",
+                        f"undefined activity {course_label}/{activity}",
+                    )
+                )
+    for index, constraint in enumerate(course["constraints"]):
+        for key in ("activities", "start_after"):
+            for group in constraint[key]:
+                if group not in groups:
+                    errors.append(
+                        (
+                            f"{path}.constraints[{index}].{key}",
+                            f"undefined activity group {group!r}",
+                        )
+                    )
+
+
+def model_errors(model, known_activities=()):
+    """
+    Validates a model, typically read from a model.yaml file, against
+    MODEL_SCHEMA and checks the labels it refers to.
+
+    Parameters:
+    model (dict): The model.
+    known_activities (iterable): (course label, activity label) of activities
+        defined outside of the model that foreign groups can refer to.
+
+    Returns:
+    list: All the (path, message) errors found, empty for a valid model.
+    """
+    if type(model) != dict:
+        return [("", f"expected a mapping, got {_type_name(model)}")]
+    errors = []
+    valid = {}
+    for section, check in _SECTIONS_CHECKS.items():
+        count = len(errors)
+        if section in model:
+            check(model[section], section, errors)
+        elif section not in _OPTIONAL_SECTIONS:
+            errors.append((section, "missing"))
+        valid[section] = len(errors) == count
+
+    courses = model.get("courses")
+    if type(courses) != dict:
+        errors.append(("courses", f"expected a mapping, got {_type_name(courses)}"))
+        return errors
+    valid_courses = {}
+    for label, course in courses.items():
+        count = len(errors)
+        _COURSE_CHECK(course, f"courses.{label}", errors)
+        if len(errors) == count:
+            valid_courses[label] = course
+
+    # REFERENCES, only to and from structurally valid sections
+    if valid["setup"]:
+        _check_setup_references(model["setup"], errors)
+    if valid["students"]:
+        groups = model["students"]["groups"]
+        for group in model["students"]["constraints"]:
+            if group not in groups:
+                errors.append(
+                    (f"students.constraints.{group}", f"undefined group {group!r}")
+                )
+        students = {student for group in groups.values() for student in group}
+        for student in model["students"].get("headcounts", {}):
+            if student not in students:
+                errors.append(
+                    (
+                        f"students.headcounts.{student}",
+                        f"undefined atomic student {student!r}",
+                    )
+                )
+    labels = {
+        "managers": model["managers"] if valid["managers"] else None,
+        "planners": model["planners"] if valid["planners"] else None,
+        "teachers": model["teachers"] if valid["teachers"] else None,
+        "students": model["students"]["groups"] if valid["students"] else None,
+        "kinds": model["setup"]["activity_kinds"] if valid["setup"] else None,
+        "room_pools": model["aliases"]["room_pools"] if valid["aliases"] else None,
+    }
+    activities = set(known_activities)
+    for label, course in courses.items():
+        if type(course) == dict and type(course.get("activities")) == dict:
+            activities.update((label, activity) for activity in course["activities"])
+    for label, course in valid_courses.items():
+        _check_course_references(label, course, labels, activities, errors)
+    return errors
+
+
+def validate_model(model, known_activities=()):
+    """
+    Raises a ModelError listing all the errors of an invalid model (see
+    model_errors).
+    """
+    errors = model_errors(model, known_activities)
+    if len(errors) > 0:
+        raise ModelError(errors)
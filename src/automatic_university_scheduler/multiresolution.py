@@ -0,0 +1,324 @@
+import dataclasses
+import datetime
+from contextlib import nullcontext
+from dataclasses import dataclass
+import numpy as np
+from ortools.sat.python import cp_model
+from automatic_university_scheduler.optimize import build_model
+from automatic_university_scheduler.slot_calendar import build_slot_calendar
+from automatic_university_scheduler.snapshot import (
+    CSR,
+    UNSET,
+    ProjectSnapshot,
+    project_snapshot,
+)
+
+
+@dataclass(frozen=True, eq=False)
+class Coarsening:
+    """
+    A project snapshot at a coarser resolution: coarse slot `c` starts at fine
+    slot base + c * factor, `base` aligning the coarse days with the fine ones,
+    and fine slots are mapped to the nearest coarse slot. Coarse activities can
+    start in a coarse daily slot if their kind can start at a fine daily slot
+    mapped to it, the nearest of which is `kind_offsets[kind, coarse daily slot]`
+    fine slots from the start of the coarse slot.
+
+    The coarse model approximates the fine one: durations and static activities
+    are rounded up to whole coarse slots, while start windows, offsets and open
+    slots are rounded to keep the coarse slots holding feasible fine starts. The
+    fine starts of a coarse solution are thus close to, but not always within, a
+    fine solution.
+    """
+
+    snapshot: ProjectSnapshot
+    factor: int
+    base: int
+    kind_offsets: np.ndarray
+
+    def to_coarse(self, slots):
+        """
+        Returns the coarse slots nearest to fine slots.
+        """
+        return (np.asarray(slots) - self.base + self.factor // 2) // self.factor
+
+    def to_fine(self, starts):
+        """
+        Maps coarse activities starts (by activity id) to the nearest fine slot
+        their kind can start at.
+        """
+        snapshot = self.snapshot
+        kinds = dict(
+            zip(snapshot.activity_ids.tolist(), snapshot.activity_kinds.tolist())
+        )
+        out = {}
+        for aid, start in starts.items():
+            daily_slot = (
+                start - snapshot.origin_monday_slot
+            ) % snapshot.time_slots_per_day
+            offset = int(self.kind_offsets[kinds[aid], daily_slot])
+            out[aid] = self.base + start * self.factor + offset
+        return out
+
+
+def _map_set(values, function):
+    """
+    Applies an elementwise function to an array, keeping its UNSET values.
+    """
+    unset = values == UNSET
+    return np.where(unset, UNSET, function(np.where(unset, 0, values)))
+
+
+def coarsen_snapshot(project, factor):
+    """
+    Coarsens a project by grouping its slots by `factor` (see `Coarsening`).
+
+    Parameters:
+    project (Project or ProjectSnapshot): The project.
+    factor (int): The number of fine slots per coarse slot, dividing the number
+                  of time slots per day.
+
+    Returns:
+    Coarsening: The coarse snapshot and its mapping to the fine slots.
+    """
+    project = project_snapshot(project)
+    tspd = project.time_slots_per_day
+    if factor < 1 or tspd % factor != 0:
+        raise ValueError(
+            f"The factor must divide the {tspd} time slots per day, got {factor}"
+        )
+    base = -(-project.origin_monday_slot % factor)
+    coarse_tspd = tspd // factor
+
+    def floor(slots):
+        return (slots - base) // factor
+
+    def nearest(slots):
+        return (slots - base + factor // 2) // factor
+
+    def ceil(slots):
+        return -((base - slots) // factor)
+
+    # ALLOWED START SLOTS: the daily slot of a start is taken modulo the slots per
+    # day and compared to the allowed ones, midnight being never forbidden (see
+    # optimize.create_allowed_time_slots_per_kind).
+    coarse_allowed = np.zeros((len(project.kind_ids), coarse_tspd), dtype=bool)
+    coarse_allowed[:, 0] = True
+    kind_offsets = np.zeros(coarse_allowed.shape, dtype=np.int64)
+    for k, slots in enumerate(project.kind_allowed_daily_slots.tolists()):
+        for slot in slots:
+            if not 0 < slot < tspd:
+                continue
+            cell = (slot + factor // 2) // factor
+            offset = slot - cell * factor
+            cell %= coarse_tspd
+            if not coarse_allowed[k, cell] or abs(offset) < abs(kind_offsets[k, cell]):
+                coarse_allowed[k, cell] = True
+                kind_offsets[k, cell] = offset
+
+    # STATIC ACTIVITIES: recurring ones are kept as such when their period is a
+    # whole number of coarse slots, expanded otherwise.
+    periods, counts = project.static_periods, project.static_counts
+    compact = periods % factor == 0
+    rows, starts, ends = project.static_occurrences()
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    kept = ~compact[rows] | (np.arange(len(rows)) == first)
+    rows = rows[kept]
+    static_teachers = project.static_teachers.tolists()
+    static_rooms = project.static_rooms.tolists()
+
+    # CALENDAR
+    week_structure = project.week_structure.reshape(coarse_tspd, factor, 7).max(axis=1)
+    week_structure.flags.writeable = False
+    horizon = int(floor(project.horizon))
+    origin_monday_slot = int(floor(project.origin_monday_slot))
+    slot_seconds = project.calendar.slot_seconds
+    calendar = build_slot_calendar(
+        project.calendar.origin_datetime + base * np.timedelta64(slot_seconds, "s"),
+        datetime.timedelta(seconds=slot_seconds * factor),
+        horizon,
+        week_structure,
+        origin_monday_slot,
+    )
+
+    snapshot = dataclasses.replace(
+        project,
+        horizon=horizon,
+        time_slots_per_day=coarse_tspd,
+        time_slots_per_week=project.time_slots_per_week // factor,
+        origin_monday_slot=origin_monday_slot,
+        week_structure=week_structure,
+        calendar=calendar,
+        activity_durations=-(-project.activity_durations // factor),
+        activity_earliest_starts=_map_set(project.activity_earliest_starts, nearest),
+        activity_latest_starts=_map_set(project.activity_latest_starts, nearest),
+        activity_starts=_map_set(project.activity_starts, nearest),
+        kind_allowed_daily_slots=CSR.from_lists(
+            [np.flatnonzero(row[1:]) + 1 for row in coarse_allowed]
+        ),
+        precedence_min_offsets=_map_set(
+            project.precedence_min_offsets, lambda offsets: offsets // factor
+        ),
+        precedence_max_offsets=_map_set(
+            project.precedence_max_offsets, lambda offsets: -(-offsets // factor)
+        ),
+        static_ids=project.static_ids[rows],
+        static_kinds=tuple(project.static_kinds[k] for k in rows),
+        static_labels=tuple(project.static_labels[k] for k in rows),
+        static_starts=floor(starts[kept]),
+        static_ends=ceil(ends[kept]),
+        static_periods=np.where(compact[rows], periods[rows] // factor, 0),
+        static_counts=np.where(compact[rows], counts[rows], 1),
+        static_students_groups=project.static_students_groups[rows],
+        static_teachers=CSR.from_lists([static_teachers[k] for k in rows]),
+        static_rooms=CSR.from_lists([static_rooms[k] for k in rows]),
+    )
+    return Coarsening(
+        snapshot=snapshot, factor=factor, base=base, kind_offsets=kind_offsets
+    )
+
+
+def hinted_snapshot(project, starts, rooms=None, teachers=None, window=None):
+    """
+    Returns a snapshot hinting a solution to the solver.
+
+    Parameters:
+    project (Project or ProjectSnapshot): The project.
+    starts (dict): The start slot of each activity id.
+    rooms (dict): The allocated rooms labels of each activity id, if any.
+    teachers (dict): The allocated teachers labels of each activity id, if any.
+    window (int): Narrows the start window of each activity to `window` slots
+                  around its start if given. This can make the model infeasible.
+
+    Returns:
+    ProjectSnapshot: The snapshot.
+    """
+    project = project_snapshot(project)
+    activity_ids = project.activity_ids.tolist()
+    hints = np.array([starts.get(aid, UNSET) for aid in activity_ids], dtype=np.int64)
+    hinted = hints != UNSET
+    changes = {"activity_starts": np.where(hinted, hints, project.activity_starts)}
+
+    def allocations(labels_by_id, labels, allocated):
+        index = {label: i for i, label in enumerate(labels)}
+        allocated = allocated.tolists()
+        return CSR.from_lists(
+            [
+                [index[label] for label in labels_by_id[aid]]
+                if aid in labels_by_id
+                else allocated[i]
+                for i, aid in enumerate(activity_ids)
+            ]
+        )
+
+    if rooms is not None:
+        changes["activity_allocated_rooms"] = allocations(
+            rooms, project.room_labels, project.activity_allocated_rooms
+        )
+    if teachers is not None:
+        changes["activity_allocated_teachers"] = allocations(
+            teachers, project.teacher_labels, project.activity_allocated_teachers
+        )
+    if window is not None:
+        earliest = project.activity_earliest_starts
+        latest = project.activity_latest_starts
+        lowest = np.where(hinted, hints - window, UNSET)
+        highest = np.where(hinted, hints + window, UNSET)
+        changes["activity_earliest_starts"] = np.maximum(earliest, lowest)
+        narrowed = np.where(hinted, np.minimum(latest, highest), latest)
+        changes["activity_latest_starts"] = np.where(latest == UNSET, highest, narrowed)
+    return dataclasses.replace(project, **changes)
+
+
+def solution_assignment(solver, variables):
+    """
+    Returns the starts and the allocated rooms and teachers labels of each
+    activity id in the solution of a model built by `optimize.build_model`.
+    """
+    starts = {
+        aid: solver.Value(start)
+        for aid, start in variables["activities_starts"].items()
+    }
+    rooms, teachers = {}, {}
+    for aid, alternatives in variables["activities_alternative_ressources"].items():
+        for kind, out in (("rooms", rooms), ("teachers", teachers)):
+            out[aid] = [
+                label
+                for presence, labels in alternatives[kind]
+                if solver.Value(presence) == 1
+                for label in labels
+            ]
+    return starts, rooms, teachers
+
+
+def multiresolution_snapshot(
+    project,
+    factors=(4,),
+    window=None,
+    max_time_in_seconds=30.0,
+    num_search_workers=8,
+    telemetry=None,
+    verbose=True,
+):
+    """
+    Solves a project at coarse resolutions, from the coarsest, each solution
+    hinting the next resolution, and returns the fine snapshot hinted with the
+    last solution found.
+
+    Parameters:
+    project (Project or ProjectSnapshot): The project.
+    factors (iterable): The coarsening factors (see `coarsen_snapshot`).
+    window (int): Narrows the start windows of each resolution to `window` fine
+                  slots around the previous solution if given (see
+                  `hinted_snapshot`).
+    max_time_in_seconds (float): The time limit of each coarse solve.
+    num_search_workers (int): The number of solver workers.
+    telemetry (Telemetry): Records each coarse solve as a phase if given.
+    verbose (bool): Prints the status of each coarse solve.
+
+    Returns:
+    ProjectSnapshot: The hinted fine snapshot, not hinted if no coarse solution
+    was found. Resolutions whose model cannot be built are skipped.
+    """
+    fine = project_snapshot(project)
+    solution = None
+    for factor in sorted(factors, reverse=True):
+        coarsening = coarsen_snapshot(fine, factor)
+        snapshot = coarsening.snapshot
+        if solution is not None:
+            starts, rooms, teachers = solution
+            coarse_starts = dict(
+                zip(starts, coarsening.to_coarse(list(starts.values())).tolist())
+            )
+            snapshot = hinted_snapshot(
+                snapshot,
+                coarse_starts,
+                rooms,
+                teachers,
+                window=None if window is None else -(-window // factor),
+            )
+        name = f"coarse_solve_x{factor}"
+        with nullcontext() if telemetry is None else telemetry.phase(name):
+            try:
+                model, variables = build_model(snapshot)
+            except ValueError as error:
+                # The rounding of the coarse resolution can close the gaps the
+                # fine model fits activities in: this resolution is skipped.
+                if verbose:
+                    print(f"  Resolution x{factor}: skipped ({error})")
+                continue
+            solver = cp_model.CpSolver()
+            solver.parameters.max_time_in_seconds = max_time_in_seconds
+            solver.parameters.num_search_workers = num_search_workers
+            status = solver.Solve(model)
+        if verbose:
+            print(
+                f"  Resolution x{factor}: {solver.StatusName(status)} in "
+                f"{solver.WallTime():.2f} s"
+            )
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            starts, rooms, teachers = solution_assignment(solver, variables)
+            solution = coarsening.to_fine(starts), rooms, teachers
+    if solution is None:
+        return fine
+    return hinted_snapshot(fine, *solution, window=window)
@@ -2,67 +2,88 @@ from ortools.sat.python import cp_model
 from automatic_university_scheduler.database import StaticActivity
 import itertools
 import numpy as np
-from scipy import ndimage
 from sqlalchemy.orm import Session
 from sqlalchemy import create_engine, select
-from automatic_university_scheduler.database import Project, Base
+from automatic_university_scheduler.database import Project, Base, load_project
 from automatic_university_scheduler.utils import create_directory
+from automatic_university_scheduler.snapshot import project_snapshot, UNSET
+from automatic_university_scheduler.slot_calendar import OpenTime
+from automatic_university_scheduler.propagation import (
+    precedence_edges,
+    propagate_start_windows,
+    empty_windows,
+    entailed_min_offset,
+    entailed_max_offset,
+)
 import pandas as pd
 import os
 import time
+from contextlib import nullcontext
 from datetime import datetime
 
 
 def absolute_week_duration_deviation(
-    project, model, activities_starts, activities_durations
+    project, model, activities_starts, activities_durations, open_time=None
 ):
-    """ """
-    setup = project.setup
-    max_weeks = setup["MAX_WEEKS"]
-    time_slots_per_week = setup["TIME_SLOTS_PER_WEEK"]
-    horizon = setup["HORIZON"]
-    origin_monday = project.setup["ORIGIN_MONDAY"]
-    origin_monday_slot = project.datetime_to_slot(origin_monday)
-    students_groups_ids = [g.id for g in project.atomic_students]
+    """
+    Returns the sum over atomic students and weeks of the absolute deviation of
+    the duration of the activities of the week from the mean week duration. The
+    week of an activity is given by its start slot in the project calendar (in
+    `open_time` coordinates if given).
+    """
+    project = project_snapshot(project)
+    max_weeks = project.max_weeks
+    time_slots_per_week = project.time_slots_per_week
+    horizon = project.horizon
+    calendar = project.calendar
+    atomic_student_ids = project.atomic_student_ids
+    students_groups_ids = atomic_student_ids.tolist()
     students_week_duration_dic = {
         gid: [[] for i in range(max_weeks)] for gid in students_groups_ids
     }
-    activities_students_dic = {}
-    for activity in project.activities:
-        aid = activity.id
-        activities_students_dic[aid] = [s.id for s in activity.students.students]
+    activities_students_dic = {
+        aid: atomic_student_ids[students].tolist()
+        for aid, students in zip(
+            project.activity_ids.tolist(), project.activity_students.tolists()
+        )
+    }
     total_activities_duration_per_group = {gid: 0 for gid in students_groups_ids}
+    # Slots of each week within [0, HORIZON], from the calendar
+    weeks_bounds = [calendar.week_bounds(week_id) for week_id in range(max_weeks)]
+    if open_time is not None:
+        weeks_bounds = [
+            None
+            if bounds is None
+            else (
+                int(open_time.to_open(bounds[0])),
+                int(open_time.to_open(bounds[1], round="floor")),
+            )
+            for bounds in weeks_bounds
+        ]
+        weeks_bounds = [
+            None if bounds is None or bounds[0] > bounds[1] else bounds
+            for bounds in weeks_bounds
+        ]
     for aid, start in activities_starts.items():
-        activity_week_number = model.NewIntVar(0, max_weeks, f"activity_{aid}_week")
-        model.AddDivisionEquality(
-            activity_week_number, start - origin_monday_slot, time_slots_per_week
-        )
         activity_duration = activities_durations[aid]
-        for student in activity.students.students:
-            gid = student.id
+        for gid in activities_students_dic[aid]:
             total_activities_duration_per_group[gid] += activity_duration
-        for week_id in range(max_weeks):
+        domain = list(model.Proto().variables[start.Index()].domain)
+        start_min, start_max = domain[0], domain[-1]
+        activity_weeks = []
+        for week_id, bounds in enumerate(weeks_bounds):
+            # Weeks the activity cannot start in contribute nothing
+            if bounds is None or bounds[1] < start_min or bounds[0] > start_max:
+                continue
             activity_is_on_week = model.NewBoolVar(f"is_week_{week_id}_{aid}")
-            model.Add(activity_week_number == week_id).OnlyEnforceIf(
-                activity_is_on_week
-            )
-            model.Add(activity_week_number != week_id).OnlyEnforceIf(
-                activity_is_on_week.Not()
-            )
-            activity_duration_on_week = model.NewIntVar(
-                0, time_slots_per_week, "duration_on_week"
-            )
-            model.Add(activity_duration_on_week == activity_duration).OnlyEnforceIf(
-                activity_is_on_week
-            )
-            model.Add(activity_duration_on_week == 0).OnlyEnforceIf(
-                activity_is_on_week.Not()
-            )
-            for student in activity.students.students:
-                gid = student.id
+            model.AddLinearConstraint(start, *bounds).OnlyEnforceIf(activity_is_on_week)
+            activity_weeks.append(activity_is_on_week)
+            for gid in activities_students_dic[aid]:
                 students_week_duration_dic[gid][week_id].append(
-                    activity_duration_on_week
+                    activity_duration * activity_is_on_week
                 )
+        # The weeks partition [0, HORIZON]
+        model.AddExactlyOne(activity_weeks)
     # REMOVE EMPTY GROUPS
     students_week_duration_dic_curated = {}
     for group, wd in students_week_duration_dic.items():
@@ -106,14 +127,25 @@ class SolutionPrinter(cp_model.CpSolverSolutionCallback):
     #     timestamp = datetime.now().strftime("%Y/%m/%d-%H:%M:%S")
     #     return timestamp
 
-    def __init__(self, engine, activities_starts, activities_alternative_ressources, dump_dir,  limit=3):
+    def __init__(
+        self,
+        engine,
+        activities_starts,
+        activities_alternative_ressources,
+        dump_dir,
+        limit=3,
+        telemetry=None,
+        open_time=None,
+    ):
         cp_model.CpSolverSolutionCallback.__init__(self)
+        self.telemetry = telemetry
         self.__solution_count = 0
         self.__solution_limit = limit
         self.engine = engine
         self.activities_starts = activities_starts
         self.activities_alternative_ressources = activities_alternative_ressources
         self.dump_dir = dump_dir
+        self.open_time = open_time
 
     def on_solution_callback(self):
         """
@@ -124,7 +156,17 @@ class SolutionPrinter(cp_model.CpSolverSolutionCallback):
         walltime_str = time.strftime("%H:%M:%S", time.gmtime(walltime))
         message = f"Solution:{self.__solution_count},\t time={walltime_str} s,\t objective={self.ObjectiveValue()}"
         print(message)
-        export_solution_to_database(self, self.engine, self.activities_starts, self.activities_alternative_ressources)
+        if self.telemetry is not None:
+            self.telemetry.solution(
+                walltime, self.ObjectiveValue(), self.BestObjectiveBound()
+            )
+        export_solution_to_database(
+            self,
+            self.engine,
+            self.activities_starts,
+            self.activities_alternative_ressources,
+            open_time=self.open_time,
+        )
         dump_solution(self.dump_dir, self.engine, walltime, self.ObjectiveValue())
         self.__solution_count += 1
         if self.__solution_count >= self.__solution_limit:
@@ -144,80 +186,324 @@ def delete_imported_static_activities(session):
     session.commit()
 
 
-def create_activities_variables(model, project):
+def assumption_literal(model, literals, key):
+    """
+    Returns the assumption literal guarding the constraint group `key`. Returns
+    None when the model is built without assumptions (`literals` is None).
+    """
+    if literals is None:
+        return None
+    if key not in literals:
+        literals[key] = model.NewBoolVar(f"assume_{key}")
+    return literals[key]
+
+
+def enforce(constraint, literal):
+    """
+    Makes a constraint conditional on an assumption literal, if any.
+    """
+    if literal is not None:
+        constraint.OnlyEnforceIf(literal)
+    return constraint
+
+
+def group_bound_variable(model, variables, kind, domains, name):
+    """
+    Returns a variable equal to the max (kind="max") or min (kind="min") of
+    `variables`, or the variable itself if there is only one. `domains` are the
+    (lower, upper) bounds of the variables, used to bound the new variable.
+    """
+    if len(variables) == 1:
+        return variables[0]
+    aggregate = max if kind == "max" else min
+    lower = aggregate(d[0] for d in domains)
+    upper = aggregate(d[1] for d in domains)
+    bound = model.NewIntVar(lower, upper, name)
+    if kind == "max":
+        model.AddMaxEquality(bound, variables)
+    else:
+        model.AddMinEquality(bound, variables)
+    return bound
+
+
+def activity_group_bound(model, group_bounds, group_id, bound, variables, domains):
+    """
+    Returns the variable holding `bound` ("end_max", "end_min", "start_min" or
+    "start_max") of an activity group. Variables are created once per group and
+    bound and shared by all the starts after constraints referencing the group.
+    """
+    key = (group_id, bound)
+    if key not in group_bounds:
+        group_bounds[key] = group_bound_variable(
+            model,
+            variables,
+            bound.split("_")[1],
+            domains,
+            f"group_{str(group_id).zfill(4)}_{bound}",
+        )
+    return group_bounds[key]
+
+
+def offset_start(model, offset_starts, open_time, end, offset, bound):
+    """
+    Returns a variable holding the first (bound="min") or last (bound="max") open
+    start at least or at most `offset` slots after the open end `end`, through
+    an element constraint on the `OpenTime` table. Variables are created once
+    per end variable, offset and bound.
+    """
+    key = (end.Index(), offset, bound)
+    if key not in offset_starts:
+        if bound == "min":
+            table = open_time.min_offset_starts(offset).tolist()
+        else:
+            table = open_time.max_offset_starts(offset).tolist()
+        name = f"{end.Name()}_{bound}_{offset}"
+        start = model.NewIntVar(min(table), max(table), name)
+        model.AddElement(end, table, start)
+        offset_starts[key] = start
+    return offset_starts[key]
+
+
+def kinds_start_masks(project):
+    """
+    Returns, for each activity kind, a boolean array of length HORIZON which is
+    True on the slots its activities can start at (see
+    `create_allowed_time_slots_per_kind`).
+    """
+    project = project_snapshot(project)
+    daily_slots = (
+        np.arange(project.horizon) - project.origin_monday_slot
+    ) % project.time_slots_per_day
+    return [
+        (daily_slots == 0) | np.isin(daily_slots, slots)
+        for slots in project.kind_allowed_daily_slots.tolists()
+    ]
+
+
+def rooms_busy_counts(project):
+    """
+    Returns the cumulative counts of the slots blocked by static activities for
+    each room (by database id) they are enforced on (see
+    `create_static_activities_overlap_constraints`): a room is busy during
+    `counts[end] - counts[start]` slots of [start, end).
+    """
+    project = project_snapshot(project)
+    horizon = project.horizon
+    out = {}
+    for rid, occurrences in project.static_intervals("rooms").items():
+        if len(occurrences) > 1:
+            busy = np.zeros(horizon, dtype=np.int64)
+            for start, end in occurrences:
+                busy[max(start, 0) : max(end, 0)] = 1
+            out[rid] = np.concatenate([[0], np.cumsum(busy)])
+    return out
+
+
+def room_combinations(room_pool_ids, room_count, capacities, headcount, busy=()):
+    """
+    Returns the combinations of `room_count` rooms of a pool that can host an
+    activity: those without `busy` rooms and, if the `headcount` of its students
+    is known, whose total capacity holds them. Rooms of unknown (UNSET) capacity
+    are assumed to be large enough.
+
+    Parameters:
+    room_pool_ids (list): The rooms ids of the pool.
+    room_count (int): The number of rooms of the activity.
+    capacities (dict): The capacity of each room id.
+    headcount (int): The number of students of the activity, or UNSET.
+    busy (set): The rooms ids that cannot host the activity.
+
+    Returns:
+    list: The tuples of rooms ids.
+    """
+    rooms = [rid for rid in room_pool_ids if rid not in busy]
+    combinations = itertools.combinations(rooms, room_count)
+    if headcount == UNSET or room_count == 0:
+        return list(combinations)
+    return [
+        combination
+        for combination in combinations
+        if any(capacities[rid] == UNSET for rid in combination)
+        or sum(capacities[rid] for rid in combination) >= headcount
+    ]
+
+
+def create_activities_variables(
+    model, project, literals=None, propagate=True, open_time=None
+):
+    """
+    Creates the start, end and interval variables of the activities with their
+    ressources alternatives, the starts after constraints and the ressources no
+    overlap constraints. Given an `open_time`, the variables are in open time
+    coordinates, the activities staying within blocks of open slots and the
+    offsets of the starts after constraints being translated exactly.
+
+    Without assumption `literals`, the room combinations that cannot hold the
+    students of an activity, or holding a room blocked by static activities at
+    every start allowed by the start window and the kind of the activity, are
+    not created, unless none would be left.
+    """
+    project = project_snapshot(project)
     activities_intervals = {}
     activities_starts = {}
     activities_ends = {}
     activities_durations = {}
     activities_alternative_ressources = {}
-    s_factor = project.succession_constraint_relaxation_factor
-    atomic_students = project.atomic_students
-    rooms = project.rooms
-    teachers = project.teachers
-    rooms_dic = {r.id: r for r in rooms}
-    teachers_dic = {t.id: t for t in teachers}
-    atomic_students_intervals = {s.id: [] for s in atomic_students}
-    room_intervals = {r.id: [] for r in rooms}
-    teacher_intervals = {t.id: [] for t in teachers}
-    activities = project.activities
-    starts_after_constraints = project.starts_after_constraints
+    starts_domains = {}
+    ends_domains = {}
+    group_bounds = {}
+    offset_starts = {}
+    atomic_student_ids = project.atomic_student_ids.tolist()
+    room_ids = project.room_ids.tolist()
+    teacher_ids = project.teacher_ids.tolist()
+    rooms_dic = dict(zip(room_ids, project.room_labels))
+    teachers_dic = dict(zip(teacher_ids, project.teacher_labels))
+    atomic_students_intervals = {sid: [] for sid in atomic_student_ids}
+    room_intervals = {rid: [] for rid in room_ids}
+    teacher_intervals = {tid: [] for tid in teacher_ids}
     horizon = project.horizon
+    edges = precedence_edges(project)
+    # START WINDOWS: not used with assumptions since they would turn relaxable
+    # constraints into hard domains.
+    windows = None
+    if propagate and literals is None:
+        windows, _ = propagate_start_windows(project, edges)
+        if len(empty_windows(windows)) > 0:
+            windows = None
 
-    for activity in activities:
-        aid = activity.id
+    activities_students = project.activity_students.tolists()
+    room_pools = project.activity_room_pools.tolists()
+    teacher_pools = project.activity_teacher_pools.tolists()
+    allocated_rooms = project.activity_allocated_rooms.tolists()
+    allocated_teachers = project.activity_allocated_teachers.tolists()
+    # ROOMS PRUNING: like the start windows, only without assumptions.
+    prune = literals is None
+    if prune:
+        room_capacities = dict(zip(room_ids, project.room_capacities.tolist()))
+        headcounts = project.students_group_headcounts[
+            project.activity_students_groups
+        ].tolist()
+        kinds_starts = kinds_start_masks(project)
+        rooms_busy = rooms_busy_counts(project)
+    for i, (aid, duration, activity_start, earliest_start, latest_start) in enumerate(
+        zip(
+            project.activity_ids.tolist(),
+            project.activity_durations.tolist(),
+            project.activity_starts.tolist(),
+            project.activity_earliest_starts.tolist(),
+            project.activity_latest_starts.tolist(),
+        )
+    ):
         said = str(aid).zfill(4)
-        start = model.NewIntVar(0, horizon, f"start_{said}")
-        end = model.NewIntVar(0, horizon, f"end_{said}")
-        if activity.start is not None:
-            model.AddHint(start, activity.start)
-        if activity.earliest_start_slot is not None:
-            model.Add(start >= activity.earliest_start_slot)
-        if activity.latest_start_slot is not None:
-            model.Add(start <= activity.latest_start_slot)
-        duration = activity.duration
+        if windows is None:
+            start_domain = (0, horizon)
+            end_domain = (0, horizon)
+        else:
+            earliest, latest = windows[aid]
+            start_domain = (earliest, latest)
+            end_domain = (earliest + duration, latest + duration)
+        start_values = cp_model.Domain(*start_domain)
+        end_values = cp_model.Domain(*end_domain)
+        room_pool_ids = [room_ids[j] for j in room_pools[i]]
+        room_count = int(project.activity_room_counts[i])
+        if prune:
+            busy_pool = [rid for rid in room_pool_ids if rid in rooms_busy]
+            first = max(start_domain[0], 0)
+            last = min(start_domain[1], horizon - duration)
+            kind_starts = kinds_starts[project.activity_kinds[i]][first : last + 1]
+            starts = np.flatnonzero(kind_starts) + first
+            busy = set()
+            if len(busy_pool) > 0 and len(starts) > 0:
+                busy = {
+                    rid
+                    for rid in busy_pool
+                    if (
+                        rooms_busy[rid][starts + duration] > rooms_busy[rid][starts]
+                    ).all()
+                }
+            room_combinations_ids = room_combinations(
+                room_pool_ids, room_count, room_capacities, headcounts[i], busy
+            )
+        if not prune or len(room_combinations_ids) == 0:
+            # Without any combination left, all of them are kept: the solver then
+            # proves the static activities infeasibility (too small rooms being
+            # reported by `feasibility.check_pools`).
+            room_combinations_ids = itertools.combinations(room_pool_ids, room_count)
+        if open_time is not None:
+            intervals = open_time.start_intervals(
+                duration,
+                open_time.to_open(start_domain[0]),
+                open_time.to_open(start_domain[1], round="floor"),
+            )
+            if len(intervals) == 0:
+                raise ValueError(
+                    f"Activity {aid} fits in no block of open slots of its window"
+                )
+            start_values = cp_model.Domain.from_intervals(intervals.tolist())
+            end_values = cp_model.Domain.from_intervals((intervals + duration).tolist())
+            start_domain = (start_values.min(), start_values.max())
+            end_domain = (end_values.min(), end_values.max())
+            if activity_start != UNSET:
+                activity_start = int(open_time.to_open(activity_start))
+            if earliest_start != UNSET:
+                earliest_start = int(open_time.to_open(earliest_start))
+            if latest_start != UNSET:
+                latest_start = int(open_time.to_open(latest_start, round="floor"))
+        start = model.NewIntVarFromDomain(start_values, f"start_{said}")
+        end = model.NewIntVarFromDomain(end_values, f"end_{said}")
+        if activity_start != UNSET:
+            model.AddHint(start, activity_start)
+        if earliest_start != UNSET:
+            enforce(
+                model.Add(start >= earliest_start),
+                assumption_literal(model, literals, f"earliest_start:{aid}"),
+            )
+        if latest_start != UNSET:
+            enforce(
+                model.Add(start <= latest_start),
+                assumption_literal(model, literals, f"latest_start:{aid}"),
+            )
         # model.Add(end == start + duration) # overkill ? Enforced by IntervalVar : https://developers.google.com/optimization/reference/python/sat/python/cp_model#newintervalvar
         interval = model.NewIntervalVar(start, duration, end, f"activity_{said}")
-        atomic_students_ids = [i.id for i in activity.students.students]
-        for sid in atomic_students_ids:
-            atomic_students_intervals[sid].append(interval)
+        for j in activities_students[i]:
+            atomic_students_intervals[atomic_student_ids[j]].append(interval)
         activities_intervals[aid] = interval
         activities_starts[aid] = start
         activities_ends[aid] = end
         activities_durations[aid] = duration
+        starts_domains[aid] = start_domain
+        ends_domains[aid] = end_domain
         activities_alternative_ressources[aid] = {"rooms": [], "teachers": []}
         # ALTERNATIVES
         items = []
         kind = []
         alt_presences = []
-        pre_allocated_rooms = activity.allocated_rooms
-        pre_allocated_rooms_ids_set = set([r.id for r in pre_allocated_rooms])
-        has_pre_allocated_rooms = len(pre_allocated_rooms) > 0
-        pre_allocated_teachers = activity.allocated_teachers
-        pre_allocated_teachers_ids_set = set([t.id for t in pre_allocated_teachers])
-        has_pre_allocated_teachers = len(pre_allocated_teachers) > 0
-        room_pool = activity.room_pool
-        room_pool_ids = [r.id for r in room_pool]
-        room_count = activity.room_count
-        items.append(itertools.combinations(room_pool_ids, room_count))
+        pre_allocated_rooms_ids_set = set([room_ids[j] for j in allocated_rooms[i]])
+        has_pre_allocated_rooms = len(pre_allocated_rooms_ids_set) > 0
+        pre_allocated_teachers_ids_set = set(
+            [teacher_ids[j] for j in allocated_teachers[i]]
+        )
+        has_pre_allocated_teachers = len(pre_allocated_teachers_ids_set) > 0
+        items.append(room_combinations_ids)
         kind.append("room")
-        teacher_pool = activity.teacher_pool
-        teacher_pool_ids = [t.id for t in teacher_pool]
-        teacher_count = activity.teacher_count
+        teacher_pool_ids = [teacher_ids[j] for j in teacher_pools[i]]
+        teacher_count = int(project.activity_teacher_counts[i])
         items.append(itertools.combinations(teacher_pool_ids, teacher_count))
         kind.append("teacher")
         combinations = [p for p in itertools.product(*items)]
         for icomb, combination in enumerate(combinations):
-            comb_rooms = np.concatenate(
-                [combination[i] for i in range(len(combination)) if kind[i] == "room"]
-            )
-
-            comb_teachers = np.concatenate(
-                [
-                    combination[i]
-                    for i in range(len(combination))
-                    if kind[i] == "teacher"
-                ]
-            )
+            comb_rooms = [
+                r
+                for i_item in range(len(combination))
+                if kind[i_item] == "room"
+                for r in combination[i_item]
+            ]
+            comb_teachers = [
+                t
+                for i_item in range(len(combination))
+                if kind[i_item] == "teacher"
+                for t in combination[i_item]
+            ]
             alt_presence = model.NewBoolVar(f"presence_{said}_alt{icomb}")
             if has_pre_allocated_rooms and has_pre_allocated_teachers:
                 if (
@@ -228,8 +514,10 @@ def create_activities_variables(model, project):
                 else:
                     model.AddHint(alt_presence, 0)
 
-            alt_start = model.NewIntVar(0, horizon, f"start_{said}_alt{icomb}")
-            alt_end = model.NewIntVar(0, horizon, f"end_{said}_alt{icomb}")
+            alt_start = model.NewIntVarFromDomain(
+                start_values, f"start_{said}_alt{icomb}"
+            )
+            alt_end = model.NewIntVarFromDomain(end_values, f"end_{said}_alt{icomb}")
             model.Add(alt_end == alt_start + duration)
             alt_interval = model.NewOptionalIntervalVar(
                 alt_start,
@@ -245,30 +533,68 @@ def create_activities_variables(model, project):
             for rid in comb_rooms:
                 room_intervals[rid].append(alt_interval)
             activities_alternative_ressources[aid]["rooms"].append(
-                (alt_presence, [rooms_dic[i].label for i in comb_rooms])
+                (alt_presence, [rooms_dic[r] for r in comb_rooms])
             )
             activities_alternative_ressources[aid]["teachers"].append(
-                (alt_presence, [teachers_dic[i].label for i in comb_teachers])
+                (alt_presence, [teachers_dic[t] for t in comb_teachers])
             )
         model.AddExactlyOne(alt_presences)
 
     # START AFTER CONSTRAINTS
-    for starts_after in starts_after_constraints:
-        from_activities = starts_after.from_activity_group.activities
-        from_activites_ids = [a.id for a in from_activities]
-        to_activities = starts_after.to_activity_group.activities
-        to_activities_ids = [a.id for a in to_activities]
-        min_offset = starts_after.min_offset
-        min_offset = int(min_offset / s_factor) if min_offset is not None else None
-        max_offset = starts_after.max_offset
-        max_offset = int(max_offset * s_factor) if max_offset is not None else None
-        for from_id, to_id in itertools.product(from_activites_ids, to_activities_ids):
-            from_end = activities_ends[from_id]
-            to_start = activities_starts[to_id]
-            if min_offset is not None:
-                model.Add(to_start >= from_end + min_offset)
-            if max_offset is not None:
-                model.Add(to_start <= from_end + max_offset)
+    # to_start >= from_end + min_offset for every pair of activities is encoded
+    # as min(to_starts) >= max(from_ends) + min_offset (and conversely for max
+    # offsets). The min/max variables are shared per activity group. Constraints
+    # already implied by the start windows are skipped. In open time coordinates,
+    # non zero offsets go through the starts they allow after each end.
+    precedence_groups = zip(
+        project.precedence_from_groups.tolist(), project.precedence_to_groups.tolist()
+    )
+    for (cid, from_ids, to_ids, min_offset, max_offset), (from_gid, to_gid) in zip(
+        edges, precedence_groups
+    ):
+        from_ends = [activities_ends[i] for i in from_ids]
+        from_ends_domains = [ends_domains[i] for i in from_ids]
+        to_starts = [activities_starts[i] for i in to_ids]
+        to_starts_domains = [starts_domains[i] for i in to_ids]
+        literal = assumption_literal(model, literals, f"starts_after:{cid}")
+        if min_offset is not None and not (
+            windows is not None
+            and entailed_min_offset(
+                windows, activities_durations, from_ids, to_ids, min_offset
+            )
+        ):
+            from_end = activity_group_bound(
+                model, group_bounds, from_gid, "end_max", from_ends, from_ends_domains
+            )
+            to_start = activity_group_bound(
+                model, group_bounds, to_gid, "start_min", to_starts, to_starts_domains
+            )
+            if open_time is None or min_offset == 0:
+                enforce(model.Add(to_start >= from_end + min_offset), literal)
+            else:
+                first_start = offset_start(
+                    model, offset_starts, open_time, from_end, min_offset, "min"
+                )
+                enforce(model.Add(to_start >= first_start), literal)
+        if max_offset is not None and not (
+            windows is not None
+            and entailed_max_offset(
+                windows, activities_durations, from_ids, to_ids, max_offset
+            )
+        ):
+            from_end = activity_group_bound(
+                model, group_bounds, from_gid, "end_min", from_ends, from_ends_domains
+            )
+            to_start = activity_group_bound(
+                model, group_bounds, to_gid, "start_max", to_starts, to_starts_domains
+            )
+            if open_time is None:
+                enforce(model.Add(to_start <= from_end + max_offset), literal)
+            else:
+                last_start = offset_start(
+                    model, offset_starts, open_time, from_end, max_offset, "max"
+                )
+                enforce(model.Add(to_start <= last_start), literal)
 
     # NO OVERLAP
     for teacher, intervals in teacher_intervals.items():
@@ -293,85 +619,212 @@ def create_activities_variables(model, project):
     )
 
 
-def create_allowed_time_slots_per_kind(model, project, activities_starts):
-    activity_kinds = project.activity_kinds
+def create_allowed_time_slots_per_kind(
+    model, project, activities_starts, literals=None, open_time=None
+):
+    """
+    Restricts the starts of the activities of each kind to its allowed daily
+    slots, through the open slots domain if `open_time` is given.
+    """
+    project = project_snapshot(project)
     horizon = project.horizon
-    origin_monday = project.setup["ORIGIN_MONDAY"]
-    origin_monday_slot = project.datetime_to_slot(origin_monday, round="floor")
+    origin_monday_slot = project.origin_monday_slot
     tspd = project.time_slots_per_day
     all_daily_slots = np.arange(tspd) + 1
-    for akind in activity_kinds:
-        activity_allowed_slots = akind.allowed_daily_start_slots
-        activity_allowed_slots_ids = [s.id for s in activity_allowed_slots]
+    activity_ids = project.activity_ids
+    if open_time is not None:
+        open_daily_slots = (open_time.slots - origin_monday_slot) % tspd
+    for k, kind_label in enumerate(project.kind_labels):
+        activity_allowed_slots_ids = project.kind_allowed_daily_slots[k].tolist()
         activity_forbidden_slots = list(
-            set(all_daily_slots) - set(activity_allowed_slots_ids)
+            set(all_daily_slots.tolist()) - set(activity_allowed_slots_ids)
         )
-        for activity in akind.activities:
-            aid = activity.id
+        literal = assumption_literal(
+            model, literals, f"allowed_start_slots:{kind_label}"
+        )
+        if open_time is not None:
+            allowed = ~np.isin(open_daily_slots, activity_forbidden_slots)
+            domain = cp_model.Domain.from_values(np.flatnonzero(allowed).tolist())
+            for aid in activity_ids[project.activity_kinds == k].tolist():
+                enforce(
+                    model.AddLinearExpressionInDomain(activities_starts[aid], domain),
+                    literal,
+                )
+            continue
+        for aid in activity_ids[project.activity_kinds == k].tolist():
             said = str(aid).zfill(4)
             start = activities_starts[aid]
             start_m96 = model.NewIntVar(-horizon, horizon, f"start_mod_{tspd}_{said}")
-            model.AddModuloEquality(start_m96, start - origin_monday_slot, 96)
+            model.AddModuloEquality(start_m96, start - origin_monday_slot, tspd)
             for fslot in activity_forbidden_slots:
-                model.Add(start_m96 != fslot)
+                enforce(model.Add(start_m96 != fslot), literal)
+
+
+def merge_intervals(intervals):
+    """
+    Merges (start, end) intervals into sorted disjoint blocks, touching intervals
+    being merged too.
+    """
+    blocks = []
+    for start, end in sorted(intervals):
+        if len(blocks) > 0 and start <= blocks[-1][1]:
+            blocks[-1][1] = max(blocks[-1][1], end)
+        else:
+            blocks.append([start, end])
+    return [(start, end) for start, end in blocks]
 
 
 def create_static_activities_overlap_constraints(
-    project, atomic_students_intervals, teacher_intervals, room_intervals, model
+    project,
+    atomic_students_intervals,
+    teacher_intervals,
+    room_intervals,
+    model,
+    literals=None,
+    activities_starts=None,
+    open_time=None,
 ):
-    static_activities = project.static_activities
-    atomic_students = project.atomic_students
-    teachers = project.teachers
-    rooms = project.rooms
-    teacher_static_intervals = {t.id: [] for t in teachers}
-    room_static_intervals = {r.id: [] for r in rooms}
-    atomic_students_static_intervals = {s.id: [] for s in atomic_students}
-    for static_activity in static_activities:
-        start = static_activity.start
-        end = static_activity.end
-        duration = static_activity.duration
-        aid = static_activity.id
-        interval = model.NewIntervalVar(start, duration, end, f"static_activity_{aid}")
-        if static_activity.students is not None:
-            for atomic_student in static_activity.students.students:
-                atomic_students_static_intervals[atomic_student.id].append(interval)
-        for teacher in static_activity.allocated_teachers:
-            teacher_static_intervals[teacher.id].append(interval)
-        for room in static_activity.allocated_rooms:
-            room_static_intervals[room.id].append(interval)
-
-    for teacher, static_intervals in teacher_static_intervals.items():
-        if len(static_intervals) > 1:
-            for static_interval in static_intervals:
-                for interval in teacher_intervals[teacher]:
-                    model.AddNoOverlap([static_interval, interval])
-
-    for room, static_intervals in room_static_intervals.items():
-        if len(static_intervals) > 1:
-            for static_interval in static_intervals:
-                for interval in room_intervals[room]:
-                    model.AddNoOverlap([static_interval, interval])
-
-    for student, static_intervals in atomic_students_static_intervals.items():
-        if len(static_intervals) > 1:
-            for static_interval in static_intervals:
-                for interval in atomic_students_intervals[student]:
-                    model.AddNoOverlap([static_interval, interval])
+    """
+    Prevents the activities from overlapping the static activities of their
+    ressources.
+
+    The occurrences of the static activities of each ressource are merged into
+    blocked intervals (per constraint group with assumption `literals`) that
+    share a single no overlap constraint with the activities of the ressource.
+    Given `activities_starts`, the blocked intervals of the atomic students are
+    removed from the domains of the starts of their activities instead. Static
+    activities are only enforced on ressources that own more than one of them
+    (counting each occurrence of the recurring ones). Given an `open_time`, the
+    occurrences are mapped to open time coordinates, those within closed periods
+    vanishing.
+
+    Returns:
+    tuple: The blocked intervals of each atomic student, teacher and room.
+    """
+    project = project_snapshot(project)
+    atomic_student_ids = project.atomic_student_ids.tolist()
+    members = project.students_group_members.tolists()
+    ressources = {
+        "students": (
+            atomic_student_ids,
+            [members[g] if g >= 0 else [] for g in project.static_students_groups],
+            atomic_students_intervals,
+        ),
+        "teachers": (
+            project.teacher_ids.tolist(),
+            project.static_teachers.tolists(),
+            teacher_intervals,
+        ),
+        "rooms": (
+            project.room_ids.tolist(),
+            project.static_rooms.tolists(),
+            room_intervals,
+        ),
+    }
+    keys = [
+        f"static_activity:{static_kind}:{static_label}"
+        for static_kind, static_label in zip(
+            project.static_kinds, project.static_labels
+        )
+    ]
+    rows, starts, ends = project.static_occurrences()
+    if open_time is not None:
+        starts, ends = open_time.to_open(starts), open_time.to_open(ends)
+        kept = starts < ends
+        rows, starts, ends = rows[kept], starts[kept], ends[kept]
+    rows, starts, ends = rows.tolist(), starts.tolist(), ends.tolist()
+
+    # BLOCKS: merged occurrences of each ressource by constraint group
+    blocks = {}
+    for kind, (ressource_ids, static_ressources, _) in ressources.items():
+        occurrences = {}
+        for row, start, end in zip(rows, starts, ends):
+            group = None if literals is None else keys[row]
+            for j in static_ressources[row]:
+                occurrences.setdefault(ressource_ids[j], {}).setdefault(
+                    group, []
+                ).append((start, end))
+        blocks[kind] = {
+            rid: {group: merge_intervals(o) for group, o in groups.items()}
+            for rid, groups in occurrences.items()
+            if sum(len(o) for o in groups.values()) > 1
+        }
+
+    blocked_intervals = {}
+
+    def blocked_interval(group, start, end):
+        if (group, start, end) not in blocked_intervals:
+            name = f"static_activity_{start}_{end}"
+            if group is None:
+                interval = model.NewIntervalVar(start, end - start, end, name)
+            else:
+                literal = assumption_literal(model, literals, group)
+                interval = model.NewOptionalIntervalVar(
+                    start, end - start, end, literal, name
+                )
+            blocked_intervals[(group, start, end)] = interval
+        return blocked_intervals[(group, start, end)]
+
+    static_intervals = {}
+    for kind, (ressource_ids, _, intervals) in ressources.items():
+        static_intervals[kind] = {rid: [] for rid in ressource_ids}
+        if kind == "students" and activities_starts is not None:
+            continue
+        for rid, groups in blocks[kind].items():
+            for group, group_blocks in groups.items():
+                fixed = [blocked_interval(group, *block) for block in group_blocks]
+                static_intervals[kind][rid].extend(fixed)
+                if len(intervals[rid]) > 0:
+                    model.AddNoOverlap(fixed + intervals[rid])
+
+    if activities_starts is not None:
+        activities_students = project.activity_students.tolists()
+        for i, (aid, duration) in enumerate(
+            zip(project.activity_ids.tolist(), project.activity_durations.tolist())
+        ):
+            groups = {}
+            for j in activities_students[i]:
+                student_blocks = blocks["students"].get(atomic_student_ids[j], {})
+                for group, group_blocks in student_blocks.items():
+                    groups.setdefault(group, []).extend(group_blocks)
+            for group, group_blocks in groups.items():
+                # An activity overlaps [start, end) if it starts in
+                # [start - duration + 1, end - 1]
+                forbidden = [
+                    [start - duration + 1, end - 1]
+                    for start, end in merge_intervals(group_blocks)
+                    if start - duration + 1 <= end - 1
+                ]
+                if len(forbidden) == 0:
+                    continue
+                domain = cp_model.Domain.from_intervals(forbidden).complement()
+                literal = None
+                if group is not None:
+                    literal = assumption_literal(model, literals, group)
+                enforce(
+                    model.AddLinearExpressionInDomain(activities_starts[aid], domain),
+                    literal,
+                )
     return (
-        atomic_students_static_intervals,
-        teacher_static_intervals,
-        room_static_intervals,
+        static_intervals["students"],
+        static_intervals["teachers"],
+        static_intervals["rooms"],
     )
 
 
-def create_weekly_unavailability_constraints(project, model, atomic_students_intervals):
-    origin_monday = project.setup["ORIGIN_MONDAY"]
-    origin_monday_slot = project.datetime_to_slot(origin_monday, round="floor")
-    max_weeks = project.setup["MAX_WEEKS"]
-    time_slots_per_week = project.setup["TIME_SLOTS_PER_WEEK"]  # 672
-    horizon = project.setup["HORIZON"]
+def create_weekly_unavailability_constraints(
+    project, model, atomic_students_intervals, literals=None
+):
+    from scipy import ndimage
+
+    project = project_snapshot(project)
+    origin_monday_slot = project.origin_monday_slot
+    max_weeks = project.max_weeks
+    time_slots_per_week = project.time_slots_per_week  # 672
+    horizon = project.horizon
 
     weekly_unavailable_intervals = []
+    literal = assumption_literal(model, literals, "weekly_unavailability")
     weekly_unavailable_slots = (project.week_structure.T.flatten() == 0) * 1.0
 
     wusl, nlab = ndimage.label(weekly_unavailable_slots)
@@ -397,12 +850,15 @@ def create_weekly_unavailability_constraints(project, model, atomic_students_int
                 end_slot = horizon
             duration = end_slot - start_slot
             if duration > 0:
-                interval = model.NewIntervalVar(
-                    start_slot,
-                    duration,
-                    end_slot,
-                    f"weekly_unavailable_w{w+1}_interval{nint}",
-                )
+                name = f"weekly_unavailable_w{w+1}_interval{nint}"
+                if literal is None:
+                    interval = model.NewIntervalVar(
+                        start_slot, duration, end_slot, name
+                    )
+                else:
+                    interval = model.NewOptionalIntervalVar(
+                        start_slot, duration, end_slot, literal, name
+                    )
                 weekly_unavailable_intervals.append(interval)
 
     for student, intervals in atomic_students_intervals.items():
@@ -413,14 +869,119 @@ def create_weekly_unavailability_constraints(project, model, atomic_students_int
     return weekly_unavailable_intervals
 
 
-def export_solution_to_database(solver, engine, activities_starts, activities_alternative_ressources):
+def build_model(
+    project, literals=None, objective=True, telemetry=None, open_time=False
+):
+    """
+    Builds the complete CP model of a project: activities variables, allowed
+    start slots per kind, static activities and week structure constraints and,
+    if `objective` is True, the week duration deviation objective. `project` is
+    either a Project or a ProjectSnapshot, the former being snapshotted once.
+    Each step is recorded as a phase if a `telemetry` is given.
+
+    With `open_time`, the model works in the open time coordinates of the
+    project calendar (see `slot_calendar.OpenTime`, kept as the "open_time"
+    variable to map the starts back): closed slots are removed from the time
+    axis instead of being blocked, no activity being then placed in them.
+    Assumption `literals` are not supported in these coordinates.
+
+    Returns:
+    tuple: The model and a dictionary holding the variables returned by the
+    model building functions, keyed by their usual names.
+    """
+    model = cp_model.CpModel()
+
+    def phase(name):
+        if telemetry is None:
+            return nullcontext()
+        return telemetry.phase(name, model)
+
+    with phase("project_snapshot"):
+        project = project_snapshot(project)
+    variables = {}
+    if open_time:
+        if literals is not None:
+            raise ValueError("Assumption literals need the slots coordinates")
+        open_time = OpenTime.from_calendar(project.calendar)
+    else:
+        open_time = None
+    variables["open_time"] = open_time
+    with phase("create_activities_variables"):
+        (
+            variables["activities_intervals"],
+            variables["activities_starts"],
+            variables["activities_ends"],
+            variables["activities_durations"],
+            variables["atomic_students_intervals"],
+            variables["room_intervals"],
+            variables["teacher_intervals"],
+            variables["activities_alternative_ressources"],
+        ) = create_activities_variables(
+            model, project, literals=literals, open_time=open_time
+        )
+    with phase("create_allowed_time_slots_per_kind"):
+        create_allowed_time_slots_per_kind(
+            model,
+            project,
+            variables["activities_starts"],
+            literals=literals,
+            open_time=open_time,
+        )
+    with phase("create_static_activities_overlap_constraints"):
+        (
+            variables["atomic_students_static_intervals"],
+            variables["teacher_static_intervals"],
+            variables["room_static_intervals"],
+        ) = create_static_activities_overlap_constraints(
+            project,
+            variables["atomic_students_intervals"],
+            variables["teacher_intervals"],
+            variables["room_intervals"],
+            model,
+            literals=literals,
+            activities_starts=variables["activities_starts"],
+            open_time=open_time,
+        )
+    if open_time is None:
+        with phase("create_weekly_unavailability_constraints"):
+            weekly_unavailable_intervals = create_weekly_unavailability_constraints(
+                project,
+                model,
+                variables["atomic_students_intervals"],
+                literals=literals,
+            )
+    else:
+        weekly_unavailable_intervals = []
+    variables["weekly_unavailable_intervals"] = weekly_unavailable_intervals
+    if objective:
+        with phase("absolute_week_duration_deviation"):
+            variables["cost_value"] = absolute_week_duration_deviation(
+                project,
+                model,
+                variables["activities_starts"],
+                variables["activities_durations"],
+                open_time=open_time,
+            )
+        model.Minimize(variables["cost_value"])
+    return model, variables
+
+
+def export_solution_to_database(
+    solver, engine, activities_starts, activities_alternative_ressources, open_time=None
+):
+    """
+    Writes the starts and allocations of a solution to the database, mapping the
+    starts back from `open_time` coordinates if given.
+    """
     session = Session(engine)
-    project = session.execute(select(Project)).scalars().first()
+    project = load_project(session, profile="solution")
     activities_dic = {a.id: a for a in project.activities}
     rooms_labels_dic = {r.label: r for r in project.rooms}
     teachers_labels_dic = {t.label: t for t in project.teachers}
     for aid, start in activities_starts.items():
         start_slot = solver.Value(start)
+        if open_time is not None:
+            start_slot = int(open_time.to_slots(start_slot))
         activity = activities_dic[aid]
         activity.start = start_slot
         activity_alternative_ressources = activities_alternative_ressources[aid]
@@ -464,7 +1025,7 @@ def dump_solution(dump_dir, engine, walltime, objective):
     create_directory(dump_dir)
     Base.metadata.create_all(engine)
     session = Session(engine)
-    project = session.execute(select(Project)).scalars().first()
+    project = load_project(session, profile="solution")
     prefix = f"{dump_dir}/project_dump_{current_dump:04d}"
 
     # CSV
@@ -0,0 +1,631 @@
+import graphlib
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable
+import yaml
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from automatic_university_scheduler.database import Base, load_project
+from automatic_university_scheduler.utils import (
+    create_directory,
+    Messages,
+    read_from_yaml,
+)
+
+# Fingerprints of the last run of each stage, stored in the working directory
+STATE_FILE = ".pipeline.json"
+
+# Default ADE extraction of the imported static activities
+EXTRACTION_FILE = "existing_activities/extractions/filtered_data.csv"
+
+
+def file_fingerprint(path):
+    """
+    Returns the SHA-256 of the content of a file, or None if it does not exist.
+    """
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PipelineContext:
+    """
+    State shared by the stages of a pipeline run: the setup and model files,
+    parsed once, and a single database engine and session.
+    """
+
+    def __init__(self, setup_file="setup.yaml", model_file="model.yaml"):
+        self.setup_file = setup_file
+        self.model_file = model_file
+        with open(setup_file) as f:
+            self.setup = yaml.safe_load(f)
+        self.output_dir = self.setup["output_dir"]
+        self._model = None
+        self._engine = None
+        self._session = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            if os.path.isdir(self.model_file):
+                from automatic_university_scheduler.model_directory import (
+                    read_model_directory,
+                )
+
+                self._model, _ = read_model_directory(self.model_file)
+            else:
+                self._model = read_from_yaml(self.model_file)
+        return self._model
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = create_engine(self.setup["engine"], echo=False)
+            Base.metadata.create_all(self._engine)
+        return self._engine
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = Session(self.engine)
+        return self._session
+
+    @property
+    def database_file(self):
+        """
+        The path of the database for file based SQLite engines, else None.
+        """
+        url = make_url(self.setup["engine"])
+        if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+            return None
+        return url.database
+
+    @property
+    def extraction_file(self):
+        return self.setup.get("extraction_file", EXTRACTION_FILE)
+
+    def project(self, profile="solve"):
+        """
+        Loads the project, other stages or the solver callbacks may have changed
+        the database since the session last read it.
+        """
+        self.session.expire_all()
+        return load_project(self.session, profile=profile)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+
+def database_stamp(context):
+    """
+    Returns a cheap stamp (size and modification time) of a file based database,
+    used to detect changes made outside of the pipeline, or None.
+    """
+    path = context.database_file
+    if path is None or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A pipeline stage: `run(context)` is skipped when the fingerprint of its
+    `inputs(context)` files, of the setup values it uses (`settings(context)`)
+    and of the last run of its `depends` stages did not change and its
+    `outputs(context)` exist. Stages that read the database are also rerun when
+    it was modified outside of the pipeline. Bump `version` when the stage code
+    changes its outputs.
+    """
+
+    name: str
+    run: Callable
+    depends: tuple = ()
+    inputs: Callable = lambda context: []
+    settings: Callable = lambda context: {}
+    outputs: Callable = lambda context: []
+    reads_database: bool = True
+    version: int = 1
+
+
+def stage_fingerprint(stage, context, state):
+    """
+    Returns the fingerprint of a stage given the current pipeline `state`.
+    """
+    data = {
+        "stage": stage.name,
+        "version": stage.version,
+        "inputs": {path: file_fingerprint(path) for path in stage.inputs(context)},
+        "settings": stage.settings(context),
+        "depends": {
+            name: state["stages"].get(name, {}).get("run") for name in stage.depends
+        },
+    }
+    data = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def read_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {"stages": {}, "database": None}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_state(state, path=STATE_FILE):
+    with open(path, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+
+def stale_reason(stage, context, state, database_changed=False):
+    """
+    Returns why a stage has to run, or None if it is up to date.
+    """
+    last = state["stages"].get(stage.name)
+    if last is None:
+        return "never run"
+    if last["fingerprint"] != stage_fingerprint(stage, context, state):
+        return "inputs changed"
+    missing = [path for path in stage.outputs(context) if not os.path.exists(path)]
+    if len(missing) > 0:
+        return f"missing {missing[0]}"
+    if stage.reads_database and database_changed:
+        return "database changed"
+    return None
+
+
+def stages_order(stages, targets=None):
+    """
+    Returns the names of the `targets` stages and of all their dependencies in
+    an order compatible with the dependencies (all the stages by default).
+    """
+    if targets is None:
+        targets = list(stages)
+    selected = set()
+    pending = list(targets)
+    while len(pending) > 0:
+        name = pending.pop()
+        if name not in stages:
+            raise ValueError(f"Unknown stage {name}, expected one of {list(stages)}")
+        if name not in selected:
+            selected.add(name)
+            pending.extend(stages[name].depends)
+    sorter = graphlib.TopologicalSorter(
+        {name: stages[name].depends for name in stages if name in selected}
+    )
+    return list(sorter.static_order())
+
+
+def run_pipeline(
+    targets=None,
+    stages=None,
+    force=(),
+    dry_run=False,
+    setup_file="setup.yaml",
+    model_file="model.yaml",
+    state_file=STATE_FILE,
+):
+    """
+    Runs the `targets` stages (all by default) and their dependencies in one
+    process, skipping the up to date ones. A stage that runs makes all the
+    stages depending on it stale.
+
+    Parameters:
+    targets (list): The stages to bring up to date.
+    stages (dict): The stages by name, PIPELINE_STAGES by default.
+    force (iterable): Stages to run even if they are up to date.
+    dry_run (bool): Only reports what would run.
+    setup_file (str): The setup file.
+    model_file (str): The model file.
+    state_file (str): The file storing the fingerprints of the last runs.
+
+    Returns:
+    dict: The reason why each stage ran (None for the skipped ones).
+    """
+    if stages is None:
+        stages = PIPELINE_STAGES
+    order = stages_order(stages, targets)
+    context = PipelineContext(setup_file=setup_file, model_file=model_file)
+    state = read_state(state_file)
+    database_changed = state["database"] != database_stamp(context)
+    reasons = {}
+    try:
+        for name in order:
+            stage = stages[name]
+            reason = stale_reason(stage, context, state, database_changed)
+            if name in force:
+                reason = "forced"
+            if reason is None and any(reasons[d] is not None for d in stage.depends):
+                reason = "dependency out of date"
+            reasons[name] = reason
+            if reason is None:
+                print(f"STAGE {name}: up to date => {Messages.SUCCESS}")
+                continue
+            print(f"STAGE {name}: {reason}")
+            if dry_run:
+                continue
+            # Fingerprinted before the run: its inputs are read by the run
+            fingerprint = stage_fingerprint(stage, context, state)
+            t0 = time.time()
+            stage.run(context)
+            state["stages"][name] = {
+                "fingerprint": fingerprint,
+                "run": uuid.uuid4().hex,
+                "time": time.time() - t0,
+            }
+            state["database"] = database_stamp(context)
+            database_changed = False
+            write_state(state, state_file)
+            print(
+                f"STAGE {name}: done in {time.time() - t0:.2f} s => {Messages.SUCCESS}"
+            )
+    finally:
+        context.close()
+    return reasons
+
+
+def clean_pipeline(setup_file="setup.yaml", state_file=STATE_FILE):
+    """
+    Removes the output directory and the pipeline state.
+    """
+    with open(setup_file) as f:
+        setup = yaml.safe_load(f)
+    shutil.rmtree(setup["output_dir"], ignore_errors=True)
+    if os.path.exists(state_file):
+        os.remove(state_file)
+    print(f"Output directory removed => {Messages.SUCCESS}")
+
+
+# STAGES
+
+
+def load_stage(context):
+    """
+    Recreates the database and loads the model into it. A model directory (see
+    model_directory) is loaded incrementally instead.
+    """
+    from automatic_university_scheduler.model_schema import validate_model
+    from automatic_university_scheduler.preprocessing import create_project
+
+    print(10 * "#" + " LOADING MODEL DATA INTO DATABASE " + 10 * "#")
+    if os.path.isdir(context.model_file):
+        from automatic_university_scheduler.model_directory import (
+            load_model_directory,
+        )
+
+        load_model_directory(context.session, context.model_file)
+        return
+    # Fails before the database is dropped
+    validate_model(context.model)
+    print(f"Model validated => {Messages.SUCCESS}")
+    context.close()
+    engine = context.engine
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    print(f"Database recreated => {Messages.SUCCESS}")
+    create_project(context.session, context.model, validate=False)
+    print(f"Model loaded => {Messages.SUCCESS}")
+
+
+def analyze_stage(context):
+    """
+    Analyzes the constraints graphs and writes the validation e-mail of each
+    course.
+    """
+    from automatic_university_scheduler.graph_analysis import analyze_project_graph
+    from automatic_university_scheduler.graph_rendering import render_graphs
+    from automatic_university_scheduler.postprocessing import ressources_dataframe
+    from automatic_university_scheduler.validation import analyze_contraints_graph
+    from automatic_university_scheduler.validation_emails import (
+        validation_email_tasks,
+        write_validation_emails,
+    )
+
+    setup = context.setup
+    validation_dir = f"{context.output_dir}/validation"
+    project = context.project(profile="validate")
+    print("Project:")
+    analyze_project_graph(project)
+
+    # GRAPHS: "png" or "svg" images, rendered by "mermaid.ink" (network access),
+    # "mmdc" (local mermaid-cli) or "builtin" (offline, svg only)
+    graph_image_format = setup.get("graph_image_format", "png")
+    graphs = {
+        f"course_{course.label}": (
+            course.activity_graph,
+            f"Course {course.label} Constraints Graph",
+        )
+        for course in project.courses
+    }
+    graphs_paths = render_graphs(
+        graphs,
+        f"{validation_dir}/graphs/",
+        formats=("html", graph_image_format),
+        renderer=setup.get("graph_renderer", "mermaid.ink"),
+    )
+    for course in project.courses:
+        print(f"Course: {course.label}")
+        analyze_contraints_graph(graphs[f"course_{course.label}"][0])
+
+    tasks = validation_email_tasks(
+        project,
+        ressources_dataframe(project),
+        graphs_paths,
+        f"{validation_dir}/emails/",
+        setup.get("validation_deadline", "15/11/2024"),
+        reminder_deadline=setup.get("reminder_deadline", "-PT24H"),
+        graph_image_format=graph_image_format,
+        activities_output_dir=f"{validation_dir}/activities/",
+    )
+    write_validation_emails(tasks)
+
+
+def solve_stage(context):
+    """
+    Imports the static activities of the ADE extraction, checks the project and
+    solves it, the solution being written to the database.
+    """
+    import pandas as pd
+    from ortools.sat.python import cp_model
+    from automatic_university_scheduler.database import StaticActivity
+    from automatic_university_scheduler.feasibility import (
+        find_infeasible_core,
+        presolve_checks,
+    )
+    from automatic_university_scheduler.optimize import (
+        SolutionPrinter,
+        build_model,
+        delete_imported_static_activities,
+        export_solution_to_database,
+    )
+    from automatic_university_scheduler.preprocessing import (
+        USMB_SLOT_STRING_KEY,
+        extract_constraints_from_table,
+    )
+    from automatic_university_scheduler.telemetry import Telemetry
+    from automatic_university_scheduler.utils import create_instance
+
+    setup = context.setup
+    session = context.session
+    project = context.project(profile="solve")
+    telemetry = Telemetry(
+        f"{context.output_dir}/telemetry.jsonl",
+        label=project.label,
+        engine=setup["engine"],
+        activities=len(project.activities),
+        starts_after_constraints=len(project.starts_after_constraints),
+    )
+
+    # STATIC ACTIVITIES
+    delete_imported_static_activities(session)
+    path = context.extraction_file
+    # Read as strings: the occupied slots strings have leading zeros
+    dtype = {USMB_SLOT_STRING_KEY: str}
+    if path.endswith(".xlsx"):
+        raw_data = pd.read_excel(path, header=0, dtype=dtype)
+    elif path.endswith(".csv"):
+        raw_data = pd.read_csv(path, header=0, dtype=dtype)
+    else:
+        raise ValueError("Invalid file format")
+    with telemetry.phase("extract_constraints_from_table"):
+        _, _, static_activities_kwargs = extract_constraints_from_table(
+            raw_data, project
+        )
+        for kwargs in static_activities_kwargs:
+            create_instance(session, StaticActivity, **kwargs)
+        session.commit()
+        project = context.project(profile="solve")
+
+    print("PRE-SOLVE FEASIBILITY CHECKS")
+    with telemetry.phase("presolve_checks"):
+        issues = presolve_checks(project)
+    if len(issues) > 0:
+        telemetry.close()
+        raise SystemExit(f"Model is infeasible: {Messages.ERROR}")
+
+    # GREEDY CONSTRUCTION: hints the model with a schedule built without search
+    hinted = project
+    if setup.get("greedy_hints", False):
+        from automatic_university_scheduler.greedy import greedy_schedule
+
+        print("GREEDY CONSTRUCTION")
+        with telemetry.phase("greedy_schedule"):
+            hinted = greedy_schedule(project).hinted_snapshot(project)
+
+    # MULTI-RESOLUTION: the fine model is hinted and its start windows narrowed
+    # by coarse solves, the whole model being solved if they make it infeasible
+    candidates = [hinted]
+    factors = setup.get("multiresolution_factors")
+    if factors:
+        from automatic_university_scheduler.multiresolution import (
+            multiresolution_snapshot,
+        )
+
+        print("MULTI-RESOLUTION SOLVE")
+        with telemetry.phase("multiresolution_snapshot"):
+            snapshot = multiresolution_snapshot(
+                hinted,
+                factors=factors,
+                window=project.duration_to_slots(
+                    setup.get("multiresolution_window", "1d")
+                ),
+                max_time_in_seconds=setup.get("coarse_max_time_in_seconds", 30),
+                num_search_workers=setup.get("num_search_workers", 8),
+                telemetry=telemetry,
+            )
+        candidates.insert(0, snapshot)
+
+    for i, candidate in enumerate(candidates):
+        model, variables = build_model(
+            candidate, telemetry=telemetry, open_time=setup.get("open_time", False)
+        )
+        print("CHECK MODEL INTEGRITY")
+        out = model.Validate()
+        if out != "":
+            telemetry.close()
+            raise SystemExit(f"Model is not valid: {out} {Messages.ERROR}")
+        print(f"  => Model is  valid: {Messages.SUCCESS}")
+
+        print("SOLVING ...")
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = setup.get("max_time_in_seconds", 150)
+        solver.parameters.num_search_workers = setup.get("num_search_workers", 8)
+        telemetry.attach(solver)
+        solution_printer = SolutionPrinter(
+            context.engine,
+            variables["activities_starts"],
+            variables["activities_alternative_ressources"],
+            dump_dir=f"{context.output_dir}/dumps",
+            limit=setup.get("solution_limit", 25),
+            telemetry=telemetry,
+            open_time=variables["open_time"],
+        )
+        status = solver.Solve(model, solution_printer)
+        if status != cp_model.INFEASIBLE or i == len(candidates) - 1:
+            break
+        print(f"  => Narrowed start windows are infeasible: {Messages.WARNING}")
+    telemetry.status(solver, status)
+    status_name = solver.StatusName(status)
+    print(f"SOLVER STATUS: {status_name}")
+    print(f"Elapsed time: {solver.WallTime():.2f} s")
+    if status_name == "INFEASIBLE":
+        print("EXTRACTING INFEASIBLE CORE")
+        find_infeasible_core(project)
+    elif status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        export_solution_to_database(
+            solver,
+            context.engine,
+            variables["activities_starts"],
+            variables["activities_alternative_ressources"],
+            open_time=variables["open_time"],
+        )
+        print(f"  => Solution found: {Messages.SUCCESS}")
+    telemetry.close()
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        raise SystemExit(f"No solution found ({status_name}) {Messages.ERROR}")
+
+
+def postprocess_stage(context):
+    """
+    Exports the planification of each course to Excel and the timetable of each
+    ressource.
+    """
+    import pandas as pd
+    from automatic_university_scheduler.postprocessing import planification_dataframe
+    from automatic_university_scheduler.timetables import export_timetables
+
+    activities_output_dir = f"{context.output_dir}/planification/activities/"
+    create_directory(activities_output_dir)
+    project = context.project(profile=None)
+
+    writer = pd.ExcelWriter(
+        f"{activities_output_dir}/scheduled_activities.xlsx", engine="xlsxwriter"
+    )
+    planification = planification_dataframe(project)
+    for label, out in planification.groupby("course", sort=False):
+        sheet_name = f"{label}"
+        out = out.drop(columns="course")
+        out.to_excel(writer, sheet_name=sheet_name, index=False, startrow=0)
+        worksheet = writer.sheets[sheet_name]
+        my_format = writer.book.add_format(
+            {"align": "center", "valign": "vcenter", "border": 0, "font_size": 11}
+        )
+        worksheet.set_column("A:I", 10, my_format)
+        worksheet.set_column("H:H", 20, my_format)
+        worksheet.set_column("J:L", 30, my_format)
+        worksheet.autofilter("A1:I1")
+    writer.close()
+
+    timetables_output_dir = f"{context.output_dir}/planification/timetables/"
+    paths = export_timetables(project, timetables_output_dir)
+    print(f"{len(paths)} timetables files written to {timetables_output_dir}")
+
+
+def _database_outputs(context):
+    return [] if context.database_file is None else [context.database_file]
+
+
+def _model_inputs(context):
+    if not os.path.isdir(context.model_file):
+        return [context.model_file]
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(context.model_file)
+        for name in names
+    )
+
+
+def _setup_values(*keys):
+    """
+    Returns a `settings` function picking some keys of the setup.
+    """
+    return lambda context: {key: context.setup.get(key) for key in keys}
+
+
+PIPELINE_STAGES = {
+    "load": Stage(
+        name="load",
+        run=load_stage,
+        inputs=_model_inputs,
+        settings=_setup_values("engine"),
+        outputs=_database_outputs,
+        reads_database=False,
+    ),
+    "analyze": Stage(
+        name="analyze",
+        run=analyze_stage,
+        depends=("load",),
+        settings=_setup_values(
+            "output_dir",
+            "graph_image_format",
+            "graph_renderer",
+            "validation_deadline",
+            "reminder_deadline",
+        ),
+        outputs=lambda context: [f"{context.output_dir}/validation/emails"],
+    ),
+    "solve": Stage(
+        name="solve",
+        run=solve_stage,
+        depends=("load",),
+        inputs=lambda context: [context.extraction_file],
+        settings=_setup_values(
+            "output_dir",
+            "extraction_file",
+            "max_time_in_seconds",
+            "num_search_workers",
+            "solution_limit",
+            "multiresolution_factors",
+            "multiresolution_window",
+            "coarse_max_time_in_seconds",
+            "open_time",
+            "greedy_hints",
+        ),
+        outputs=lambda context: [f"{context.output_dir}/telemetry.jsonl"],
+    ),
+    "postprocess": Stage(
+        name="postprocess",
+        run=postprocess_stage,
+        depends=("solve",),
+        settings=_setup_values("output_dir"),
+        outputs=lambda context: [
+            f"{context.output_dir}/planification/activities/scheduled_activities.xlsx"
+        ],
+    ),
+}
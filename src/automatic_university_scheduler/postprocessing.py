@@ -0,0 +1,399 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+from automatic_university_scheduler.database import (
+    Activity,
+    ActivityKind,
+    Course,
+    Room,
+    StaticActivity,
+    StudentsGroup,
+    Teacher,
+    activity_room_pool_association_table,
+    activity_room_allocation_association_table,
+    activity_teacher_pool_association_table,
+    activity_teacher_allocation_association_table,
+    static_activity_room_allocation_association_table,
+    static_activity_teacher_allocation_association_table,
+    student_atomic_groups_association_table,
+)
+
+# Columns of Activity.planification_to_series, plus the course
+PLANIFICATION_COLUMNS = [
+    "id",
+    "label",
+    "kind",
+    "start_slot",
+    "year",
+    "week",
+    "weekday",
+    "start",
+    "end",
+    "duration",
+    "students",
+    "allocated_teachers",
+    "allocated_rooms",
+    "teacher_pool",
+    "teacher_count",
+    "room_pool",
+    "room_count",
+    "course",
+]
+
+# Columns of StaticActivity.planification_to_series
+STATIC_PLANIFICATION_COLUMNS = PLANIFICATION_COLUMNS[:13]
+
+# Columns of Activity.ressources_to_series, plus the course
+RESSOURCES_COLUMNS = [
+    "id",
+    "label",
+    "kind",
+    "duration",
+    "students",
+    "teacher_pool",
+    "teacher_count",
+    "room_pool",
+    "room_count",
+    "latest_start",
+    "earliest_start",
+    "start",
+    "course",
+]
+
+
+def _session(project):
+    return Session.object_session(project)
+
+
+def _joined_labels(session, table, owner_column, column, owners, index):
+    """
+    Returns the ", " joined values of `column` associated to each owner (activity
+    or static activity) selected by the `owners` query through an association
+    table, in `column` order, aligned on `index`.
+    """
+    query = (
+        select(table.c[owner_column], column)
+        .join_from(table, column.class_)
+        .where(table.c[owner_column].in_(owners))
+        .order_by(table.c[owner_column], column)
+    )
+    values = {}
+    for owner, value in session.execute(query):
+        values.setdefault(owner, []).append(value)
+    joined = [", ".join(values.get(owner, [])) for owner in index.tolist()]
+    return np.array(joined, dtype=object)
+
+
+def _filter_conditions(courses, teachers, rooms, students_groups, static):
+    """
+    Returns the conditions selecting the activities (or static activities)
+    matching all the filters (labels).
+    """
+    model = StaticActivity if static else Activity
+    conditions = []
+    if courses is not None:
+        if static:
+            conditions.append(StaticActivity.course.in_(list(courses)))
+        else:
+            conditions.append(
+                Activity.course_id.in_(
+                    select(Course.id).where(Course.label.in_(list(courses)))
+                )
+            )
+    if teachers is not None:
+        table = (
+            static_activity_teacher_allocation_association_table
+            if static
+            else activity_teacher_allocation_association_table
+        )
+        owner = table.c["static_activity_id" if static else "activity_id"]
+        conditions.append(
+            model.id.in_(
+                select(owner)
+                .join_from(table, Teacher)
+                .where(Teacher.label.in_(list(teachers)))
+            )
+        )
+    if rooms is not None:
+        table = (
+            static_activity_room_allocation_association_table
+            if static
+            else activity_room_allocation_association_table
+        )
+        owner = table.c["static_activity_id" if static else "activity_id"]
+        conditions.append(
+            model.id.in_(
+                select(owner).join_from(table, Room).where(Room.label.in_(list(rooms)))
+            )
+        )
+    if students_groups is not None:
+        # Activities attended by any student of the groups
+        members = aliased(student_atomic_groups_association_table)
+        attended = aliased(student_atomic_groups_association_table)
+        conditions.append(
+            model.students_id.in_(
+                select(attended.c.group_id)
+                .join(members, members.c.atom_id == attended.c.atom_id)
+                .join(StudentsGroup, StudentsGroup.id == members.c.group_id)
+                .where(StudentsGroup.label.in_(list(students_groups)))
+            )
+        )
+    return conditions
+
+
+def _planification_columns(project, data):
+    """
+    Replaces the start_slot and duration columns of `data` by the columns of
+    `planification_to_series`: start slot, ISO year, week and weekday, start and
+    end clocks (looked up in the project calendar) and duration string.
+    """
+    calendar = project.calendar
+    scheduled = data["start_slot"].notna().values
+    starts = data["start_slot"].values[scheduled].astype(np.int64)
+    ends = starts + data["duration"].values[scheduled].astype(np.int64)
+    year, week, weekday, start_daily_slot = calendar.isocalendar(starts)
+    end_daily_slot = calendar.isocalendar(ends)[3]
+    columns = {
+        "year": year,
+        "week": week,
+        "weekday": weekday,
+        "start": _clock(start_daily_slot, calendar.slot_seconds),
+        "end": _clock(end_daily_slot, calendar.slot_seconds),
+    }
+    for column, values in columns.items():
+        data[column] = pd.Series(values, index=data.index[scheduled])
+    for column in ["start_slot", "year", "week", "weekday"]:
+        data[column] = data[column].astype("Int64")
+    durations = {
+        d: project.slots_to_duration(int(d)).to_str()
+        for d in data["duration"].unique().tolist()
+    }
+    data["duration"] = data["duration"].map(durations)
+    return data
+
+
+def _strings(data, columns):
+    """
+    Stores string columns as objects with None for missing values, as in the
+    series exports.
+    """
+    for column in columns:
+        values = data[column].astype(object)
+        data[column] = values.where(values.notna(), None)
+    return data
+
+
+def _clock(daily_slots, slot_seconds):
+    minutes = pd.Series(daily_slots * slot_seconds // 60)
+    return (
+        (minutes // 60).astype(str).str.zfill(2)
+        + ":"
+        + (minutes % 60).astype(str).str.zfill(2)
+    ).values
+
+
+def _isocalendar_strings(project, slots):
+    """
+    Formats slots as DateTime.to_str() does ("%G-W%V-%u %H:%M"), None for
+    missing slots.
+    """
+    slots = pd.Series(slots)
+    out = pd.Series(None, index=slots.index, dtype=object)
+    valid = slots.notna().values
+    if valid.any():
+        calendar = project.calendar
+        year, week, weekday, daily_slot = calendar.isocalendar(
+            slots[valid].astype(np.int64).values
+        )
+        out[valid] = (
+            pd.Series(year).astype(str)
+            + "-W"
+            + pd.Series(week).astype(str).str.zfill(2)
+            + "-"
+            + pd.Series(weekday).astype(str)
+            + " "
+            + _clock(daily_slot, calendar.slot_seconds)
+        ).values
+    return out.values
+
+
+def activities_dataframe(
+    project, courses=None, teachers=None, rooms=None, students_groups=None
+) -> pd.DataFrame:
+    """
+    Exports the activities of a project as a single DataFrame, with one joined
+    query for the activities and one query per ressources association, instead of
+    one `planification_to_series` per activity.
+
+    Parameters:
+    project (Project): The project.
+    courses (iterable): Only keep the activities of these courses (labels).
+    teachers (iterable): Only keep the activities allocated to these teachers
+        (labels).
+    rooms (iterable): Only keep the activities allocated to these rooms (labels).
+    students_groups (iterable): Only keep the activities attended by a student of
+        these groups (labels).
+
+    Returns:
+    pd.DataFrame: The columns of `planification_to_series` and
+    `ressources_to_series` (as earliest_start, latest_start and start_datetime),
+    plus the course, one row per activity.
+    """
+    session = _session(project)
+    conditions = [Activity.project_id == project.id] + _filter_conditions(
+        courses, teachers, rooms, students_groups, static=False
+    )
+    query = (
+        select(
+            Activity.id,
+            Activity.label,
+            ActivityKind.label,
+            Activity.start,
+            Activity.duration,
+            StudentsGroup.label,
+            Activity.teacher_count,
+            Activity.room_count,
+            Activity.earliest_start_slot,
+            Activity.latest_start_slot,
+            Course.label,
+        )
+        .join_from(Activity, ActivityKind, Activity.kind_id == ActivityKind.id)
+        .join(StudentsGroup, Activity.students_id == StudentsGroup.id)
+        .join(Course, Activity.course_id == Course.id)
+        .where(*conditions)
+        .order_by(Activity.id)
+    )
+    data = pd.DataFrame(
+        session.execute(query).all(),
+        columns=[
+            "id",
+            "label",
+            "kind",
+            "start_slot",
+            "duration",
+            "students",
+            "teacher_count",
+            "room_count",
+            "earliest_start_slot",
+            "latest_start_slot",
+            "course",
+        ],
+    )
+    owners = select(Activity.id).where(*conditions)
+    for column, table, ressource in [
+        (
+            "allocated_teachers",
+            activity_teacher_allocation_association_table,
+            Teacher.full_name,
+        ),
+        ("allocated_rooms", activity_room_allocation_association_table, Room.label),
+        ("teacher_pool", activity_teacher_pool_association_table, Teacher.full_name),
+        ("room_pool", activity_room_pool_association_table, Room.label),
+    ]:
+        data[column] = _joined_labels(
+            session, table, "activity_id", ressource, owners, data["id"]
+        )
+    data["earliest_start"] = _isocalendar_strings(project, data["earliest_start_slot"])
+    data["latest_start"] = _isocalendar_strings(project, data["latest_start_slot"])
+    data["start_datetime"] = _isocalendar_strings(project, data["start_slot"])
+    data = _planification_columns(project, data)
+    return data
+
+
+def planification_dataframe(
+    project, courses=None, teachers=None, rooms=None, students_groups=None
+) -> pd.DataFrame:
+    """
+    Bulk version of `Activity.planification_to_series` (see
+    `activities_dataframe` for the filters).
+    """
+    data = activities_dataframe(project, courses, teachers, rooms, students_groups)
+    return _strings(data[PLANIFICATION_COLUMNS], ["students", "start", "end"])
+
+
+def ressources_dataframe(
+    project, courses=None, teachers=None, rooms=None, students_groups=None
+) -> pd.DataFrame:
+    """
+    Bulk version of `Activity.ressources_to_series` (see `activities_dataframe`
+    for the filters).
+    """
+    data = activities_dataframe(project, courses, teachers, rooms, students_groups)
+    data["start"] = data["start_datetime"]
+    return _strings(
+        data[RESSOURCES_COLUMNS], ["latest_start", "earliest_start", "start"]
+    )
+
+
+def static_planification_dataframe(
+    project, courses=None, teachers=None, rooms=None, students_groups=None
+) -> pd.DataFrame:
+    """
+    Bulk version of `StaticActivity.planification_to_series` (see
+    `activities_dataframe` for the filters, `courses` matching the course
+    column of the static activities), with one line per occurrence of the
+    recurring static activities.
+    """
+    session = _session(project)
+    conditions = [StaticActivity.project_id == project.id] + _filter_conditions(
+        courses, teachers, rooms, students_groups, static=True
+    )
+    query = (
+        select(
+            StaticActivity.id,
+            StaticActivity.label,
+            StaticActivity.kind,
+            StaticActivity.start,
+            StaticActivity.duration,
+            StaticActivity.period,
+            StaticActivity.count,
+            StudentsGroup.label,
+        )
+        .join_from(
+            StaticActivity,
+            StudentsGroup,
+            StaticActivity.students_id == StudentsGroup.id,
+            isouter=True,
+        )
+        .where(*conditions)
+        .order_by(StaticActivity.id)
+    )
+    data = pd.DataFrame(
+        session.execute(query).all(),
+        columns=[
+            "id",
+            "label",
+            "kind",
+            "start_slot",
+            "duration",
+            "period",
+            "count",
+            "students",
+        ],
+    )
+    owners = select(StaticActivity.id).where(*conditions)
+    for column, table, ressource in [
+        (
+            "allocated_teachers",
+            static_activity_teacher_allocation_association_table,
+            Teacher.full_name,
+        ),
+        (
+            "allocated_rooms",
+            static_activity_room_allocation_association_table,
+            Room.label,
+        ),
+    ]:
+        data[column] = _joined_labels(
+            session, table, "static_activity_id", ressource, owners, data["id"]
+        )
+    # OCCURRENCES
+    counts = data["count"].fillna(1).astype(np.int64).values
+    data = data.loc[data.index.repeat(counts)].reset_index(drop=True)
+    occurrence = data.groupby("id").cumcount().values
+    data["start_slot"] = data["start_slot"] + occurrence * data["period"].fillna(0)
+    data = _planification_columns(project, data)
+    return _strings(
+        data[STATIC_PLANIFICATION_COLUMNS], ["kind", "students", "start", "end"]
+    )
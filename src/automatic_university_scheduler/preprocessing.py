@@ -1,5 +1,9 @@
 from automatic_university_scheduler.datetimeutils import DateTime as DT
-from automatic_university_scheduler.datetimeutils import TimeDelta, datetime_to_slot
+from automatic_university_scheduler.datetimeutils import (
+    TimeDelta,
+    datetime_to_slot,
+)
+from automatic_university_scheduler.model_schema import validate_model
 from automatic_university_scheduler.utils import create_instance
 from automatic_university_scheduler.database import (
     DailySlot,
@@ -17,13 +21,16 @@ from automatic_university_scheduler.database import (
     StudentsGroup,
     Manager,
     Planner,
+    Project,
 )
 import numpy as np
 import itertools
 import copy
 import math
 import datetime
-import pandas as pd
+
+# Column of the USMB (ADE) extractions holding the occupied slots of the day
+USMB_SLOT_STRING_KEY = 'Chaîne qui référenence les créneaux occupés par tranche de 15mn de "00:00" à "23:45". (de gauche à droite car n°1 = plage de 00:00 à 00:15 -> car n°96 = plage de 23:45 à 00:00)'
 
 
 def load_setup(data):
@@ -54,7 +61,9 @@ def load_setup(data):
         horizon_datetime, origin_datetime, out["TIME_SLOT_DURATION"], round="floor"
     )
     out["ACTIVITIES_KINDS"] = data["activity_kinds"]
-    out["SUCCESSION_CONSTRAINT_RELAXATION_FACTOR"] = data["succession_constraint_relaxation_factor"]
+    out["SUCCESSION_CONSTRAINT_RELAXATION_FACTOR"] = data.get(
+        "succession_constraint_relaxation_factor", 1.0
+    )
     return out
 
 
@@ -82,7 +91,12 @@ def process_constraint_static_activity(
     constraint, origin_datetime, horizon, time_slot_duration, **kwargs
 ):
     """
-    Process a constraint and return a dictionary with the necessary information to create a StaticActivity object.
+    Process a constraint and return a list of dictionaries with the necessary
+    information to create StaticActivity objects.
+
+    A repeated constraint (`repeat` occurrences every `offset`) is stored as a
+    single recurring static activity (see StaticActivity.period and count), the
+    occurrences cut by the bounds of the horizon being stored apart.
     """
     out = []
     if "repeat" not in constraint.keys():
@@ -109,12 +123,24 @@ def process_constraint_static_activity(
         start = min(max(start0 + offset * repeat, 0), horizon)
         end = min(max(end0 + offset * repeat, 0), horizon)
         duration = end - start
-        if duration > 0:
+        if duration <= 0:
+            continue
+        previous = out[-1] if len(out) > 0 else None
+        whole = start == start0 + offset * repeat and end == end0 + offset * repeat
+        if (
+            whole
+            and previous is not None
+            and previous["whole"]
+            and start == previous["start"] + offset * previous["count"]
+        ):
+            previous["count"] += 1
+            previous["period"] = offset
+        else:
             dic = copy.copy(kwargs)
-            dic["start"] = start
-            dic["duration"] = duration
+            dic.update(start=start, duration=duration, count=1, whole=whole)
             out.append(dic)
-
+    for dic in out:
+        del dic["whole"]
     return out
 
 
@@ -129,9 +155,15 @@ def create_students(session, project, students_data):
     for group, group_data in students_data["groups"].items():
         students_groups_labels.add(group)
         atomic_students_labels.update(group_data)
+    headcounts = students_data.get("headcounts", {})
     for label in sorted(list(atomic_students_labels)):
         atomic_students[label] = create_instance(
-            session, AtomicStudent, label=label, project=project, commit=True
+            session,
+            AtomicStudent,
+            label=label,
+            project=project,
+            headcount=headcounts.get(label),
+            commit=True,
         )
     for label in sorted(list(students_groups_labels)):
         students = np.array(
@@ -290,6 +322,164 @@ def create_planners(session, project, planners_data):
     return planners
 
 
+def resolve_room_pools(courses_data, room_pools):
+    """
+    Replaces the room pool aliases of the activities of courses by the labels of
+    their rooms and returns the set of all the rooms labels.
+    """
+    rooms_labels = set()
+    for course_label, course_data in courses_data.items():
+        activities = course_data["activities"]
+        for activity, activity_data in activities.items():
+            activity_room_pool = activity_data["rooms"]["pool"]
+            if type(activity_room_pool) == str:
+                room_pool = room_pools[activity_room_pool]
+            else:
+                room_pool = activity_data["rooms"]["pool"]
+            rooms_labels.update(room_pool)
+            activity_data["rooms"]["pool"] = room_pool
+    return rooms_labels
+
+
+def activity_arguments(
+    project,
+    activity_label,
+    activity_data,
+    rooms,
+    teachers,
+    students_groups,
+    activity_kinds,
+):
+    """
+    Returns the keyword arguments of an Activity (except its course and project)
+    from its model data, the room pools being resolved.
+    """
+    duration_to_slots = project.duration_to_slots
+    datetime_to_slot = project.datetime_to_slot
+    activity_args = {"label": activity_label}
+    activity_args["kind"] = activity_kinds[activity_data["kind"]]
+    activity_args["duration"] = duration_to_slots(activity_data["duration"])
+    activity_args["room_pool"] = [rooms[l] for l in activity_data["rooms"]["pool"]]
+    activity_args["teacher_pool"] = [
+        teachers[l] for l in activity_data["teachers"]["pool"]
+    ]
+    activity_args["teacher_count"] = activity_data["teachers"]["count"]
+    activity_args["room_count"] = activity_data["rooms"]["count"]
+    activity_args["students"] = students_groups[activity_data["students"]]
+    if activity_args["teacher_count"] > len(activity_args["teacher_pool"]):
+        raise ValueError(
+            f"Teacher count for activity {activity_label} is greater than the number of teachers in the pool"
+        )
+    if activity_args["room_count"] > len(activity_args["room_pool"]):
+        raise ValueError(
+            f"Room count for activity {activity_label} is greater than the number of rooms in the pool"
+        )
+    activity_args["earliest_start_slot"] = None
+    activity_args["latest_start_slot"] = None
+    if "earliest_start" in activity_data.keys():
+        activity_args["earliest_start_slot"] = datetime_to_slot(
+            activity_data["earliest_start"], round="ceil"
+        )
+    if "latest_start" in activity_data.keys():
+        activity_args["latest_start_slot"] = datetime_to_slot(
+            activity_data["latest_start"], round="floor"
+        )
+    return activity_args
+
+
+def create_course_groups_and_constraints(
+    session, project, course, course_data, activities_dic, commit=True
+):
+    """
+    Creates the inner and foreign activity groups of a course and the starts
+    after constraints between them.
+
+    Parameters:
+    course (Course): The course owning the groups.
+    course_data (dict): The model data of the course.
+    activities_dic (dict): The activities of the project by (course label,
+        activity label), foreign groups referring to other courses.
+    commit (bool): Commits each created instance.
+
+    Returns:
+    tuple: The created groups by (course label, group label) and the list of the
+    created constraints.
+    """
+    duration_to_slots = project.duration_to_slots
+    course_label = course.label
+    activities_groups_dic = {}
+    starts_after_constraints = []
+    for group_label, group_data in course_data["inner_activity_groups"].items():
+
+        gra = [activities_dic[(course_label, lab)] for lab in group_data]
+        activity_group_kwargs = {
+            "label": group_label,
+            "activities": gra,
+            "project": project,
+            "course": course,
+        }
+        new_activity_group = create_instance(
+            session, ActivityGroup, **activity_group_kwargs, commit=commit
+        )
+        activities_groups_dic[(course_label, group_label)] = new_activity_group
+
+    if "foreign_activity_groups" in course_data.keys():
+        for group_label, group_data in course_data["foreign_activity_groups"].items():
+            gra = [activities_dic[(clab, lab)] for clab, lab in group_data]
+            activity_group_kwargs = {
+                "label": group_label,
+                "activities": gra,
+                "project": project,
+                "course": course,
+            }
+            new_activity_group = create_instance(
+                session, ActivityGroup, **activity_group_kwargs, commit=commit
+            )
+            activities_groups_dic[(course_label, group_label)] = new_activity_group
+
+    for constraints_data in course_data["constraints"]:
+        if constraints_data["kind"] == "succession":
+            from_act_groups_labels = constraints_data["start_after"]
+            to_act_groups_labels = constraints_data["activities"]
+            min_offset = constraints_data["min_offset"]
+            if "max_offset" in constraints_data.keys():
+                max_offset = constraints_data["max_offset"]
+            else:
+                max_offset = None
+            for from_act_group_label, to_act_group_label in itertools.product(
+                from_act_groups_labels, to_act_groups_labels
+            ):
+                from_act_group = activities_groups_dic[
+                    (course_label, from_act_group_label)
+                ]
+                to_act_group = activities_groups_dic[(course_label, to_act_group_label)]
+                starts_after_constraint_kwargs = {
+                    "label": "starts_after",
+                    "project": project,
+                    "min_offset": duration_to_slots(min_offset),
+                    "max_offset": duration_to_slots(max_offset),
+                    "from_activity_group": from_act_group,
+                    "to_activity_group": to_act_group,
+                }
+
+                cons = create_instance(
+                    session,
+                    StartsAfterConstraint,
+                    **starts_after_constraint_kwargs,
+                    commit=commit,
+                )
+                starts_after_constraints.append(cons)
+    return activities_groups_dic, starts_after_constraints
+
+
+def room_capacity(rooms_data, label):
+    """
+    Returns the capacity of a room in the rooms section of a model, None if
+    unknown.
+    """
+    return (rooms_data or {}).get(label, {}).get("capacity")
+
+
 def create_activities_and_rooms(
     session,
     project,
@@ -300,32 +490,24 @@ def create_activities_and_rooms(
     planners,
     students_groups,
     activity_kinds,
+    rooms_data=None,
 ):
     """ """
-    duration_to_slots = project.duration_to_slots
-    datetime_to_slot = project.datetime_to_slot
     rooms = {}
     activities_dic = {}
     activities_groups_dic = {}
     starts_after_constraint_dic = {}
     courses_dic = {}
-    rooms_labels = set()
-
-    for course_label, course_data in courses_data.items():
-        activities = course_data["activities"]
-        for activity, activity_data in activities.items():
-            activity_room_pool = activity_data["rooms"]["pool"]
-            if type(activity_room_pool) == str:
-                room_pool = room_pools[activity_room_pool]
-            else:
-                room_pool = activity_data["rooms"]["pool"]
-            teacher_pool = activity_data["teachers"]["pool"]
-            rooms_labels.update(room_pool)
-            activity_data["rooms"]["pool"] = room_pool
+    rooms_labels = resolve_room_pools(courses_data, room_pools)
 
     for label in sorted(list(rooms_labels)):
         rooms[label] = create_instance(
-            session, Room, label=label, project=project, capacity=30, commit=True
+            session,
+            Room,
+            label=label,
+            project=project,
+            capacity=room_capacity(rooms_data, label),
+            commit=True,
         )
 
     for course_label, course_data in courses_data.items():
@@ -343,128 +525,51 @@ def create_activities_and_rooms(
         courses_dic[course_label] = course
         activities = course_data["activities"]
         for activity_label, activity_data in activities.items():
-            activity_args = {
-                "label": activity_label,
-                "course": course,
-                "project": project,
-            }
-            activity_args["kind"] = activity_kinds[activity_data["kind"]]
-            activity_args["duration"] = duration_to_slots(activity_data["duration"])
-            activity_args["room_pool"] = [
-                rooms[l] for l in activity_data["rooms"]["pool"]
-            ]
-            activity_args["teacher_pool"] = [
-                teachers[l] for l in activity_data["teachers"]["pool"]
-            ]
-            activity_args["teacher_count"] = activity_data["teachers"]["count"]
-            activity_args["room_count"] = activity_data["rooms"]["count"]
-            activity_args["students"] = students_groups[activity_data["students"]]
-            if activity_args["teacher_count"] > len(activity_args["teacher_pool"]):
-                raise ValueError(
-                    f"Teacher count for activity {activity_label} is greater than the number of teachers in the pool"
-                )
-            if activity_args["room_count"] > len(activity_args["room_pool"]):
-                raise ValueError(
-                    f"Room count for activity {activity_label} is greater than the number of rooms in the pool"
-                )
-            # new_activity = Activity(**activity_args)
-            if "earliest_start" in activity_data.keys():
-                activity_args["earliest_start_slot"] = datetime_to_slot(
-                    activity_data["earliest_start"], round="ceil"
-                )
-            if "latest_start" in activity_data.keys():
-                activity_args["latest_start_slot"] = datetime_to_slot(
-                    activity_data["latest_start"], round="floor"
-                )
+            activity_args = activity_arguments(
+                project,
+                activity_label,
+                activity_data,
+                rooms,
+                teachers,
+                students_groups,
+                activity_kinds,
+            )
             new_activity = create_instance(
-                session, Activity, **activity_args, commit=True
+                session,
+                Activity,
+                course=course,
+                project=project,
+                **activity_args,
+                commit=True,
             )
             activities_dic[(course_label, activity_label)] = new_activity
 
     for course_label, course_data in courses_data.items():
-        course = courses_dic[course_label]
-        manager = managers[course_data["manager"]]
-        planner = planners[course_data["planner"]]
-        for group_label, group_data in course_data["inner_activity_groups"].items():
-
-            gra = [activities_dic[(course_label, lab)] for lab in group_data]
-            activity_group_kwargs = {
-                "label": group_label,
-                "activities": gra,
-                "project": project,
-                "course": course,
-            }
-            new_activity_group = create_instance(
-                session, ActivityGroup, **activity_group_kwargs, commit=True
-            )
-            activities_groups_dic[(course_label, group_label)] = new_activity_group
-
-        if "foreign_activity_groups" in course_data.keys():
-            for group_label, group_data in course_data[
-                "foreign_activity_groups"
-            ].items():
-                gra = [activities_dic[(clab, lab)] for clab, lab in group_data]
-                activity_group_kwargs = {
-                    "label": group_label,
-                    "activities": gra,
-                    "project": project,
-                    "course": course,
-                }
-                new_activity_group = create_instance(
-                    session, ActivityGroup, **activity_group_kwargs, commit=True
-                )
-                activities_groups_dic[(course_label, group_label)] = new_activity_group
-
-        for constraints_data in course_data["constraints"]:
-            if constraints_data["kind"] == "succession":
-                from_act_groups_labels = constraints_data["start_after"]
-                to_act_groups_labels = constraints_data["activities"]
-                min_offset = constraints_data["min_offset"]
-                if "max_offset" in constraints_data.keys():
-                    max_offset = constraints_data["max_offset"]
-                else:
-                    max_offset = None
-                for from_act_group_label, to_act_group_label in itertools.product(
-                    from_act_groups_labels, to_act_groups_labels
-                ):
-                    from_act_group = activities_groups_dic[
-                        (course_label, from_act_group_label)
-                    ]
-                    to_act_group = activities_groups_dic[
-                        (course_label, to_act_group_label)
-                    ]
-                    starts_after_constraint_kwargs = {
-                        "label": "starts_after",
-                        "project": project,
-                        "min_offset": duration_to_slots(min_offset),
-                        "max_offset": duration_to_slots(max_offset),
-                        "from_activity_group": from_act_group,
-                        "to_activity_group": to_act_group,
-                    }
-
-                    cons = create_instance(
-                        session,
-                        StartsAfterConstraint,
-                        **starts_after_constraint_kwargs,
-                        commit=True,
-                    )
-                    starts_after_constraint_dic[cons.id] = cons
+        groups, constraints = create_course_groups_and_constraints(
+            session, project, courses_dic[course_label], course_data, activities_dic
+        )
+        activities_groups_dic.update(groups)
+        for cons in constraints:
+            starts_after_constraint_dic[cons.id] = cons
     return activities_dic, activities_groups_dic, rooms, starts_after_constraint_dic
 
 
-def create_activity_kinds(session, project, activity_kinds, daily_slots_dic):
+def create_activity_kinds(session, project, activity_kinds, daily_slots_dic=None):
+    """
+    Creates the activity kinds with their allowed start slots stored as bits, and
+    as DailySlot relationships too if `daily_slots_dic` is given.
+    """
     out = {}
     for kind_label, kind_data in activity_kinds.items():
         kind_kwargs = {"session": session, "project": project, "label": kind_label}
-        allowed_daily_start_slots = [
-            daily_slots_dic[i] for i in kind_data["allowed_start_time_slots"]
-        ]
-        out[kind_label] = create_instance(
-            allowed_daily_start_slots=allowed_daily_start_slots,
-            cls=ActivityKind,
-            **kind_kwargs,
-            commit=True,
-        )
+        slots = kind_data["allowed_start_time_slots"]
+        if daily_slots_dic is not None:
+            kind_kwargs["allowed_daily_start_slots"] = [
+                daily_slots_dic[i] for i in slots
+            ]
+        out[kind_label] = create_instance(cls=ActivityKind, **kind_kwargs)
+        out[kind_label].allowed_start_slots = slots
+    session.commit()
     return out
 
 
@@ -513,8 +618,9 @@ def extract_constraints_from_table(
     format="USMB",
     school="POLYTECH Annecy",
 ):
+    import pandas as pd
+
     setup = project.setup
-    TIME_SLOT_DURATION = setup["TIME_SLOT_DURATION"]
     TIME_SLOTS_PER_DAY = setup["TIME_SLOTS_PER_DAY"]
 
     tracked_ressources = {
@@ -528,7 +634,7 @@ def extract_constraints_from_table(
         "students": {s.label: s for s in project.students_groups},
     }
     if format == "USMB":
-        slot_string_key = 'Chaîne qui référenence les créneaux occupés par tranche de 15mn de "00:00" à "23:45". (de gauche à droite car n°1 = plage de 00:00 à 00:15 -> car n°96 = plage de 23:45 à 00:00)'
+        slot_string_key = USMB_SLOT_STRING_KEY
         raw_data = raw_data[raw_data["Année"].isna() == False]  # REMOVE LAST EMPTY LINE
 
         def process_weekday(s):
@@ -587,23 +693,26 @@ def extract_constraints_from_table(
         #         r: {"unavailable": []} for r in tracked_ressources[kind]
         #     }
 
+        # SLOTS
+        calendar = project.calendar
+        data["start_slot"] = calendar.to_slots(
+            data["year"].values,
+            data["week"].values,
+            data["weekday"].values,
+            data["from_dayslot"].values,
+            round="floor",
+        )
+        data["end_slot"] = calendar.to_slots(
+            data["year"].values,
+            data["week"].values,
+            data["weekday"].values,
+            data["to_dayslot"].values,
+            round="ceil",
+        )
+
         for index, row in data.iterrows():
-            start_time = TIME_SLOT_DURATION * row["from_dayslot"]
-            start_time_seconds = start_time.total_seconds()
-            start_time_hours = int(start_time_seconds // 3600)
-            start_time_minutes = int(
-                (start_time_seconds - start_time_hours * 3600) // 60
-            )
-            start_str = f"{row['year']}-W{ str(row['week']).zfill(2)}-{row['weekday']} {str(start_time_hours).zfill(2) }:{str(start_time_minutes).zfill(2)}"
-            start_datetime = DT.from_str(start_str)
-            end_time = TIME_SLOT_DURATION * row["to_dayslot"]
-            end_time_seconds = end_time.total_seconds()
-            end_time_hours = int(end_time_seconds // 3600)
-            end_time_minutes = int((end_time_seconds - end_time_hours * 3600) // 60)
-            end_str = f"{row['year']}-W{ str(row['week']).zfill(2)}-{row['weekday']} {str(end_time_hours).zfill(2) }:{str(end_time_minutes).zfill(2)}"
-            end_datetime = DT.from_str(end_str)
-            start_slot = project.datetime_to_slot(start_datetime, round="floor")
-            end_slot = project.datetime_to_slot(end_datetime, round="ceil")
+            start_slot = int(row["start_slot"])
+            end_slot = int(row["end_slot"])
             duration = end_slot - start_slot
             # BASIC STATIC ACTIVITY KWARGS
             kwargs = {
@@ -672,3 +781,76 @@ def extract_constraints_from_table(
         tracked_ressources,
         static_activities_kwargs,
     )
+
+
+def create_project(
+    session, model, label="project", validate=True, calendar_tables=False
+):
+    """
+    Loads a whole model, typically read from a model.yaml file, into the database.
+
+    Parameters:
+    session (Session): The database session.
+    model (dict): The model data with the setup, aliases, students, teachers,
+                  managers, planners and courses sections.
+    label (str): The label of the project.
+    validate (bool): Validates the model first, raising a ModelError listing all
+                     its errors before anything is written.
+    calendar_tables (bool): Also writes the week days, daily slots and week
+                            structure rows, the project only needing its bit
+                            masks.
+
+    Returns:
+    Project: The created project.
+    """
+    if validate:
+        validate_model(model)
+    setup = load_setup(model["setup"])
+    project = create_instance(
+        session,
+        Project,
+        label=label,
+        time_slot_duration_seconds=setup["TIME_SLOT_DURATION"].seconds,
+        origin_datetime=setup["ORIGIN_DATETIME"],
+        horizon=setup["HORIZON"],
+        succession_constraint_relaxation_factor=setup[
+            "SUCCESSION_CONSTRAINT_RELAXATION_FACTOR"
+        ],
+        commit=True,
+    )
+    week_structure = np.zeros((project.time_slots_per_day, 7), dtype=int)
+    days = setup["WEEK_STRUCTURE"][:7, : project.time_slots_per_day]
+    week_structure[: days.shape[1], : days.shape[0]] = days.T
+    project.week_structure = week_structure
+    daily_slots = None
+    if calendar_tables:
+        week_days = create_weekdays(session, project)
+        daily_slots = create_daily_slots(session, project)
+        create_week_structure(
+            session, project, setup["WEEK_STRUCTURE"], daily_slots, week_days
+        )
+    activity_kinds = create_activity_kinds(
+        session, project, setup["ACTIVITIES_KINDS"], daily_slots
+    )
+    atomic_students, students_groups = create_students(
+        session, project, model["students"]
+    )
+    teachers, teachers_unavailable_static_activities = create_teachers(
+        session, project, model["teachers"]
+    )
+    managers = create_managers(session, project, model["managers"])
+    planners = create_planners(session, project, model["planners"])
+    create_activities_and_rooms(
+        session,
+        project,
+        model["courses"],
+        room_pools=model["aliases"]["room_pools"],
+        teachers=teachers,
+        managers=managers,
+        planners=planners,
+        students_groups=students_groups,
+        activity_kinds=activity_kinds,
+        rooms_data=model.get("rooms"),
+    )
+    session.commit()
+    return project
@@ -0,0 +1,206 @@
+import networkx as nx
+from automatic_university_scheduler.snapshot import ProjectSnapshot, UNSET
+
+
+def precedence_edges(project):
+    """
+    Returns the starts after constraints of a project as a list of
+    (constraint, from_ids, to_ids, min_offset, max_offset) tuples, with the
+    succession constraint relaxation factor applied to the offsets and the
+    constraints between empty groups dropped. For a `ProjectSnapshot`, the
+    constraint is given by its id.
+    """
+    if isinstance(project, ProjectSnapshot):
+        return project.precedence_edges()
+    s_factor = project.succession_constraint_relaxation_factor
+    edges = []
+    for starts_after in project.starts_after_constraints:
+        from_ids = [a.id for a in starts_after.from_activity_group.activities]
+        to_ids = [a.id for a in starts_after.to_activity_group.activities]
+        if len(from_ids) == 0 or len(to_ids) == 0:
+            continue
+        min_offset = starts_after.min_offset
+        min_offset = int(min_offset / s_factor) if min_offset is not None else None
+        max_offset = starts_after.max_offset
+        max_offset = int(max_offset * s_factor) if max_offset is not None else None
+        edges.append((starts_after, from_ids, to_ids, min_offset, max_offset))
+    return edges
+
+
+def activities_bounds(project):
+    """
+    Returns the (id, duration, earliest start slot, latest start slot) of each
+    activity of a project or a `ProjectSnapshot`, None standing for no bound.
+    """
+    if isinstance(project, ProjectSnapshot):
+        return [
+            (aid, duration, None if e == UNSET else e, None if l == UNSET else l)
+            for aid, duration, e, l in zip(
+                project.activity_ids.tolist(),
+                project.activity_durations.tolist(),
+                project.activity_earliest_starts.tolist(),
+                project.activity_latest_starts.tolist(),
+            )
+        ]
+    return [
+        (a.id, a.duration, a.earliest_start_slot, a.latest_start_slot)
+        for a in project.activities
+    ]
+
+
+def _earliest_graph(edges):
+    """
+    Builds the graph along which earliest starts are propagated: each starts
+    after constraint `k` is a hub node `("min", k)` linked from the activities
+    of its `from` group to those of its `to` group if it has a min offset, and a
+    hub node `("max", k)` linked the other way if it has a max offset. Latest
+    starts are propagated along the reverse graph.
+    """
+    graph = nx.DiGraph()
+    for k, (_, from_ids, to_ids, min_offset, max_offset) in enumerate(edges):
+        for offset, kind, sources, targets in (
+            (min_offset, "min", from_ids, to_ids),
+            (max_offset, "max", to_ids, from_ids),
+        ):
+            if offset is None:
+                continue
+            hub = (kind, k)
+            graph.add_edges_from((i, hub) for i in sources)
+            graph.add_edges_from((hub, i) for i in targets)
+    return graph
+
+
+def propagate_start_windows(project, edges=None):
+    """
+    Computes the tightest start window of each activity implied by the horizon,
+    the earliest/latest starts and the starts after constraints.
+
+    The starts after constraints form a difference constraints system between
+    activity groups. Earliest starts are propagated group-wise (the earliest end
+    of the `from` group against the earliest start of the `to` group, and
+    conversely for the max offsets) over the strongly connected components of
+    the constraints graph in topological order, then latest starts in reverse
+    order. Components holding cycles are swept until a fixed point, at most
+    once per activity of the component plus one: a cycle still pushing after
+    that has a positive length and empties the windows of its activities.
+
+    Returns:
+    tuple: `windows` mapping each activity id to its [earliest, latest] start
+    slots and `pushed_by` mapping each activity id to the starts after
+    constraint that last raised its earliest start (or None). Every activity has
+    a window, but propagation stops at the first empty window (earliest >
+    latest), which proves infeasibility.
+    """
+    horizon = project.horizon
+    if edges is None:
+        edges = precedence_edges(project)
+    durations = {}
+    windows = {}
+    pushed_by = {}
+    for aid, duration, earliest, latest in activities_bounds(project):
+        earliest = 0 if earliest is None else max(earliest, 0)
+        latest = (
+            horizon - duration if latest is None else min(latest, horizon - duration)
+        )
+        durations[aid] = duration
+        windows[aid] = [earliest, latest]
+        pushed_by[aid] = None
+    # Every activity gets its initial window before reporting the empty ones
+    if len(empty_windows(windows)) > 0:
+        return windows, pushed_by
+
+    def raise_earliest(hub):
+        kind, k = hub
+        starts_after, from_ids, to_ids, min_offset, max_offset = edges[k]
+        if kind == "min":
+            # to_start >= from_end + min_offset
+            bound = max(windows[i][0] + durations[i] for i in from_ids)
+            targets = [(i, bound + min_offset) for i in to_ids]
+        else:
+            # from_end >= to_start - max_offset
+            bound = max(windows[i][0] for i in to_ids)
+            targets = [(i, bound - max_offset - durations[i]) for i in from_ids]
+        changed = []
+        for i, earliest in targets:
+            if earliest > windows[i][0]:
+                windows[i][0] = earliest
+                pushed_by[i] = starts_after
+                changed.append(i)
+        return changed
+
+    def lower_latest(hub):
+        kind, k = hub
+        _, from_ids, to_ids, min_offset, max_offset = edges[k]
+        if kind == "min":
+            # from_end <= to_start - min_offset
+            bound = min(windows[i][1] for i in to_ids)
+            targets = [(i, bound - min_offset - durations[i]) for i in from_ids]
+        else:
+            # to_start <= from_end + max_offset
+            bound = min(windows[i][1] + durations[i] for i in from_ids)
+            targets = [(i, bound + max_offset) for i in to_ids]
+        changed = []
+        for i, latest in targets:
+            if latest < windows[i][1]:
+                windows[i][1] = latest
+                changed.append(i)
+        return changed
+
+    graph = _earliest_graph(edges)
+    condensation = nx.condensation(graph)
+    components = [
+        condensation.nodes[c]["members"] for c in nx.topological_sort(condensation)
+    ]
+    for propagate, ordered in (
+        (raise_earliest, components),
+        (lower_latest, components[::-1]),
+    ):
+        for members in ordered:
+            hubs = sorted(node for node in members if isinstance(node, tuple))
+            if len(hubs) == 0:
+                continue
+            # A single hub has no cycle: one pass settles it
+            passes = 1 if len(members) == 1 else len(members) - len(hubs) + 1
+            for _ in range(passes):
+                changed = set()
+                for hub in hubs:
+                    changed.update(propagate(hub))
+                    if any(windows[i][0] > windows[i][1] for i in changed):
+                        return windows, pushed_by
+                if len(changed) == 0:
+                    break
+            else:
+                if passes > 1:
+                    # Still pushing after the last pass: a positive cycle pushes
+                    # the starts without bound
+                    for i in changed:
+                        windows[i][0] = horizon - durations[i] + 1
+                    return windows, pushed_by
+    return windows, pushed_by
+
+
+def empty_windows(windows):
+    """
+    Returns the ids of the activities whose start window is empty.
+    """
+    return [aid for aid, (earliest, latest) in windows.items() if earliest > latest]
+
+
+def entailed_min_offset(windows, durations, from_ids, to_ids, min_offset):
+    """
+    Tells if `to_start >= from_end + min_offset` holds for every pair of
+    activities whatever their starts within their windows.
+    """
+    latest_end = max(windows[i][1] + durations[i] for i in from_ids)
+    earliest_start = min(windows[i][0] for i in to_ids)
+    return earliest_start >= latest_end + min_offset
+
+
+def entailed_max_offset(windows, durations, from_ids, to_ids, max_offset):
+    """
+    Tells if `to_start <= from_end + max_offset` holds for every pair of
+    activities whatever their starts within their windows.
+    """
+    earliest_end = min(windows[i][0] + durations[i] for i in from_ids)
+    latest_start = max(windows[i][1] for i in to_ids)
+    return latest_start <= earliest_end + max_offset
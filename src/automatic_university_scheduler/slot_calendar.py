@@ -0,0 +1,267 @@
+from dataclasses import dataclass
+import datetime
+import numpy as np
+from automatic_university_scheduler.datetimeutils import (
+    slots_to_datetime64,
+    isocalendar_to_datetime64,
+    datetime64_to_slots,
+    to_datetime64,
+)
+
+
+@dataclass(frozen=True, eq=False)
+class SlotCalendar:
+    """
+    Calendar of the slots [0, HORIZON] of a project: for each slot, its ISO year,
+    ISO week, ISO weekday (1 = monday), daily slot (0 = midnight), week index
+    (0 = week of the origin) and availability in the week structure. Lookups are
+    plain array indexing, e.g. `calendar.week[slots]`.
+    """
+
+    origin_datetime: np.datetime64
+    slot_seconds: int
+    time_slots_per_day: int
+    time_slots_per_week: int
+    origin_monday_slot: int
+    year: np.ndarray
+    week: np.ndarray
+    weekday: np.ndarray
+    daily_slot: np.ndarray
+    week_index: np.ndarray
+    available: np.ndarray
+
+    @property
+    def horizon(self):
+        return len(self.year) - 1
+
+    def week_bounds(self, week_index):
+        """
+        Returns the first and last slots of a week (by index) within [0, HORIZON],
+        or None if the week does not intersect it.
+        """
+        monday = self.origin_monday_slot + week_index * self.time_slots_per_week
+        first = max(monday, 0)
+        last = min(monday + self.time_slots_per_week - 1, self.horizon)
+        if first > last:
+            return None
+        return first, last
+
+    def clock(self, slots):
+        """
+        Returns the "HH:MM" time of day of slots.
+        """
+        minutes = np.asarray(self.daily_slot[slots]) * self.slot_seconds // 60
+        return [f"{m // 60:02d}:{m % 60:02d}" for m in np.atleast_1d(minutes)]
+
+    def isocalendar(self, slots):
+        """
+        Returns the ISO years, weeks, weekdays and daily slots of an array of
+        slots. Slots within [0, HORIZON] are looked up, the others are computed.
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        inside = (slots >= 0) & (slots <= self.horizon)
+        index = np.where(inside, slots, 0)
+        fields = [
+            self.year[index],
+            self.week[index],
+            self.weekday[index],
+            self.daily_slot[index],
+        ]
+        if not inside.all():
+            datetimes = self.origin_datetime + slots[~inside] * np.timedelta64(
+                self.slot_seconds, "s"
+            )
+            outside = _isocalendar_fields(datetimes, self.slot_seconds)
+            for field, values in zip(fields, outside):
+                field[~inside] = values
+        return tuple(fields)
+
+    def to_slots(self, year, week, weekday, daily_slot, round="floor"):
+        """
+        Returns the slots of arrays of ISO years, weeks, weekdays and daily slots.
+        Weeks covered by the calendar are looked up, the others (and all of them
+        if the slots are not aligned on midnight) are converted with
+        `datetime64_to_slots` using `round`.
+        """
+        year = np.asarray(year, dtype=np.int64)
+        week = np.asarray(week, dtype=np.int64)
+        weekday = np.asarray(weekday, dtype=np.int64)
+        daily_slot = np.asarray(daily_slot, dtype=np.int64)
+        keys, mondays = self._week_table()
+        row_keys = year * 100 + week
+        position = np.searchsorted(keys, row_keys).clip(max=len(keys) - 1)
+        found = keys[position] == row_keys
+        origin = self.origin_datetime.astype("datetime64[s]")
+        offset = (origin - origin.astype("datetime64[D]")).astype(np.int64)
+        if offset % self.slot_seconds != 0:
+            found[:] = False
+        slots = mondays[position] + (weekday - 1) * self.time_slots_per_day
+        slots += daily_slot
+        if not found.all():
+            missing = ~found
+            slot_duration = datetime.timedelta(seconds=self.slot_seconds)
+            dates = isocalendar_to_datetime64(
+                year[missing], week[missing], weekday[missing]
+            ).astype("datetime64[s]")
+            slots[missing] = datetime64_to_slots(
+                dates + daily_slot[missing] * np.timedelta64(self.slot_seconds, "s"),
+                self.origin_datetime,
+                slot_duration,
+                round=round,
+            )
+        return slots
+
+    def _week_table(self):
+        """
+        Sorted (year * 100 + week) keys of the weeks of the calendar and the slot
+        of their monday at midnight.
+        """
+        keys = self.year * 100 + self.week
+        keys, first = np.unique(keys, return_index=True)
+        mondays = (
+            first
+            - (self.weekday[first] - 1) * self.time_slots_per_day
+            - self.daily_slot[first]
+        )
+        return keys, mondays
+
+
+def _isocalendar_fields(datetimes, slot_seconds):
+    """
+    Returns the ISO years, weeks, weekdays and daily slots of an array of
+    datetime64.
+    """
+    days = datetimes.astype("datetime64[D]")
+    # 1970-01-01 is a thursday
+    weekday = (days.astype(np.int64) + 3) % 7 + 1
+    daily_slot = (datetimes - days).astype("timedelta64[s]").astype(np.int64)
+    daily_slot //= slot_seconds
+    # The ISO year of a week is the year of its thursday
+    thursday = days - (weekday - 1) + 3
+    year = thursday.astype("datetime64[Y]")
+    week = (thursday - year.astype("datetime64[D]")).astype(np.int64) // 7 + 1
+    year = year.astype(np.int64) + 1970
+    return year, week, weekday, daily_slot
+
+
+def build_slot_calendar(
+    origin_datetime, time_slot_duration, horizon, week_structure, origin_monday_slot
+):
+    """
+    Computes the calendar of the slots [0, horizon].
+
+    Parameters:
+    origin_datetime (datetime): The datetime of slot 0.
+    time_slot_duration (timedelta): The duration of a slot.
+    horizon (int): The last slot.
+    week_structure (np.ndarray): The (daily slots, week days) availability array.
+    origin_monday_slot (int): The slot of the monday of the origin week.
+
+    Returns:
+    SlotCalendar: The calendar.
+    """
+    slot_seconds = time_slot_duration.days * 86400 + time_slot_duration.seconds
+    time_slots_per_day = 86400 // slot_seconds
+    time_slots_per_week = 7 * time_slots_per_day
+    slots = np.arange(horizon + 1)
+    datetimes = slots_to_datetime64(slots, origin_datetime, time_slot_duration)
+    year, week, weekday, daily_slot = _isocalendar_fields(datetimes, slot_seconds)
+    week_index = (slots - origin_monday_slot) // time_slots_per_week
+    available = np.asarray(week_structure)[daily_slot, weekday - 1] != 0
+    for array in (year, week, weekday, daily_slot, week_index, available):
+        array.flags.writeable = False
+    return SlotCalendar(
+        origin_datetime=to_datetime64(origin_datetime),
+        slot_seconds=slot_seconds,
+        time_slots_per_day=time_slots_per_day,
+        time_slots_per_week=time_slots_per_week,
+        origin_monday_slot=origin_monday_slot,
+        year=year,
+        week=week,
+        weekday=weekday,
+        daily_slot=daily_slot,
+        week_index=week_index,
+        available=available,
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class OpenTime:
+    """
+    Compressed "open time" coordinates of a calendar: the open slots of [0,
+    HORIZON] (see `SlotCalendar.available`) are numbered contiguously, open slot
+    `i` being the slot `slots[i]`, and closed slots have no index. Open slots
+    are grouped into blocks of consecutive slots, [block_starts[b],
+    block_ends[b]) in open coordinates, that activities cannot straddle.
+    """
+
+    slots: np.ndarray
+    block_starts: np.ndarray
+    block_ends: np.ndarray
+
+    @classmethod
+    def from_calendar(cls, calendar):
+        slots = np.flatnonzero(calendar.available)
+        breaks = np.flatnonzero(np.diff(slots) != 1) + 1
+        for array in (slots, breaks):
+            array.flags.writeable = False
+        return cls(
+            slots=slots,
+            block_starts=np.concatenate([[0], breaks]).astype(np.int64),
+            block_ends=np.concatenate([breaks, [len(slots)]]).astype(np.int64),
+        )
+
+    @property
+    def horizon(self):
+        """
+        The open horizon: the number of open slots.
+        """
+        return len(self.slots)
+
+    def to_open(self, slots, round="ceil"):
+        """
+        Returns the open index of the first open slot at or after slots
+        (`round="ceil"`) or of the last one at or before them (`round="floor"`,
+        -1 if there is none).
+        """
+        if round == "ceil":
+            return np.searchsorted(self.slots, slots, side="left")
+        return np.searchsorted(self.slots, slots, side="right") - 1
+
+    def to_slots(self, starts):
+        """
+        Returns the slots of open starts.
+        """
+        return self.slots[starts]
+
+    def end_slots(self):
+        """
+        Returns the slot following each open end in [0, HORIZON] (the end of an
+        activity ending before open slot `i`), `slots[0]` for 0.
+        """
+        return np.concatenate([self.slots[:1], self.slots + 1])
+
+    def start_intervals(self, duration, first=0, last=None):
+        """
+        Returns the [first, last] intervals of the open starts of an activity of
+        a duration that keep it within a block, restricted to [first, last].
+        """
+        last = self.horizon if last is None else last
+        starts = np.maximum(self.block_starts, first)
+        ends = np.minimum(self.block_ends - duration, last)
+        keep = starts <= ends
+        return np.stack([starts[keep], ends[keep]], axis=1)
+
+    def min_offset_starts(self, offset):
+        """
+        Returns, for each open end in [0, HORIZON], the first open start at least
+        `offset` slots after it (HORIZON if there is none).
+        """
+        return self.to_open(self.end_slots() + offset, round="ceil")
+
+    def max_offset_starts(self, offset):
+        """
+        Returns, for each open end in [0, HORIZON], the last open start at most
+        `offset` slots after it (-1 if there is none).
+        """
+        return self.to_open(self.end_slots() + offset, round="floor")
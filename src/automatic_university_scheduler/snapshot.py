@@ -0,0 +1,367 @@
+from dataclasses import dataclass
+import numpy as np
+from automatic_university_scheduler.slot_calendar import SlotCalendar
+
+# Marks a missing integer value (no earliest start, no max offset, ...)
+UNSET = np.iinfo(np.int64).min
+
+
+@dataclass(frozen=True, eq=False)
+class CSR:
+    """
+    Compressed sparse rows: row `i` holds `indices[indptr[i]:indptr[i + 1]]`.
+    """
+
+    indptr: np.ndarray
+    indices: np.ndarray
+
+    @classmethod
+    def from_lists(cls, rows):
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        indices = np.fromiter(
+            (i for row in rows for i in row), dtype=np.int64, count=indptr[-1]
+        )
+        return cls(indptr, indices)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, i):
+        return self.indices[self.indptr[i] : self.indptr[i + 1]]
+
+    def row_lengths(self):
+        return np.diff(self.indptr)
+
+    def tolists(self):
+        indices = self.indices.tolist()
+        indptr = self.indptr.tolist()
+        return [indices[indptr[i] : indptr[i + 1]] for i in range(len(self))]
+
+
+def _optional(value):
+    return UNSET if value is None else value
+
+
+@dataclass(frozen=True, eq=False)
+class ProjectSnapshot:
+    """
+    Read-only, array based copy of the data of a project needed to build the CP
+    model. Activities, kinds, ressources, students groups, precedences and static
+    activities are stored as NumPy arrays indexed by position, their database ids
+    being kept in the `*_ids` arrays. Memberships (students of a group, pools and
+    allocations of an activity, ...) are stored as CSR structures of positions.
+    Missing values are stored as `UNSET`.
+
+    A snapshot does not depend on the database session and can be pickled to be
+    sent to worker processes.
+    """
+
+    # PROJECT
+    label: str
+    horizon: int
+    time_slots_per_day: int
+    time_slots_per_week: int
+    max_weeks: int
+    origin_monday_slot: int
+    succession_constraint_relaxation_factor: float
+    week_structure: np.ndarray
+    calendar: SlotCalendar
+    # ACTIVITIES
+    activity_ids: np.ndarray
+    activity_labels: tuple
+    activity_courses: tuple
+    activity_durations: np.ndarray
+    activity_kinds: np.ndarray
+    activity_earliest_starts: np.ndarray
+    activity_latest_starts: np.ndarray
+    activity_starts: np.ndarray
+    activity_students_groups: np.ndarray
+    activity_room_counts: np.ndarray
+    activity_teacher_counts: np.ndarray
+    activity_room_pools: CSR
+    activity_teacher_pools: CSR
+    activity_allocated_rooms: CSR
+    activity_allocated_teachers: CSR
+    # ACTIVITY KINDS
+    kind_ids: np.ndarray
+    kind_labels: tuple
+    kind_allowed_daily_slots: CSR
+    # RESSOURCES
+    atomic_student_ids: np.ndarray
+    atomic_student_labels: tuple
+    atomic_student_headcounts: np.ndarray
+    students_group_ids: np.ndarray
+    students_group_labels: tuple
+    students_group_members: CSR
+    teacher_ids: np.ndarray
+    teacher_labels: tuple
+    room_ids: np.ndarray
+    room_labels: tuple
+    room_capacities: np.ndarray
+    # STARTS AFTER CONSTRAINTS
+    precedence_ids: np.ndarray
+    precedence_from_groups: np.ndarray
+    precedence_to_groups: np.ndarray
+    precedence_min_offsets: np.ndarray
+    precedence_max_offsets: np.ndarray
+    precedence_from: CSR
+    precedence_to: CSR
+    # STATIC ACTIVITIES
+    static_ids: np.ndarray
+    static_kinds: tuple
+    static_labels: tuple
+    static_starts: np.ndarray
+    static_ends: np.ndarray
+    static_periods: np.ndarray
+    static_counts: np.ndarray
+    static_students_groups: np.ndarray
+    static_teachers: CSR
+    static_rooms: CSR
+
+    @classmethod
+    def from_project(cls, project):
+        """
+        Extracts the snapshot of a project. Load the project with the "solve"
+        loader profile to avoid lazy loads.
+        """
+        setup = project.setup
+        activities = project.activities
+        atomic_students = project.atomic_students
+        students_groups = project.students_groups
+        teachers = project.teachers
+        rooms = project.rooms
+        kinds = project.activity_kinds
+        static_activities = project.static_activities
+
+        atomic_students_index = {s.id: i for i, s in enumerate(atomic_students)}
+        groups_index = {g.id: i for i, g in enumerate(students_groups)}
+        teachers_index = {t.id: i for i, t in enumerate(teachers)}
+        rooms_index = {r.id: i for i, r in enumerate(rooms)}
+        kinds_index = {k.id: i for i, k in enumerate(kinds)}
+        activities_index = {a.id: i for i, a in enumerate(activities)}
+
+        starts_after_constraints = [
+            c
+            for c in project.starts_after_constraints
+            if len(c.from_activity_group.activities) > 0
+            and len(c.to_activity_group.activities) > 0
+        ]
+
+        def ids(instances):
+            return np.array([x.id for x in instances], dtype=np.int64)
+
+        def integers(values):
+            return np.array([_optional(v) for v in values], dtype=np.int64)
+
+        return cls(
+            label=project.label,
+            horizon=project.horizon,
+            time_slots_per_day=setup.time_slots_per_day,
+            time_slots_per_week=setup.time_slots_per_week,
+            max_weeks=setup.max_weeks,
+            origin_monday_slot=project.datetime_to_slot(
+                setup.origin_monday, round="floor"
+            ),
+            succession_constraint_relaxation_factor=setup.succession_constraint_relaxation_factor,
+            week_structure=setup.week_structure,
+            calendar=project.calendar,
+            activity_ids=ids(activities),
+            activity_labels=tuple(a.label for a in activities),
+            activity_courses=tuple(a.course.label for a in activities),
+            activity_durations=integers(a.duration for a in activities),
+            activity_kinds=integers(kinds_index[a.kind_id] for a in activities),
+            activity_earliest_starts=integers(
+                a.earliest_start_slot for a in activities
+            ),
+            activity_latest_starts=integers(a.latest_start_slot for a in activities),
+            activity_starts=integers(a.start for a in activities),
+            activity_students_groups=integers(
+                groups_index[a.students_id] for a in activities
+            ),
+            activity_room_counts=integers(a.room_count for a in activities),
+            activity_teacher_counts=integers(a.teacher_count for a in activities),
+            activity_room_pools=CSR.from_lists(
+                [[rooms_index[r.id] for r in a.room_pool] for a in activities]
+            ),
+            activity_teacher_pools=CSR.from_lists(
+                [[teachers_index[t.id] for t in a.teacher_pool] for a in activities]
+            ),
+            activity_allocated_rooms=CSR.from_lists(
+                [[rooms_index[r.id] for r in a.allocated_rooms] for a in activities]
+            ),
+            activity_allocated_teachers=CSR.from_lists(
+                [
+                    [teachers_index[t.id] for t in a.allocated_teachers]
+                    for a in activities
+                ]
+            ),
+            kind_ids=ids(kinds),
+            kind_labels=tuple(k.label for k in kinds),
+            kind_allowed_daily_slots=CSR.from_lists(
+                [k.allowed_start_slots for k in kinds]
+            ),
+            atomic_student_ids=ids(atomic_students),
+            atomic_student_labels=tuple(s.label for s in atomic_students),
+            atomic_student_headcounts=integers(s.headcount for s in atomic_students),
+            students_group_ids=ids(students_groups),
+            students_group_labels=tuple(g.label for g in students_groups),
+            students_group_members=CSR.from_lists(
+                [
+                    [atomic_students_index[s.id] for s in g.students]
+                    for g in students_groups
+                ]
+            ),
+            teacher_ids=ids(teachers),
+            teacher_labels=tuple(t.label for t in teachers),
+            room_ids=ids(rooms),
+            room_labels=tuple(r.label for r in rooms),
+            room_capacities=integers(r.capacity for r in rooms),
+            precedence_ids=ids(starts_after_constraints),
+            precedence_from_groups=integers(
+                c.from_activity_group_id for c in starts_after_constraints
+            ),
+            precedence_to_groups=integers(
+                c.to_activity_group_id for c in starts_after_constraints
+            ),
+            precedence_min_offsets=integers(
+                c.min_offset for c in starts_after_constraints
+            ),
+            precedence_max_offsets=integers(
+                c.max_offset for c in starts_after_constraints
+            ),
+            precedence_from=CSR.from_lists(
+                [
+                    [activities_index[a.id] for a in c.from_activity_group.activities]
+                    for c in starts_after_constraints
+                ]
+            ),
+            precedence_to=CSR.from_lists(
+                [
+                    [activities_index[a.id] for a in c.to_activity_group.activities]
+                    for c in starts_after_constraints
+                ]
+            ),
+            static_ids=ids(static_activities),
+            static_kinds=tuple(s.kind for s in static_activities),
+            static_labels=tuple(s.label for s in static_activities),
+            static_starts=integers(s.start for s in static_activities),
+            static_ends=integers(s.end for s in static_activities),
+            static_periods=np.array(
+                [s.period or 0 for s in static_activities], dtype=np.int64
+            ),
+            static_counts=np.array(
+                [s.count or 1 for s in static_activities], dtype=np.int64
+            ),
+            static_students_groups=np.array(
+                [
+                    -1 if s.students_id is None else groups_index[s.students_id]
+                    for s in static_activities
+                ],
+                dtype=np.int64,
+            ),
+            static_teachers=CSR.from_lists(
+                [
+                    [teachers_index[t.id] for t in s.allocated_teachers]
+                    for s in static_activities
+                ]
+            ),
+            static_rooms=CSR.from_lists(
+                [
+                    [rooms_index[r.id] for r in s.allocated_rooms]
+                    for s in static_activities
+                ]
+            ),
+        )
+
+    @property
+    def students_group_headcounts(self):
+        """
+        The number of students of each group, UNSET if the headcount of one of
+        its atomic students is unknown.
+        """
+        out = np.zeros(len(self.students_group_ids), dtype=np.int64)
+        for g, members in enumerate(self.students_group_members.tolists()):
+            headcounts = self.atomic_student_headcounts[members]
+            out[g] = UNSET if (headcounts == UNSET).any() else headcounts.sum()
+        return out
+
+    @property
+    def activity_students(self):
+        """
+        The atomic students (positions) of each activity as a CSR structure.
+        """
+        members = self.students_group_members.tolists()
+        return CSR.from_lists([members[g] for g in self.activity_students_groups])
+
+    def precedence_edges(self):
+        """
+        Returns the starts after constraints as (constraint id, from activity ids,
+        to activity ids, min_offset, max_offset) tuples, with the succession
+        constraint relaxation factor applied to the offsets, as
+        `propagation.precedence_edges` does for a project.
+        """
+        s_factor = self.succession_constraint_relaxation_factor
+        activity_ids = self.activity_ids
+        edges = []
+        for k, cid in enumerate(self.precedence_ids.tolist()):
+            min_offset = int(self.precedence_min_offsets[k])
+            max_offset = int(self.precedence_max_offsets[k])
+            edges.append(
+                (
+                    cid,
+                    activity_ids[self.precedence_from[k]].tolist(),
+                    activity_ids[self.precedence_to[k]].tolist(),
+                    None if min_offset == UNSET else int(min_offset / s_factor),
+                    None if max_offset == UNSET else int(max_offset * s_factor),
+                )
+            )
+        return edges
+
+    def static_occurrences(self):
+        """
+        Expands the recurring static activities.
+
+        Returns:
+        tuple: The static activity (position), start and end of each occurrence.
+        """
+        counts = self.static_counts
+        rows = np.repeat(np.arange(len(counts)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        starts = self.static_starts[rows] + (np.arange(len(rows)) - first) * (
+            self.static_periods[rows]
+        )
+        ends = starts + (self.static_ends - self.static_starts)[rows]
+        return rows, starts, ends
+
+    def static_intervals(self, kind):
+        """
+        Returns the (start, end) intervals of the static activities (one per
+        occurrence) of each ressource of a kind ("students", "teachers" or
+        "rooms"), keyed by the ressource database id.
+        """
+        if kind == "students":
+            ressource_ids = self.atomic_student_ids
+            members = self.students_group_members
+            rows = [members[g] if g >= 0 else [] for g in self.static_students_groups]
+        elif kind == "teachers":
+            ressource_ids, rows = self.teacher_ids, self.static_teachers.tolists()
+        elif kind == "rooms":
+            ressource_ids, rows = self.room_ids, self.static_rooms.tolists()
+        else:
+            raise ValueError(f"Unknown ressource kind {kind}")
+        out = {}
+        for k, start, end in zip(*(a.tolist() for a in self.static_occurrences())):
+            for i in rows[k]:
+                out.setdefault(int(ressource_ids[i]), []).append((start, end))
+        return out
+
+
+def project_snapshot(project):
+    """
+    Returns the snapshot of a project, or `project` itself if it already is a
+    snapshot.
+    """
+    if isinstance(project, ProjectSnapshot):
+        return project
+    return ProjectSnapshot.from_project(project)
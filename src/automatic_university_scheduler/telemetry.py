@@ -0,0 +1,226 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from automatic_university_scheduler.utils import create_directory
+
+# CP-SAT progress lines, e.g. "#3  1.25s best:624 next:[300,623] default_lp"
+_progress_pattern = re.compile(
+    r"^#(?P<kind>\S+)\s+(?P<walltime>[\d.]+)s\s+best:(?P<best>\S+)\s+next:\[(?P<next>[^\]]*)\]"
+)
+
+
+def _to_number(value):
+    try:
+        value = float(value)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_progress_line(line):
+    """
+    Parses a CP-SAT search progress log line. Returns a dictionary with the kind
+    of event (solution number, "Bound", ...), the wall time, the best objective
+    and the bound, or None if the line is not a progress line.
+    """
+    match = _progress_pattern.match(line.strip())
+    if match is None:
+        return None
+    bounds = [b for b in match["next"].split(",") if b != ""]
+    return {
+        "kind": match["kind"],
+        "walltime": float(match["walltime"]),
+        "objective": _to_number(match["best"]),
+        "bound": _to_number(bounds[0]) if len(bounds) > 0 else None,
+    }
+
+
+def model_size(model):
+    """
+    Returns the number of variables and constraints of a CP model.
+    """
+    proto = model.Proto()
+    return {"variables": len(proto.variables), "constraints": len(proto.constraints)}
+
+
+class Telemetry:
+    """
+    Structured instrumentation of a scheduling run.
+
+    Events are written as JSON lines (any path) or into a `telemetry` table of a
+    local SQLite database (paths ending with .db, .sqlite or .sqlite3). Each event
+    carries the run id, a timestamp, the time elapsed since the start of the run
+    and its own data:
+
+    - "run": the metadata of the run (data version, parameters, ...),
+    - "phase": the duration of a model building step and the variables and
+      constraints it added,
+    - "log": a raw CP-SAT log line,
+    - "progress": a CP-SAT search progress line (objective and bound),
+    - "bound": a new best objective bound,
+    - "solution": a solution found by the solver,
+    - "status": the final status of the solver.
+    """
+
+    def __init__(self, path, label=None, **metadata):
+        self.path = path
+        self.run_id = uuid.uuid4().hex
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory != "":
+            create_directory(directory)
+        if path.endswith((".db", ".sqlite", ".sqlite3")):
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS telemetry "
+                "(run_id TEXT, timestamp TEXT, elapsed REAL, event TEXT, data TEXT)"
+            )
+            self._file = None
+        else:
+            self._connection = None
+            self._file = open(path, "a")
+        self.emit("run", label=label, **metadata)
+
+    def emit(self, event, **data):
+        """
+        Records an event.
+        """
+        timestamp = datetime.now().isoformat()
+        elapsed = time.perf_counter() - self._t0
+        with self._lock:
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT INTO telemetry VALUES (?, ?, ?, ?, ?)",
+                    (
+                        self.run_id,
+                        timestamp,
+                        elapsed,
+                        event,
+                        json.dumps(data, default=str),
+                    ),
+                )
+                self._connection.commit()
+            else:
+                record = {
+                    "run_id": self.run_id,
+                    "timestamp": timestamp,
+                    "elapsed": elapsed,
+                    "event": event,
+                    **data,
+                }
+                self._file.write(json.dumps(record, default=str) + "\n")
+                self._file.flush()
+
+    @contextmanager
+    def phase(self, name, model=None):
+        """
+        Times a block of code and records the variables and constraints it added
+        to `model`, if any.
+        """
+        size0 = model_size(model) if model is not None else None
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            data = {"name": name, "duration": time.perf_counter() - t0}
+            if model is not None:
+                size1 = model_size(model)
+                for key, value in size1.items():
+                    data[key] = value - size0[key]
+                    data[f"total_{key}"] = value
+            self.emit("phase", **data)
+
+    def wrap(self, func, model=None, name=None):
+        """
+        Returns `func` instrumented as a phase named after it.
+        """
+        name = func.__name__ if name is None else name
+
+        def wrapper(*args, **kwargs):
+            with self.phase(name, model):
+                return func(*args, **kwargs)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    def attach(self, solver, keep_log=True):
+        """
+        Captures the search log and bounds of a CP-SAT solver. The log is only
+        recorded, not printed.
+        """
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = lambda line: self.log_line(line, keep_log=keep_log)
+        if hasattr(solver, "best_bound_callback"):
+            solver.best_bound_callback = lambda bound: self.emit("bound", bound=bound)
+
+    def log_line(self, line, keep_log=True):
+        """
+        Records a CP-SAT log line, and the progress it reports if any.
+        """
+        progress = parse_progress_line(line)
+        if progress is not None:
+            self.emit("progress", **progress)
+        if keep_log:
+            self.emit("log", line=line)
+
+    def solution(self, walltime, objective, bound=None):
+        """
+        Records a solution found by the solver.
+        """
+        self.emit("solution", walltime=walltime, objective=objective, bound=bound)
+
+    def status(self, solver, status):
+        """
+        Records the final status of a solver.
+        """
+        self.emit(
+            "status",
+            status=solver.StatusName(status),
+            walltime=solver.WallTime(),
+            objective=solver.ObjectiveValue(),
+            bound=solver.BestObjectiveBound(),
+        )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def read_telemetry(path) -> pd.DataFrame:
+    """
+    Reads the events recorded by `Telemetry` as a DataFrame with one column per
+    data field.
+    """
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        connection = sqlite3.connect(path)
+        rows = connection.execute(
+            "SELECT run_id, timestamp, elapsed, event, data FROM telemetry"
+        ).fetchall()
+        connection.close()
+        records = [
+            {
+                "run_id": run_id,
+                "timestamp": timestamp,
+                "elapsed": elapsed,
+                "event": event,
+                **json.loads(data),
+            }
+            for run_id, timestamp, elapsed, event, data in rows
+        ]
+    else:
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip() != ""]
+    return pd.DataFrame(records)
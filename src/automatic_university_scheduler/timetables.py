@@ -0,0 +1,419 @@
+import datetime
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from automatic_university_scheduler.database import (
+    Activity,
+    AtomicStudent,
+    Room,
+    StaticActivity,
+    StudentsGroup,
+    Teacher,
+    activity_room_allocation_association_table,
+    activity_teacher_allocation_association_table,
+    static_activity_room_allocation_association_table,
+    static_activity_teacher_allocation_association_table,
+    student_atomic_groups_association_table,
+)
+from automatic_university_scheduler.postprocessing import (
+    planification_dataframe,
+    static_planification_dataframe,
+)
+from automatic_university_scheduler.utils import create_directory
+
+RESSOURCE_KINDS = ("teachers", "rooms", "atomic_students", "students_groups")
+
+# Columns of the timetables, in the order of the Excel files
+TIMETABLE_COLUMNS = [
+    "date",
+    "weekday",
+    "start",
+    "end",
+    "course",
+    "label",
+    "kind",
+    "students",
+    "allocated_teachers",
+    "allocated_rooms",
+]
+
+DAYS_NAMES = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+
+
+def timetable_entries(project) -> pd.DataFrame:
+    """
+    Returns the scheduled activities and static activities of a project, sorted
+    by start, with an "owner" column ("activity" or "static"), their start and
+    end datetimes and a unique "uid".
+    """
+    activities = planification_dataframe(project)
+    activities = activities[activities["start_slot"].notna()].copy()
+    activities["owner"] = "activity"
+    static = static_planification_dataframe(project)
+    static = static[static["start_slot"].notna()].copy()
+    static["owner"] = "static"
+    static["course"] = None
+    entries = pd.concat([activities, static], ignore_index=True)
+    starts = entries["start_slot"].values.astype(np.int64)
+    durations = np.concatenate(
+        [
+            _durations(project, Activity, activities["id"]),
+            _durations(project, StaticActivity, static["id"]),
+        ]
+    )
+    entries["start_datetime"] = project.slots_to_datetime64(starts)
+    entries["end_datetime"] = project.slots_to_datetime64(starts + durations)
+    entries["date"] = entries["start_datetime"].dt.date
+    entries["weekday"] = [DAYS_NAMES[d - 1] for d in entries["weekday"]]
+    # The occurrences of a recurring static activity share its id
+    occurrence = entries.groupby(["owner", "id"]).cumcount()
+    entries["uid"] = (
+        entries["owner"]
+        + "-"
+        + entries["id"].astype(str)
+        + occurrence.map(lambda k: "" if k == 0 else f"-{k}")
+    )
+    entries = entries.sort_values(["start_slot", "uid"], kind="stable")
+    return entries.reset_index(drop=True)
+
+
+def _durations(project, model, ids):
+    """
+    Returns the durations (slots) of activities or static activities by id.
+    """
+    session = Session.object_session(project)
+    query = select(model.id, model.duration).where(model.project_id == project.id)
+    durations = dict(session.execute(query).all())
+    return np.array([durations[i] for i in ids], dtype=np.int64)
+
+
+def timetable_memberships(project) -> pd.DataFrame:
+    """
+    Returns the entries of the timetable of each ressource as (ressource kind,
+    ressource label, owner, id) rows: the activities allocated to the teachers
+    and the rooms and the activities attended by the atomic students and by any
+    student of the students groups.
+    """
+    session = Session.object_session(project)
+    columns = ["ressource_kind", "ressource", "owner", "id"]
+    frames = []
+    for kind, ressource, tables in [
+        (
+            "teachers",
+            Teacher,
+            [
+                ("activity", activity_teacher_allocation_association_table),
+                ("static", static_activity_teacher_allocation_association_table),
+            ],
+        ),
+        (
+            "rooms",
+            Room,
+            [
+                ("activity", activity_room_allocation_association_table),
+                ("static", static_activity_room_allocation_association_table),
+            ],
+        ),
+    ]:
+        for owner, table in tables:
+            owner_column = table.c[
+                "activity_id" if owner == "activity" else "static_activity_id"
+            ]
+            query = (
+                select(ressource.label, owner_column)
+                .join_from(table, ressource)
+                .where(ressource.project_id == project.id)
+            )
+            rows = pd.DataFrame(
+                session.execute(query).all(), columns=["ressource", "id"]
+            )
+            rows["ressource_kind"] = kind
+            rows["owner"] = owner
+            frames.append(rows)
+
+    # STUDENTS
+    members = pd.DataFrame(
+        session.execute(
+            select(
+                StudentsGroup.label,
+                AtomicStudent.label,
+                student_atomic_groups_association_table.c.group_id,
+            )
+            .join_from(
+                student_atomic_groups_association_table,
+                StudentsGroup,
+                student_atomic_groups_association_table.c.group_id == StudentsGroup.id,
+            )
+            .join(
+                AtomicStudent,
+                student_atomic_groups_association_table.c.atom_id == AtomicStudent.id,
+            )
+            .where(StudentsGroup.project_id == project.id)
+        ).all(),
+        columns=["group", "student", "group_id"],
+    )
+    attended = pd.concat(
+        [
+            pd.DataFrame(
+                session.execute(
+                    select(model.students_id, model.id).where(
+                        model.project_id == project.id
+                    )
+                ).all(),
+                columns=["group_id", "id"],
+            ).assign(owner=owner)
+            for owner, model in [("activity", Activity), ("static", StaticActivity)]
+        ]
+    )
+    # Activities of each atomic student: those of the groups containing it
+    students = members[["student", "group_id"]].merge(attended, on="group_id")
+    students = students.rename(columns={"student": "ressource"})
+    students["ressource_kind"] = "atomic_students"
+    frames.append(students)
+    # Activities of each group: those of any of its students
+    groups = members[["group", "student"]].merge(
+        students[["ressource", "owner", "id"]].rename(columns={"ressource": "student"}),
+        on="student",
+    )
+    groups = groups.rename(columns={"group": "ressource"})
+    groups["ressource_kind"] = "students_groups"
+    frames.append(groups)
+    memberships = pd.concat([f[columns] for f in frames], ignore_index=True)
+    return memberships.drop_duplicates(ignore_index=True)
+
+
+def _ressources_labels(project, kind):
+    if kind == "teachers":
+        return {t.label: (t.id, t.full_name or t.label) for t in project.teachers}
+    if kind == "rooms":
+        return {r.label: (r.id, r.label) for r in project.rooms}
+    if kind == "atomic_students":
+        return {s.label: (s.id, s.label) for s in project.atomic_students}
+    if kind == "students_groups":
+        return {g.label: (g.id, g.label) for g in project.students_groups}
+    raise ValueError(f"Unknown ressource kind {kind}")
+
+
+def _file_names(ressources):
+    """
+    Returns the file name of each ressource label of a `_ressources_labels`
+    mapping: the label with its unsafe characters replaced, followed by the
+    ressource id for the labels whose names would collide (case insensitively).
+    """
+    names = {label: re.sub(r"[^\w.-]+", "_", label) for label in ressources}
+    counts = Counter(name.lower() for name in names.values())
+    return {
+        label: name if counts[name.lower()] == 1 else f"{name}_{ressources[label][0]}"
+        for label, name in names.items()
+    }
+
+
+def timetable_tasks(
+    project, output_dir, kinds=RESSOURCE_KINDS, formats=("xlsx", "ics")
+):
+    """
+    Returns the timetables to write as (paths, title, rows) tuples of plain
+    Python objects, one per ressource of the `kinds`, rows being tuples of the
+    TIMETABLE_COLUMNS followed by the uid and the start and end datetimes.
+    """
+    entries = timetable_entries(project)
+    memberships = timetable_memberships(project)
+    entries_index = pd.Series(
+        entries.index, index=pd.MultiIndex.from_frame(entries[["owner", "id"]])
+    )
+    memberships = memberships.join(entries_index.rename("entry"), on=["owner", "id"])
+    memberships = memberships[memberships["entry"].notna()]
+    records = entries[TIMETABLE_COLUMNS + ["uid", "start_datetime", "end_datetime"]]
+    records = records.astype(object)
+    records = list(
+        records.where(records.notna(), None).itertuples(index=False, name=None)
+    )
+    by_ressource = {
+        key: np.sort(group["entry"].values.astype(np.int64))
+        for key, group in memberships.groupby(["ressource_kind", "ressource"])
+    }
+    tasks = []
+    for kind in kinds:
+        directory = os.path.join(output_dir, kind)
+        ressources = _ressources_labels(project, kind)
+        file_names = _file_names(ressources)
+        for label, (_, name) in ressources.items():
+            rows = [records[i] for i in by_ressource.get((kind, label), [])]
+            paths = [
+                os.path.join(directory, f"{file_names[label]}.{f}") for f in formats
+            ]
+            tasks.append((paths, name, rows))
+    return tasks
+
+
+def write_timetable_xlsx(path, title, rows):
+    """
+    Streams a timetable to an Excel file, row by row (xlsxwriter constant memory
+    mode).
+    """
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("timetable")
+    title_format = workbook.add_format({"bold": True, "font_size": 14})
+    header_format = workbook.add_format({"bold": True, "border": 1})
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd", "align": "center"})
+    center_format = workbook.add_format({"align": "center"})
+    worksheet.set_column(0, 0, 12, date_format)
+    worksheet.set_column(1, 3, 10, center_format)
+    worksheet.set_column(4, 6, 12)
+    worksheet.set_column(7, 9, 30)
+    worksheet.write_string(0, 0, title, title_format)
+    worksheet.write_row(1, 0, TIMETABLE_COLUMNS, header_format)
+    worksheet.freeze_panes(2, 0)
+    n_columns = len(TIMETABLE_COLUMNS)
+    for i, row in enumerate(rows):
+        worksheet.write_datetime(i + 2, 0, row[0], date_format)
+        # All the other columns are strings: skip xlsxwriter type detection
+        for j in range(1, n_columns):
+            if row[j] is not None:
+                worksheet.write_string(i + 2, j, row[j])
+    worksheet.autofilter(1, 0, max(len(rows), 1) + 1, n_columns - 1)
+    workbook.close()
+
+
+def _ics_text(text):
+    text = str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return text.replace("\n", "\\n")
+
+
+def _ics_line(line):
+    """
+    Folds a content line to 75 octets (RFC 5545) and ends it with CRLF.
+    """
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    size = 0
+    limit = 75
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            parts.append(current)
+            current, size, limit = "", 0, 74
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_datetime(dt):
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def write_timetable_ics(path, title, rows, dtstamp=None):
+    """
+    Streams a timetable to an iCalendar file, one event per row. Times are
+    floating local times, as in the project.
+    """
+    if dtstamp is None:
+        dtstamp = datetime.datetime.now(datetime.timezone.utc)
+    stamp = dtstamp.strftime("%Y%m%dT%H%M%SZ")
+    columns = {c: i for i, c in enumerate(TIMETABLE_COLUMNS)}
+    n_columns = len(TIMETABLE_COLUMNS)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for line in [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//automatic_university_scheduler//timetables//EN",
+            "CALSCALE:GREGORIAN",
+            f"X-WR-CALNAME:{_ics_text(title)}",
+        ]:
+            f.write(_ics_line(line))
+        for row in rows:
+            uid, start, end = row[n_columns:]
+            summary = " ".join(
+                _ics_text(row[columns[c]])
+                for c in ["course", "label", "kind"]
+                if row[columns[c]]
+            )
+            description = "\\n".join(
+                f"{name}: {_ics_text(row[columns[c]])}"
+                for name, c in [
+                    ("Students", "students"),
+                    ("Teachers", "allocated_teachers"),
+                ]
+                if row[columns[c]]
+            )
+            lines = [
+                "BEGIN:VEVENT",
+                f"UID:{uid}@automatic-university-scheduler",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{_ics_datetime(start)}",
+                f"DTEND:{_ics_datetime(end)}",
+                f"SUMMARY:{summary}",
+            ]
+            if row[columns["allocated_rooms"]]:
+                rooms = _ics_text(row[columns["allocated_rooms"]])
+                lines.append(f"LOCATION:{rooms}")
+            if description:
+                lines.append(f"DESCRIPTION:{description}")
+            lines.append("END:VEVENT")
+            for line in lines:
+                f.write(_ics_line(line))
+        f.write(_ics_line("END:VCALENDAR"))
+
+
+def write_timetable(task):
+    """
+    Writes the files of a timetable task (see `timetable_tasks`).
+    """
+    paths, title, rows = task
+    for path in paths:
+        if path.endswith(".xlsx"):
+            write_timetable_xlsx(path, title, rows)
+        elif path.endswith(".ics"):
+            write_timetable_ics(path, title, rows)
+        else:
+            raise ValueError(f"Unknown timetable format {path}")
+    return paths
+
+
+def export_timetables(
+    project,
+    output_dir,
+    kinds=RESSOURCE_KINDS,
+    formats=("xlsx", "ics"),
+    max_workers=None,
+):
+    """
+    Exports the timetable of each teacher, room, atomic student and students
+    group of a project as Excel and iCalendar files in
+    `output_dir/<kind>/<label>.<format>`. The timetables are extracted from the
+    database at once and written by a pool of `max_workers` processes (default:
+    one per CPU, in the current process if there is a single one).
+
+    Returns:
+    list: The written paths.
+    """
+    tasks = timetable_tasks(project, output_dir, kinds=kinds, formats=formats)
+    for kind in kinds:
+        create_directory(os.path.join(output_dir, kind))
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1:
+        results = map(write_timetable, tasks)
+        return [path for paths in results for path in paths]
+    chunksize = max(1, len(tasks) // (4 * max_workers))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(write_timetable, tasks, chunksize=chunksize)
+        return [path for paths in results for path in paths]
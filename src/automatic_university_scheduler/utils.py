@@ -2,6 +2,17 @@
 import os
 import yaml
 
+# libyaml's loader is about 10 times faster than the pure Python one
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(stream):
+    """
+    Parses a YAML document (str, bytes or file) with the fastest safe loader
+    available.
+    """
+    return yaml.load(stream, Loader=YAML_LOADER)
+
 
 def create_directory(directory: str) -> None:
     """
@@ -29,8 +40,8 @@ def read_from_yaml(path):
     Returns:
     dict: The contents of the YAML file as a Python dictionary.
     """
-    with open(path) as f:
-        data = yaml.safe_load(f)
+    with open(path, "rb") as f:
+        data = load_yaml(f)
     return data
 
 
@@ -2,8 +2,7 @@ import pandas as pd
 from string import Template
 import networkx as nx
 from automatic_university_scheduler.utils import Messages, Colors
-from mermaid.graph import Graph
-from mermaid import Mermaid
+from automatic_university_scheduler.graph_analysis import strongly_connected_cycles
 
 _mermaid_flow_template_html = r"""
 <html lang="fr">
@@ -58,25 +57,64 @@ _mermaid_flow_template_png = r"""
 #     return res
 
 
-def graph_to_mermaid(graph, path, title="Constraints Graph", format="html") -> str:
+def node_class(node):
+    """
+    Returns the Mermaid class of a constraints graph node from its label (SP for
+    start/end nodes, CM, TD, TP, EX for exams or None).
+    """
+    if "-s" in node or "-e" in node:
+        return "SP"
+    for kind in ["CM", "TD", "TP"]:
+        if kind in node:
+            return kind
+    if ("CT" in node) or ("CI" in node) or ("ET" in node) or ("CC" in node):
+        return "EX"
+    return None
+
 
+# Fill colors of the node classes
+NODE_CLASSES_COLORS = {
+    "SP": "#c5d4c5",
+    "CM": "#f96",
+    "TD": "#f69",
+    "TP": "#69f",
+    "EX": "#6f9",
+}
+
+
+def edge_label(edata):
     """
-    Converts YAML constraint model to Mermaid graph.
+    Returns the offset label of a constraints graph edge, None if it has no
+    offset.
+    """
+    offset = None
+    min_offset = edata["min_offset"]
+    max_offset = edata["max_offset"]
+    if min_offset is not None or max_offset is not None:
+        offset = ""
+        if min_offset is not None:
+            offset += f"{min_offset} <= \u0394t"
+        else:
+            min_offset = "*"
+            offset += f"{min_offset} <= \u0394t"
+        if max_offset is not None:
+            offset += f" <= {max_offset}"
+    return offset
+
+
+def mermaid_script(graph) -> str:
+    """
+    Converts a constraints graph to a Mermaid flowchart body.
     """
     text_constraints = ""
     for node in graph.nodes:
-        if '-s' in node:
+        kind = node_class(node)
+        if kind == "SP" and "-s" in node:
             text_constraints += f"        {node}[/{node}\]:::SPclass\n"
-        elif '-e' in node:
+        elif kind == "SP":
             text_constraints += f"        {node}[\{node}/]:::SPclass\n"
-        elif 'CM' in node:
-            text_constraints += f"        {node}:::CMclass\n"
-        elif 'TD' in node:
-            text_constraints += f"        {node}:::TDclass\n"
-        elif 'TP' in node:
-            text_constraints += f"        {node}:::TPclass\n"
-        elif ('CT' in node) or ('CI' in node) or ('ET' in node) or('CC' in node):
-            text_constraints += f"        {node}:::EXclass\n"
+        elif kind is not None:
+            text_constraints += f"        {node}:::{kind}class\n"
         else:
             text_constraints += f"        {node}\n"
     text_constraints += "        classDef SPclass fill:#c5d4c5, stroke: #c5d4c5, color:#fff\n"
@@ -86,23 +124,27 @@ def graph_to_mermaid(graph, path, title="Constraints Graph", format="html") -> s
     text_constraints += "        classDef EXclass fill:#6f9\n"
     for edge in graph.edges:
         start, end = edge
-        edata = graph.edges[edge]
-        offset = None
-        min_offset = edata["min_offset"]
-        max_offset = edata["max_offset"]
-        if min_offset is not None or max_offset is not None:
-            offset = ""
-            if min_offset is not None:
-                offset += f"{min_offset} <= \u0394t"
-            else:
-                min_offset = "*"
-                offset += f"{min_offset} <= \u0394t"
-            if max_offset is not None:
-                offset += f" <= {max_offset}"
-
+        offset = edge_label(graph.edges[edge])
         text_constraints += f"        {start} -->|{offset}| {end}\n"
-    
-    text_constraints = text_constraints.strip()
+    return text_constraints.strip()
+
+
+def mermaid_flowchart(graph) -> str:
+    """
+    Converts a constraints graph to a Mermaid flowchart script, as rendered to
+    images.
+    """
+    return Template(_mermaid_flow_template_png).substitute(
+        GRAPH=mermaid_script(graph), TITLE=""
+    )
+
+
+def graph_to_mermaid(graph, path, title="Constraints Graph", format="html") -> str:
+
+    """
+    Converts YAML constraint model to Mermaid graph.
+    """
+    text_constraints = mermaid_script(graph)
     if format == "html":
         text_constraints = Template(_mermaid_flow_template_html).substitute(
             GRAPH=text_constraints, TITLE=title
@@ -113,6 +155,10 @@ def graph_to_mermaid(graph, path, title="Constraints Graph", format="html") -> s
         text_constraints = Template(_mermaid_flow_template_png).substitute(
             GRAPH=text_constraints, TITLE=title
         )
+        # The mermaid package is slow to import and only needed to render images
+        from mermaid import Mermaid
+        from mermaid.graph import Graph
+
         graph = Graph(title="simple graph", script=text_constraints)
         render = Mermaid(graph)
         render.to_png(path)
@@ -198,9 +244,10 @@ def graph_degrees(G: nx.DiGraph) -> pd.DataFrame:
 
 def cycles_in_graph(G: nx.DiGraph) -> list:
     """
-    Detects cycles in a NetworkX DiGraph.
+    Detects cycles in a NetworkX DiGraph, one witness cycle per strongly connected
+    component.
     """
-    cycles = list(nx.simple_cycles(G))
+    cycles = strongly_connected_cycles(G)
     return cycles
 
 
@@ -0,0 +1,314 @@
+import copy
+import datetime
+import functools
+import os
+import smtplib
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from email import message_from_bytes
+from email.generator import BytesGenerator
+from email.mime.application import MIMEApplication
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from string import Template
+from automatic_university_scheduler.utils import create_directory, Messages
+
+VALIDATION_SUBJECT = Template(
+    "[Planification automatique] Validation modèle du module $COURSE"
+)
+
+VALIDATION_BODY = Template(
+    """
+    <html>
+    <body>
+        <p>Bonjour $MANAGER,</p>
+        <p>Voilà la manière dont je compte planifier ton module. Tu trouveras ci-dessous deux types d'informations.</p>
+        <p>1. Voici le tableau des activités planifiées: il fait le bilan des ressources que je vais utiliser pour chacune de ses activités.</p>
+        $TABLE
+        <p>2. Voici le graphique des contraintes: il indique les contraintes d'enchainement entre les différents groupes d'activités de ton module.</p>
+        <img src="cid:course_graph">
+        <p>J'attends de toi que je me dise si tu vois des erreurs dans les informations qui sont fournies ci-dessus par réponse à ce message avant le <b><span style="color:red;">$DEADLINE</span></b>. Sans réponse de ta part, je considère que tu valides mon modèle.</p>
+        <p>Je reste à ta disposition pour toute question.</p>
+        <p>En te souhaitant une radieuse journée.</p>
+        <p>$PLANNER</p>
+    </body>
+    </html>
+    """
+)
+
+
+def reminder_ics(deadline, reminder_deadline="-PT24H") -> str:
+    """
+    Returns the iCalendar reminder of a validation deadline given as
+    "dd/mm/yyyy", the alarm being triggered `reminder_deadline` (an iCalendar
+    duration) before 09:00 UTC on that day.
+    """
+    day = datetime.datetime.strptime(deadline, "%d/%m/%Y")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//automatic_university_scheduler//validation//FR",
+        "BEGIN:VEVENT",
+        "SUMMARY:Reminder",
+        f"DTSTART:{day:%Y%m%d}T090000Z",
+        "BEGIN:VALARM",
+        f"TRIGGER:{reminder_deadline}",
+        "ACTION:DISPLAY",
+        "DESCRIPTION:Reminder",
+        "END:VALARM",
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+    return "\r\n".join(lines) + "\r\n"
+
+
+@functools.lru_cache(maxsize=8)
+def _reminder_part(ics):
+    """
+    Returns the (base64 encoded once) reminder attachment of an iCalendar string,
+    shared by all the e-mails of a process.
+    """
+    reminder = MIMEApplication(ics, "ics")
+    reminder.add_header("Content-Disposition", "attachment", filename="reminder.ics")
+    return reminder
+
+
+def courses_tables(ressources) -> dict:
+    """
+    Renders the ressources table of each course as HTML from a DataFrame of
+    `postprocessing.ressources_dataframe`, grouped by course at once.
+    """
+    return {
+        course: data.drop(columns="course").to_html(index=False)
+        for course, data in ressources.groupby("course", sort=False)
+    }
+
+
+def validation_email_tasks(
+    project,
+    ressources,
+    graphs_paths,
+    output_dir,
+    deadline,
+    reminder_deadline="-PT24H",
+    graph_image_format="png",
+    activities_output_dir=None,
+):
+    """
+    Prepares the validation e-mail of each course of a project: the tables and
+    the reminder are rendered once, the graph images are those of
+    `graph_rendering.render_graphs`.
+
+    Parameters:
+    project (Project): The project.
+    ressources (DataFrame): The output of `postprocessing.ressources_dataframe`.
+    graphs_paths (dict): The rendered graphs, keyed by ("course_<label>", format).
+    output_dir (str): The directory of the .eml files.
+    deadline (str): The validation deadline, as "dd/mm/yyyy".
+    reminder_deadline (str): The iCalendar trigger of the reminder.
+    graph_image_format (str): "png" or "svg".
+    activities_output_dir (str): If given, the tables are also written there as
+        HTML files.
+
+    Returns:
+    list: One task (dict of strings) per course, as expected by
+    `build_validation_email`.
+    """
+    tables = courses_tables(ressources)
+    ics = reminder_ics(deadline, reminder_deadline)
+    if activities_output_dir is not None:
+        create_directory(activities_output_dir)
+    tasks = []
+    for course in project.courses:
+        table = tables.get(course.label, "")
+        if activities_output_dir is not None:
+            with open(
+                f"{activities_output_dir}/course_{course.label}_activities.html", "w"
+            ) as f:
+                f.write(table)
+        manager = course.manager
+        planner = course.planner
+        mname = manager.full_name.replace(" ", "_")
+        tasks.append(
+            {
+                "path": os.path.join(output_dir, f"message_{course.label}_{mname}.eml"),
+                "to": manager.email,
+                "from": planner.email,
+                "subject": VALIDATION_SUBJECT.substitute(COURSE=course.label),
+                "html": VALIDATION_BODY.substitute(
+                    MANAGER=manager.full_name,
+                    TABLE=table,
+                    DEADLINE=deadline,
+                    PLANNER=planner.full_name,
+                ),
+                "image": graphs_paths[f"course_{course.label}", graph_image_format],
+                "image_format": graph_image_format,
+                "image_name": f"course_{course.label}_graph.{graph_image_format}",
+                "reminder": ics,
+            }
+        )
+    return tasks
+
+
+def build_validation_email(task) -> MIMEMultipart:
+    """
+    Builds the MIME tree of a validation e-mail task.
+    """
+    msg = MIMEMultipart("related")
+    msg["To"] = task["to"]
+    msg["From"] = task["from"]
+    msg["Subject"] = task["subject"]
+    msg["Importance"] = "high"
+
+    msg_alternative = MIMEMultipart("alternative")
+    msg.attach(msg_alternative)
+    msg_alternative.attach(MIMEText(task["html"], "html"))
+
+    with open(task["image"], "rb") as f:
+        if task["image_format"] == "svg":
+            img = MIMEImage(f.read(), "svg+xml")
+        else:
+            img = MIMEImage(f.read())
+    img.add_header("Content-ID", "<course_graph>")
+    img.add_header("Content-Disposition", "inline", filename=task["image_name"])
+    msg.attach(img)
+
+    # Shallow copy: the encoded payload is shared, only the headers are copied
+    msg.attach(copy.copy(_reminder_part(task["reminder"])))
+    return msg
+
+
+def write_validation_email(task) -> str:
+    """
+    Writes a validation e-mail task to its .eml file and returns its path.
+    """
+    msg = build_validation_email(task)
+    with open(task["path"], "wb") as f:
+        BytesGenerator(f).flatten(msg)
+    return task["path"]
+
+
+def write_validation_emails(tasks, max_workers=None) -> list:
+    """
+    Writes validation e-mail tasks to .eml files with a pool of `max_workers`
+    processes (default: one per CPU, in the current process if there is a
+    single one).
+
+    Returns:
+    list: The written paths.
+    """
+    for directory in {os.path.dirname(task["path"]) for task in tasks}:
+        create_directory(directory)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 1:
+        return list(map(write_validation_email, tasks))
+    chunksize = max(1, len(tasks) // (4 * max_workers))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(write_validation_email, tasks, chunksize=chunksize))
+
+
+def send_validation_emails(tasks, host="localhost", port=25, verbose=True) -> int:
+    """
+    Sends validation e-mail tasks over a single SMTP connection.
+
+    Returns:
+    int: The number of sent e-mails.
+    """
+    with smtplib.SMTP(host, port) as smtp:
+        for task in tasks:
+            smtp.send_message(build_validation_email(task))
+    if verbose:
+        print(f"    EMAILS: {len(tasks)} sent to {host}:{port} => {Messages.SUCCESS}")
+    return len(tasks)
+
+
+# LOCAL SMTP STAND-IN
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal SMTP dialog (RFC 5321 subset without extensions) storing the received
+    messages in the server.
+    """
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        self.reply("220 localhost SMTP stand-in")
+        mail_from, rcpt_tos = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                mail_from, rcpt_tos = command.partition(":")[2].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_tos.append(command.partition(":")[2].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for line in iter(self.rfile.readline, b""):
+                    if line in (b".\r\n", b".\n"):
+                        break
+                    data.append(line[1:] if line.startswith(b"..") else line)
+                self.server.store(mail_from, rcpt_tos, b"".join(data))
+                mail_from, rcpt_tos = None, []
+                self.reply("250 OK")
+            elif verb == "RSET":
+                mail_from, rcpt_tos = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server that keeps the received messages in memory instead of
+    delivering them, to test e-mail campaigns. Used as a context manager, it
+    serves in a background thread on `localhost` (a free port by default).
+
+    Example:
+    with LocalSMTPServer() as server:
+        send_validation_emails(tasks, server.host, server.port)
+    messages = server.messages
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="localhost", port=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.host, self.port = self.server_address[:2]
+        self.messages = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def store(self, mail_from, rcpt_tos, data):
+        message = message_from_bytes(data)
+        with self._lock:
+            self.messages.append((mail_from, rcpt_tos, message))
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
@@ -0,0 +1,34 @@
+import os
+import pytest
+import yaml
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from automatic_university_scheduler.database import Base
+from automatic_university_scheduler.preprocessing import create_project
+
+EXAMPLE_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "doc", "examples", "basic_scheduling"
+)
+
+
+@pytest.fixture
+def model_data():
+    with open(os.path.join(EXAMPLE_DIR, "model.yaml")) as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", echo=False)
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def project(session, model_data):
+    """
+    The basic scheduling example loaded into an in-memory database.
+    """
+    return create_project(session, model_data)
@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+from automatic_university_scheduler.benchmarks.generator import generate_model
+from automatic_university_scheduler.benchmarks.harness import (
+    SIZES,
+    run_benchmarks,
+    read_results,
+    compare_results,
+)
+from automatic_university_scheduler.benchmarks.startup import measure_import
+
+
+class TestGenerator:
+    @staticmethod
+    def test_generate_model():
+        model, imported = generate_model(**SIZES["tiny"])
+        assert len(model["courses"]) == SIZES["tiny"]["n_courses"]
+        assert len(imported) == SIZES["tiny"]["n_imported"]
+        for course in model["courses"].values():
+            for activities in course["inner_activity_groups"].values():
+                assert set(activities) <= set(course["activities"])
+
+    @staticmethod
+    def test_generate_model_is_reproducible():
+        model1, imported1 = generate_model(seed=3)
+        model2, imported2 = generate_model(seed=3)
+        assert model1 == model2
+        assert imported1.equals(imported2)
+
+
+class TestHarness:
+    @staticmethod
+    def test_run_benchmarks(tmp_path):
+        path = str(tmp_path / "results.jsonl")
+        results = run_benchmarks(
+            {"tiny": SIZES["tiny"]}, output=path, time_limit=5.0, verbose=False
+        )
+        row = results.iloc[0]
+        assert row.activities > 0
+        assert row.static_activities > 0
+        # A solve without solution writes NaN
+        assert pd.notna(row.first_solution_time) and row.first_solution_time > 0
+        assert pd.notna(row.objective)
+        assert len(read_results(path)) == 1
+        assert len(compare_results(results, results)) == 0
+
+    @staticmethod
+    def test_compare_results():
+        baseline = pd.DataFrame(
+            [
+                {
+                    "instance": "a",
+                    "seed": 0,
+                    "load_time": 1.0,
+                    "extract_time": 1.0,
+                    "fetch_time": 1.0,
+                    "build_time": 1.0,
+                    "first_solution_time": 1.0,
+                    "objective": 10,
+                }
+            ]
+        )
+        current = baseline.copy()
+        current["build_time"] = 2.0
+        current["objective"] = 12
+        regressions = compare_results(baseline, current)
+        assert set(regressions.metric) == {"build_time", "objective"}
+
+
+class TestStartup:
+    @staticmethod
+    def test_lazy_imports():
+        _, heavy = measure_import("automatic_university_scheduler", repeat=1)
+        assert heavy == []
+        _, heavy = measure_import("automatic_university_scheduler.database", repeat=1)
+        assert heavy == ["sqlalchemy"]
+        _, heavy = measure_import("automatic_university_scheduler.validation", repeat=1)
+        assert "mermaid" not in heavy
+
+    @staticmethod
+    def test_submodule_attributes():
+        import automatic_university_scheduler as aus
+
+        assert aus.datetimeutils.DateTime is not None
+        assert "optimize" in dir(aus)
+        with pytest.raises(AttributeError):
+            aus.not_a_module
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from sqlalchemy import event
+from automatic_university_scheduler.database import ProjectSetup, load_project
+from automatic_university_scheduler.optimize import build_model
+from automatic_university_scheduler.preprocessing import create_project
+
+
+class TestProjectSetup:
+    @staticmethod
+    def test_cached(project):
+        setup = project.setup
+        assert isinstance(setup, ProjectSetup)
+        assert project.setup is setup
+        assert setup["HORIZON"] == setup.horizon == project.horizon
+        assert setup["TIME_SLOTS_PER_WEEK"] == 672
+        assert "ORIGIN_MONDAY" in setup.keys()
+        with pytest.raises(KeyError):
+            setup["UNKNOWN"]
+
+    @staticmethod
+    def test_immutable(project):
+        setup = project.setup
+        with pytest.raises(AttributeError):
+            setup.horizon = 0
+        with pytest.raises(ValueError):
+            setup.week_structure[0, 0] = 1
+
+    @staticmethod
+    def test_time_fields_invalidate(project):
+        setup = project.setup
+        project.horizon = setup.horizon + 672
+        assert project.setup is not setup
+        assert project.setup.horizon == setup.horizon + 672
+        assert project.setup.max_weeks == setup.max_weeks + 1
+
+    @staticmethod
+    def test_week_structure_invalidates(project, session):
+        assert project.week_slots_availability == []
+        week_structure = project.week_structure.copy()
+        week_structure[tuple(np.argwhere(week_structure)[0])] = 0
+        project.week_structure = week_structure
+        assert np.array_equal(project.week_structure, week_structure)
+        session.commit()
+        assert np.array_equal(project.week_structure, week_structure)
+        with pytest.raises(ValueError):
+            project.week_structure = week_structure.T
+
+    @staticmethod
+    def test_calendar_tables(session, model_data):
+        project = create_project(session, model_data, calendar_tables=True)
+        week_structure = project.week_structure
+        assert len(project.week_slots_availability) == week_structure.size
+        kinds = model_data["setup"]["activity_kinds"]
+        for kind in project.activity_kinds:
+            slots = kinds[kind.label]["allowed_start_time_slots"]
+            assert kind.allowed_start_slots.tolist() == sorted(slots)
+            kind.allowed_start_slots_bits = None
+            assert kind.allowed_start_slots.tolist() == sorted(slots)
+        # Projects stored without the bit masks read the week structure table
+        project.week_structure_bits = None
+        assert np.array_equal(project.week_structure, week_structure)
+        slot = next(s for s in project.week_slots_availability if s.available)
+        slot.available = False
+        assert project.week_structure.sum() == week_structure.sum() - 1
+
+
+class TestLoadProject:
+    @staticmethod
+    def count_queries(session):
+        queries = []
+        event.listen(
+            session.get_bind(),
+            "before_cursor_execute",
+            lambda *args: queries.append(args[2]),
+        )
+        return queries
+
+    @staticmethod
+    @pytest.mark.parametrize("profile", ["solve", "export", "validate"])
+    def test_profiles(project, session, profile):
+        label = project.label
+        session.commit()
+        session.expunge_all()
+        queries = TestLoadProject.count_queries(session)
+        loaded = load_project(session, profile=profile, label=label)
+        n_queries = len(queries)
+        assert loaded.label == label
+        if profile == "solve":
+            activities = loaded.activities
+        else:
+            activities = [a for c in loaded.courses for a in c.activities]
+        for activity in activities:
+            activity.students.students
+            activity.teacher_pool, activity.room_pool, activity.kind.label
+            activity.course.label
+        assert len(queries) == n_queries
+
+    @staticmethod
+    def test_solve_profile_builds_without_queries(project, session):
+        session.commit()
+        session.expunge_all()
+        queries = TestLoadProject.count_queries(session)
+        loaded = load_project(session, profile="solve")
+        n_queries = len(queries)
+        build_model(loaded)
+        assert len(queries) == n_queries
+
+    @staticmethod
+    def test_solution_profile(project, session):
+        session.commit()
+        session.expunge_all()
+        queries = TestLoadProject.count_queries(session)
+        loaded = load_project(session, profile="solution")
+        n_queries = len(queries)
+        for activity in loaded.activities:
+            activity.course.label, activity.start_datetime
+            activity.allocated_rooms, activity.allocated_teachers
+        loaded.rooms, loaded.teachers
+        assert len(queries) == n_queries
+        assert "static_activity" not in " ".join(queries)
+
+    @staticmethod
+    def test_unknown_profile(session):
+        with pytest.raises(ValueError):
+            load_project(session, profile="unknown")
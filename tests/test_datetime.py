@@ -1,10 +1,16 @@
 import pytest
 import datetime
 from datetime import datetime as dt
+import numpy as np
 from automatic_university_scheduler.datetimeutils import (
     DateTime,
     TimeDelta,
     TimeInterval,
+    datetime_to_slot,
+    slot_to_datetime,
+    slots_to_datetime64,
+    datetime64_to_slots,
+    isocalendar_to_datetime64,
 )
 
 
@@ -91,6 +97,16 @@ class TestTimeDelta:
     def test_to_slots():
         td_obj = TimeDelta(minutes=60)
         assert td_obj.to_slots() == 4
+        assert isinstance(td_obj.to_slots(), int)
+        assert TimeDelta(minutes=70).to_slots() == 4
+        assert TimeDelta(minutes=-10).to_slots() == -1
+
+    @staticmethod
+    def test_arithmetic_type():
+        dt_obj = DateTime(2022, 1, 1, 0, 0) + TimeDelta(minutes=15)
+        assert isinstance(dt_obj, DateTime)
+        assert isinstance(dt_obj - DateTime(2022, 1, 1), TimeDelta)
+        assert isinstance(TimeDelta(minutes=15) * 2, TimeDelta)
 
 
 class TestTimeInterval:
@@ -130,3 +146,55 @@ class TestTimeInterval:
         end = DateTime(2022, 1, 1, 1, 0)
         ti = TimeInterval(start, end)
         assert ti.duration() == TimeDelta.from_timedelta(end - start)
+
+    @staticmethod
+    def test_to_slots():
+        origin = DateTime(2022, 1, 1, 0, 0)
+        horizon = DateTime(2022, 1, 2, 0, 0)
+        ti = TimeInterval(DateTime(2022, 1, 1, 0, 20), DateTime(2022, 1, 1, 1, 10))
+        # The start is rounded down and the end up, to cover the interval
+        assert ti.to_slots(origin, horizon, TimeDelta(minutes=15)) == (1, 5)
+
+
+class TestSlotConversions:
+    origin = DateTime.from_str("2024-W36-1 08:00")
+    slot_duration = TimeDelta(minutes=15)
+
+    def test_datetime_to_slot(self):
+        dt_obj = DateTime.from_str("2024-W36-1 09:10")
+        assert datetime_to_slot(dt_obj, self.origin, self.slot_duration) == 4
+        assert (
+            datetime_to_slot(dt_obj, self.origin, self.slot_duration, round="ceil") == 5
+        )
+        dt_obj = DateTime.from_str("2024-W36-1 07:50")
+        assert datetime_to_slot(dt_obj, self.origin, self.slot_duration) == -1
+
+    def test_vectorized_round_trip(self):
+        slots = np.array([-100, -1, 0, 1, 96, 10000])
+        datetimes = slots_to_datetime64(slots, self.origin, self.slot_duration)
+        for slot, dt64 in zip(slots, datetimes):
+            expected = slot_to_datetime(int(slot), self.origin, self.slot_duration)
+            assert dt64 == np.datetime64(expected, "s")
+        assert np.array_equal(
+            datetime64_to_slots(datetimes, self.origin, self.slot_duration), slots
+        )
+        shifted = datetimes + np.timedelta64(1, "m")
+        assert np.array_equal(
+            datetime64_to_slots(shifted, self.origin, self.slot_duration), slots
+        )
+        assert np.array_equal(
+            datetime64_to_slots(shifted, self.origin, self.slot_duration, round="ceil"),
+            slots + 1,
+        )
+
+    @staticmethod
+    def test_isocalendar_to_datetime64():
+        dates = [
+            datetime.date(2020, 12, 31),
+            datetime.date(2021, 1, 3),
+            datetime.date(2024, 9, 2),
+            datetime.date(2026, 12, 28),
+        ]
+        iso = np.array([d.isocalendar() for d in dates])
+        out = isocalendar_to_datetime64(iso[:, 0], iso[:, 1], iso[:, 2])
+        assert out.tolist() == dates
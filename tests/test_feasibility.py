@@ -0,0 +1,82 @@
+from automatic_university_scheduler.feasibility import (
+    open_slots_mask,
+    presolve_checks,
+    find_infeasible_core,
+)
+
+
+def _activities(project):
+    return {(a.course.label, a.label): a for a in project.activities}
+
+
+class TestPresolveChecks:
+    @staticmethod
+    def test_open_slots_mask(project):
+        mask = open_slots_mask(project)
+        assert mask.shape == (project.horizon,)
+        # The origin is a monday at 08:00, which is open.
+        assert mask[0]
+        assert mask.sum() < project.horizon
+
+    @staticmethod
+    def test_feasible_project(project):
+        issues = presolve_checks(project, verbose=False)
+        assert len(issues) == 0
+
+    @staticmethod
+    def test_precedence_chain(project):
+        activities = _activities(project)
+        cm3 = activities["MATE001", "CM3"]
+        cm3.latest_start_slot = 2400
+        issues = presolve_checks(project, verbose=False)
+        assert set(issues.check) == {"precedence chain"}
+        issues = issues.set_index("subject")
+        assert "MATE001/CM1 -> MATE001/CM2" in issues.message["MATE001/CM3"]
+
+    @staticmethod
+    def test_pools(project):
+        activities = _activities(project)
+        activities["MATE001", "TD1-A"].teacher_count = 2
+        issues = presolve_checks(project, verbose=False)
+        assert list(issues.check) == ["teachers pool"]
+
+    @staticmethod
+    def test_rooms_capacity(project):
+        activity = _activities(project)["MATE001", "TP1-A1"]
+        assert activity.students.headcount == 14
+        for room in activity.room_pool:
+            room.capacity = 10
+        issues = presolve_checks(project, verbose=False)
+        assert "rooms capacity" in list(issues.check)
+
+    @staticmethod
+    def test_students_load(project):
+        activities = _activities(project)
+        activities["MATE001", "TP1-A1"].duration = project.horizon
+        issues = presolve_checks(project, verbose=False)
+        assert "students load" in list(issues.check)
+
+
+class TestInfeasibleCore:
+    @staticmethod
+    def test_core(project):
+        activities = _activities(project)
+        activities["MATE001", "CM3"].earliest_start_slot = 2300
+        activities["MATE001", "CM3"].latest_start_slot = 2400
+        core = find_infeasible_core(project, max_time_in_seconds=30, verbose=False)
+        # CM1 cannot start early enough for the CM1 -> CM2 -> CM3 chain (480
+        # slots apart) to end before the latest start of CM3
+        successions = {
+            (
+                constraint.from_activity_group.activities[0].label,
+                constraint.to_activity_group.activities[0].label,
+                constraint.min_offset,
+            ): constraint.id
+            for constraint in project.starts_after_constraints
+        }
+        assert set(core.group) == {
+            f"earliest_start:{activities['MATE001', 'CM1'].id}",
+            f"latest_start:{activities['MATE001', 'CM3'].id}",
+            f"starts_after:{successions['CM1', 'CM2', 480]}",
+            f"starts_after:{successions['CM2', 'CM3', 480]}",
+        }
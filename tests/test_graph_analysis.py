@@ -0,0 +1,66 @@
+import networkx as nx
+from automatic_university_scheduler.database import StartsAfterConstraint
+from automatic_university_scheduler.feasibility import presolve_checks
+from automatic_university_scheduler.graph_analysis import (
+    analyze_project_graph,
+    strongly_connected_cycles,
+)
+
+
+def _groups(project):
+    return {(g.course.label, g.label): g for g in project.activity_groups}
+
+
+class TestStronglyConnectedCycles:
+    @staticmethod
+    def test_witnesses():
+        graph = nx.DiGraph([(1, 2), (2, 3), (3, 1), (3, 4), (5, 5), (6, 7), (7, 6)])
+        cycles = strongly_connected_cycles(graph)
+        assert sorted(sorted(cycle) for cycle in cycles) == [[1, 2, 3], [5], [6, 7]]
+        for cycle in cycles:
+            for start, end in zip(cycle, cycle[1:] + cycle[:1]):
+                assert graph.has_edge(start, end)
+
+    @staticmethod
+    def test_dense_graph():
+        graph = nx.complete_graph(40, create_using=nx.DiGraph)
+        cycles = strongly_connected_cycles(graph)
+        assert len(cycles) == 1
+
+
+class TestProjectGraph:
+    @staticmethod
+    def test_analysis(project):
+        analysis = analyze_project_graph(project, verbose=False)
+        assert analysis["cycles"] == []
+        assert 0 < analysis["critical_path_length"] <= project.horizon
+        assert analysis["critical_path"][0] == "MATE001/CM1"
+        assert analysis["sources"] == ["MATE001/CM1"]
+
+    @staticmethod
+    def test_cycle(session, project):
+        groups = _groups(project)
+        from_group = next(g for (_, label), g in groups.items() if label == "CM3")
+        to_group = next(g for (_, label), g in groups.items() if label == "CM1")
+        session.add(
+            StartsAfterConstraint(
+                label="starts_after",
+                project=project,
+                min_offset=0,
+                from_activity_group=from_group,
+                to_activity_group=to_group,
+            )
+        )
+        session.commit()
+        analysis = analyze_project_graph(project, verbose=False)
+        assert len(analysis["cycles"]) == 1
+        assert analysis["critical_path_length"] is None
+        issues = presolve_checks(project, verbose=False)
+        assert list(issues.check) == ["precedence cycle"]
+
+    @staticmethod
+    def test_critical_path(project):
+        for starts_after in project.starts_after_constraints:
+            starts_after.min_offset = project.horizon // 2
+        issues = presolve_checks(project, verbose=False)
+        assert "critical path" in list(issues.check)
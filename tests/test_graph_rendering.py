@@ -0,0 +1,61 @@
+import os
+import xml.etree.ElementTree as ET
+import networkx as nx
+from automatic_university_scheduler.graph_rendering import (
+    graph_fingerprint,
+    graph_to_svg,
+    render_graphs,
+)
+
+
+def _graph(max_offset=4):
+    graph = nx.DiGraph()
+    graph.add_edge(
+        "CM1", "TD1", min_offset=None, max_offset=None, min_offset_slots=None
+    )
+    graph.add_edge(
+        "TD1",
+        "TP1",
+        min_offset="1 day",
+        max_offset=None,
+        min_offset_slots=96,
+        max_offset_slots=max_offset,
+    )
+    return graph
+
+
+class TestGraphRendering:
+    @staticmethod
+    def test_fingerprint(project):
+        for course in project.courses:
+            assert graph_fingerprint(course.activity_graph) == graph_fingerprint(
+                course.activity_graph
+            )
+        assert graph_fingerprint(_graph()) != graph_fingerprint(_graph(5))
+
+    @staticmethod
+    def test_svg(project):
+        for course in project.courses:
+            svg = graph_to_svg(course.activity_graph, title=f"<{course.label}>")
+            root = ET.fromstring(svg)
+            rects = root.findall("{http://www.w3.org/2000/svg}rect")
+            assert len(rects) == course.activity_graph.number_of_nodes()
+
+    @staticmethod
+    def test_cache(tmp_path):
+        graphs = {"a": (_graph(), "A"), "b": (_graph(), "B")}
+        paths = render_graphs(
+            graphs, str(tmp_path), formats=("html", "svg"), renderer="builtin"
+        )
+        assert len(paths) == 4
+        mtimes = {key: os.stat(path).st_mtime_ns for key, path in paths.items()}
+        for path in paths.values():
+            os.utime(path, ns=(0, 0))
+        graphs["b"] = (_graph(5), "B")
+        paths = render_graphs(
+            graphs, str(tmp_path), formats=("html", "svg"), renderer="builtin"
+        )
+        assert os.stat(paths["a", "svg"]).st_mtime_ns == 0
+        assert os.stat(paths["a", "html"]).st_mtime_ns == 0
+        assert os.stat(paths["b", "svg"]).st_mtime_ns >= mtimes["b", "svg"]
+        assert os.stat(paths["b", "html"]).st_mtime_ns >= mtimes["b", "html"]
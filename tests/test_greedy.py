@@ -0,0 +1,64 @@
+import numpy as np
+from ortools.sat.python import cp_model
+from automatic_university_scheduler.greedy import (
+    export_schedule_to_database,
+    free_starts,
+    greedy_schedule,
+)
+from automatic_university_scheduler.optimize import build_model
+from automatic_university_scheduler.snapshot import UNSET, project_snapshot
+
+
+class TestGreedySchedule:
+    @staticmethod
+    def test_free_starts():
+        busy = np.array([0, 0, 1, 0, 0, 0, 1, 0], dtype=bool)
+        assert free_starts(busy, 2).tolist() == [
+            True,
+            False,
+            False,
+            True,
+            True,
+            False,
+            False,
+            False,
+        ]
+        assert not free_starts(busy, 9).any()
+
+    @staticmethod
+    def test_schedule_is_feasible(project):
+        snapshot = project_snapshot(project)
+        schedule = greedy_schedule(snapshot, verbose=False)
+        assert schedule.unplaced == []
+        assert set(schedule.starts) == set(snapshot.activity_ids.tolist())
+        # The model pinned to the greedy starts is feasible
+        model, _ = build_model(schedule.hinted_snapshot(snapshot, window=0))
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = 30
+        solver.parameters.num_workers = 1
+        assert solver.Solve(model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        hinted = schedule.hinted_snapshot(snapshot)
+        assert (hinted.activity_starts != UNSET).all()
+        assert np.array_equal(
+            hinted.activity_earliest_starts, snapshot.activity_earliest_starts
+        )
+
+    @staticmethod
+    def test_unplaced(project):
+        activity = next(a for a in project.activities if len(a.students.students) > 0)
+        closed = int(np.flatnonzero(~project.calendar.available)[0])
+        activity.earliest_start_slot = activity.latest_start_slot = closed
+        schedule = greedy_schedule(project, verbose=False)
+        assert schedule.unplaced == [activity.id]
+        assert activity.id not in schedule.starts
+
+    @staticmethod
+    def test_export(session, project):
+        schedule = greedy_schedule(project, verbose=False)
+        export_schedule_to_database(session, project, schedule)
+        for activity in project.activities:
+            assert activity.start == schedule.starts[activity.id]
+            assert [r.label for r in activity.allocated_rooms] == (
+                schedule.rooms[activity.id]
+            )
+            assert len(activity.allocated_teachers) == activity.teacher_count
@@ -0,0 +1,83 @@
+import os
+import yaml
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from automatic_university_scheduler.database import Base
+from automatic_university_scheduler.model_directory import (
+    COURSES_DIRECTORY,
+    load_model_directory,
+    read_model_directory,
+    write_model_directory,
+)
+from automatic_university_scheduler.preprocessing import create_project
+from conftest import EXAMPLE_DIR
+
+
+def _snapshot(project):
+    activities = sorted(
+        (
+            a.course.label,
+            a.label,
+            a.duration,
+            a.kind.label,
+            a.students.label,
+            tuple(sorted(r.label for r in a.room_pool)),
+            tuple(sorted(t.label for t in a.teacher_pool)),
+        )
+        for a in project.activities
+    )
+    groups = sorted(
+        (
+            g.course.label,
+            g.label,
+            tuple(sorted((a.course.label, a.label) for a in g.activities)),
+        )
+        for g in project.activity_groups
+    )
+    constraints = sorted(
+        (
+            (c.from_activity_group.course.label, c.from_activity_group.label),
+            (c.to_activity_group.course.label, c.to_activity_group.label),
+            c.min_offset,
+            c.max_offset,
+        )
+        for c in project.starts_after_constraints
+    )
+    return activities, groups, constraints
+
+
+class TestModelDirectory:
+    @staticmethod
+    def test_incremental_load(tmp_path):
+        with open(os.path.join(EXAMPLE_DIR, "model.yaml")) as f:
+            model = yaml.safe_load(f)
+        directory = tmp_path / "model"
+        write_model_directory(model, directory)
+        assert read_model_directory(directory)[0] == model
+
+        session = Session(create_engine(f"sqlite:///{tmp_path / 'data.db'}"))
+        project, reloaded = load_model_directory(session, directory, verbose=False)
+        assert reloaded == sorted(model["courses"])
+        for activity in project.activities:
+            activity.start = 100
+        session.commit()
+        assert load_model_directory(session, directory, verbose=False)[1] == []
+
+        changed, untouched = sorted(model["courses"])
+        course_file = directory / COURSES_DIRECTORY / f"{changed}.yaml"
+        course_data = model["courses"][changed]
+        activity_data = next(iter(course_data["activities"].values()))
+        activity_data["duration"] = "2h"
+        with open(course_file, "w") as f:
+            yaml.safe_dump({changed: course_data}, f)
+        project, reloaded = load_model_directory(session, directory, verbose=False)
+        assert reloaded == [changed]
+        for activity in project.activities:
+            expected = None if activity.course.label == changed else 100
+            assert activity.start == expected
+
+        reference_engine = create_engine("sqlite://")
+        Base.metadata.create_all(reference_engine)
+        reference_session = Session(reference_engine)
+        reference = create_project(reference_session, model)
+        assert _snapshot(project) == _snapshot(reference)
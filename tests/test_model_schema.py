@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import select
+from automatic_university_scheduler.benchmarks.generator import generate_model
+from automatic_university_scheduler.database import Project
+from automatic_university_scheduler.model_directory import (
+    COURSES_DIRECTORY,
+    read_model_directory,
+    write_model_directory,
+)
+from automatic_university_scheduler.model_schema import ModelError, model_errors
+from automatic_university_scheduler.preprocessing import create_project
+
+
+class TestModelSchema:
+    @staticmethod
+    def test_valid_models(model_data):
+        assert model_errors(model_data) == []
+        assert model_errors(generate_model(n_courses=3)[0]) == []
+
+    @staticmethod
+    def test_all_errors_collected(model_data):
+        activities = model_data["courses"]["MATH001"]["activities"]
+        activities["CM1"]["teachers"]["pool"] = ["ZZ"]
+        activities["CM1"]["rooms"]["pool"] = "undefined_pool"
+        activities["CM1"]["duration"] = "3x"
+        del model_data["courses"]["MATE001"]["activities"]["CM2"]
+        model_data["managers"]["AA"] = 1
+        del model_data["aliases"]
+        errors = dict(model_errors(model_data))
+        assert errors == {
+            "aliases": "missing",
+            "managers.AA": "expected a mapping, got int",
+            "courses.MATH001.activities.CM1.duration": "invalid duration '3x'",
+            "courses.MATE001.inner_activity_groups.CM2": "undefined activity 'CM2'",
+        }
+        # MATH001 is only checked for references once its structure is valid
+        activities["CM1"]["duration"] = 6
+        errors = dict(model_errors(model_data))
+        assert errors["courses.MATH001.activities.CM1.teachers.pool"] == (
+            "undefined teacher 'ZZ'"
+        )
+        assert errors["courses.MATH001.foreign_activity_groups.MATE001_CM2"] == (
+            "undefined activity MATE001/CM2"
+        )
+
+    @staticmethod
+    def test_rooms_and_headcounts(model_data):
+        model_data["rooms"]["A-POLY-B120"]["capacity"] = "large"
+        model_data["students"]["headcounts"]["nobody"] = 3
+        errors = dict(model_errors(model_data))
+        assert errors == {
+            "rooms.A-POLY-B120.capacity": (
+                "expected a non negative integer, got 'large'"
+            ),
+            "students.headcounts.nobody": "undefined atomic student 'nobody'",
+        }
+        del model_data["rooms"]
+        del model_data["students"]["headcounts"]
+        assert model_errors(model_data) == []
+
+    @staticmethod
+    def test_fails_before_writing(session, model_data):
+        model_data["courses"]["MATH001"]["manager"] = "nobody"
+        with pytest.raises(ModelError) as error:
+            create_project(session, model_data)
+        assert error.value.errors == [
+            ("courses.MATH001.manager", "undefined manager 'nobody'")
+        ]
+        assert session.execute(select(Project)).first() is None
+
+    @staticmethod
+    def test_model_directory_errors(tmp_path, model_data):
+        write_model_directory(model_data, tmp_path)
+        courses = tmp_path / COURSES_DIRECTORY
+        (courses / "MATE001.yaml").write_text("MATE001: [unclosed\n")
+        (courses / "EMPTY.yaml").write_text("{}\n")
+        with pytest.raises(ModelError) as error:
+            read_model_directory(tmp_path, max_workers=2)
+        paths = [path for path, _ in error.value.errors]
+        assert paths[:2] == [
+            f"{COURSES_DIRECTORY}/MATE001.yaml",
+            f"{COURSES_DIRECTORY}/EMPTY.yaml",
+        ]
+        # MATH001 refers to the activities of the unreadable MATE001
+        assert "courses.MATH001.foreign_activity_groups.MATE001_CM1" in paths
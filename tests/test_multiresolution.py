@@ -0,0 +1,145 @@
+import numpy as np
+import pytest
+from ortools.sat.python import cp_model
+from automatic_university_scheduler.database import StaticActivity
+from automatic_university_scheduler.multiresolution import (
+    coarsen_snapshot,
+    hinted_snapshot,
+    multiresolution_snapshot,
+)
+from automatic_university_scheduler.optimize import build_model
+from automatic_university_scheduler.snapshot import UNSET, project_snapshot
+
+
+def _solve(snapshot, max_time_in_seconds=30):
+    model, variables = build_model(snapshot)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max_time_in_seconds
+    solver.parameters.num_search_workers = 1
+    status = solver.Solve(model)
+    return status, solver, variables
+
+
+class TestCoarsening:
+    @staticmethod
+    def test_coarse_snapshot(project):
+        fine = project_snapshot(project)
+        coarsening = coarsen_snapshot(fine, 4)
+        coarse = coarsening.snapshot
+        assert coarse.time_slots_per_day == 24
+        assert coarse.time_slots_per_week == 168
+        assert coarse.week_structure.shape == (24, 7)
+        assert np.array_equal(
+            coarse.activity_durations, -(-fine.activity_durations // 4)
+        )
+        assert len(coarse.calendar.year) == coarse.horizon + 1
+        # Recurring static activities keep their (whole) period
+        assert np.array_equal(coarse.static_periods * 4, fine.static_periods)
+        with pytest.raises(ValueError):
+            coarsen_snapshot(fine, 5)
+
+    @staticmethod
+    def test_allowed_start_slots(project):
+        fine = project_snapshot(project)
+        coarsening = coarsen_snapshot(fine, 4)
+        coarse = coarsening.snapshot
+        tspd = fine.time_slots_per_day
+        for k, slots in enumerate(fine.kind_allowed_daily_slots.tolists()):
+            kind_activities = fine.activity_ids[fine.activity_kinds == k].tolist()
+            if len(kind_activities) == 0:
+                continue
+            aid = kind_activities[0]
+            for cell in coarse.kind_allowed_daily_slots[k].tolist():
+                start = coarse.origin_monday_slot + 7 * 24 + cell
+                fine_start = coarsening.to_fine({aid: start})[aid]
+                assert (fine_start - fine.origin_monday_slot) % tspd in slots
+                assert coarsening.to_coarse(fine_start) == start
+
+    @staticmethod
+    def test_coarse_solution_refines(project):
+        fine = project_snapshot(project)
+        coarsening = coarsen_snapshot(fine, 4)
+        status, solver, variables = _solve(coarsening.snapshot)
+        assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        starts = {
+            aid: solver.Value(start)
+            for aid, start in variables["activities_starts"].items()
+        }
+        # The fine model pinned to the refined coarse solution is feasible
+        pinned = hinted_snapshot(fine, coarsening.to_fine(starts), window=0)
+        status, _, _ = _solve(pinned)
+        assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+
+class TestHints:
+    @staticmethod
+    def test_hinted_snapshot(project):
+        fine = project_snapshot(project)
+        aid = int(fine.activity_ids[2])
+        hinted = hinted_snapshot(fine, {aid: 500}, rooms={aid: []}, window=10)
+        assert hinted.activity_starts[2] == 500
+        assert hinted.activity_earliest_starts[2] == 490
+        assert hinted.activity_latest_starts[2] == 510
+        assert hinted.activity_allocated_rooms[2].tolist() == []
+        assert hinted.activity_starts[3] == fine.activity_starts[3]
+        assert hinted.activity_earliest_starts[3] == UNSET
+        assert np.array_equal(
+            hinted.activity_allocated_teachers.indices,
+            fine.activity_allocated_teachers.indices,
+        )
+
+    @staticmethod
+    def test_multiresolution_snapshot(project):
+        hinted = multiresolution_snapshot(
+            project,
+            factors=(8, 4),
+            window=96,
+            max_time_in_seconds=2,
+            num_search_workers=1,
+            verbose=False,
+        )
+        assert (hinted.activity_starts != UNSET).all()
+        assert (hinted.activity_earliest_starts != UNSET).all()
+        status, _, _ = _solve(hinted)
+        assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+    @staticmethod
+    def test_coarse_gap_closed(session, project):
+        fine = project_snapshot(project)
+        base = coarsen_snapshot(fine, 4).base
+        status, solver, variables = _solve(fine)
+        assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        # A room only open around a start misaligned with the coarse slots: the
+        # gap vanishes at the coarse resolution
+        activity, start = next(
+            (a, solver.Value(variables["activities_starts"][a.id]))
+            for a in project.activities
+            if (solver.Value(variables["activities_starts"][a.id]) - base) % 4 != 0
+        )
+        room = project.rooms[0]
+        activity.room_pool = [room]
+        for begin, end in ((0, start), (start + activity.duration, project.horizon)):
+            session.add(
+                StaticActivity(
+                    label="works",
+                    kind="room unavailable",
+                    start=begin,
+                    duration=end - begin,
+                    project=project,
+                    allocated_rooms=[room],
+                )
+            )
+        session.commit()
+        fine = project_snapshot(project)
+        status, _, _ = _solve(fine)
+        assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        status, _, _ = _solve(coarsen_snapshot(fine, 4).snapshot)
+        assert status == cp_model.INFEASIBLE
+        # The fine snapshot is returned unhinted
+        hinted = multiresolution_snapshot(
+            fine, max_time_in_seconds=2, num_search_workers=1, verbose=False
+        )
+        assert np.array_equal(hinted.activity_starts, fine.activity_starts)
+        assert np.array_equal(
+            hinted.activity_earliest_starts, fine.activity_earliest_starts
+        )
@@ -0,0 +1,214 @@
+import pytest
+from ortools.sat.python import cp_model
+from automatic_university_scheduler.datetimeutils import DateTime as DT
+from automatic_university_scheduler.datetimeutils import TimeDelta
+from automatic_university_scheduler.feasibility import static_busy_masks
+from automatic_university_scheduler.database import StaticActivity
+from automatic_university_scheduler.optimize import (
+    build_model,
+    create_activities_variables,
+    merge_intervals,
+    room_combinations,
+)
+from automatic_university_scheduler.snapshot import UNSET
+from automatic_university_scheduler.preprocessing import (
+    process_constraint_static_activity,
+)
+
+
+def _constraint_kind(constraint):
+    # Text format works with both protobuf and the native proto wrappers.
+    for line in str(constraint).splitlines():
+        field = line.split(":")[0].split("{")[0].strip()
+        if field not in ("name", "enforcement_literal"):
+            return field
+
+
+def _constraints_kinds(model):
+    kinds = {}
+    for constraint in model.Proto().constraints:
+        kind = _constraint_kind(constraint)
+        kinds[kind] = kinds.get(kind, 0) + 1
+    return kinds
+
+
+class TestStartsAfterConstraints:
+    @staticmethod
+    def test_group_bounds_are_shared(project):
+        model = cp_model.CpModel()
+        create_activities_variables(model, project, propagate=False)
+        # Multi-activity groups referenced by constraints: TD1, TD2 and TD3 (end
+        # max as predecessors, start min and start max as successors) and TP1
+        # (start min). Singleton groups need no auxiliary variable.
+        kinds = _constraints_kinds(model)
+        assert kinds["lin_max"] == 3 + 2 + 3 + 1
+
+    @staticmethod
+    def test_one_constraint_per_precedence(project):
+        literals = {}
+        model = cp_model.CpModel()
+        create_activities_variables(model, project, literals=literals)
+        starts_after_literals = [
+            literal.Index()
+            for key, literal in literals.items()
+            if key.startswith("starts_after:")
+        ]
+        guarded = 0
+        for constraint in model.Proto().constraints:
+            if _constraint_kind(constraint) != "linear":
+                continue
+            if set(constraint.enforcement_literal) & set(starts_after_literals):
+                guarded += 1
+        offsets = sum(
+            (c.min_offset is not None) + (c.max_offset is not None)
+            for c in project.starts_after_constraints
+        )
+        assert guarded == offsets
+
+
+class TestStaticActivities:
+    @staticmethod
+    def test_recurrence_rows():
+        # Weekly from one week before the origin to the 4th week after the
+        # horizon, the last occurrence being cut by it
+        origin = DT.from_str("2024-W10-1 00:00")
+        rows = process_constraint_static_activity(
+            {
+                "start": "2024-W09-1 08:00",
+                "end": "2024-W09-1 12:00",
+                "repeat": 8,
+                "offset": "1w",
+            },
+            origin_datetime=origin,
+            horizon=4 * 672 + 40,
+            time_slot_duration=TimeDelta.from_str("15m"),
+            label="unavailable",
+        )
+        assert [(r["start"], r["duration"], r["count"]) for r in rows] == [
+            (32, 16, 4),
+            (4 * 672 + 32, 8, 1),
+        ]
+        assert rows[0]["period"] == 672 and "period" not in rows[1]
+        assert rows[0]["label"] == "unavailable"
+
+    @staticmethod
+    def test_merge_intervals():
+        assert merge_intervals([(5, 8), (0, 2), (2, 3), (6, 10)]) == [(0, 3), (5, 10)]
+
+    @staticmethod
+    def test_solution_avoids_static_activities(project):
+        recurring = [s for s in project.static_activities if s.count > 1]
+        assert len(recurring) > 0
+        model, variables = build_model(project, objective=False)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = 30
+        solver.parameters.num_workers = 1
+        assert solver.Solve(model) == cp_model.OPTIMAL
+        masks = static_busy_masks(project)
+        teachers = {t.label: t.id for t in project.teachers}
+        for activity in project.activities:
+            start = solver.Value(variables["activities_starts"][activity.id])
+            slots = slice(start, start + activity.duration)
+            busy = [masks["students"].get(s.id) for s in activity.students.students]
+            alternatives = variables["activities_alternative_ressources"][activity.id]
+            for literal, labels in alternatives["teachers"]:
+                if solver.Value(literal) == 1:
+                    busy += [masks["teachers"].get(teachers[l]) for l in labels]
+            assert not any(mask[slots].any() for mask in busy if mask is not None)
+
+
+class TestOpenTime:
+    @staticmethod
+    def test_solution_in_open_time(project):
+        model, variables = build_model(project, objective=False, open_time=True)
+        open_time = variables["open_time"]
+        assert variables["weekly_unavailable_intervals"] == []
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = 30
+        solver.parameters.num_workers = 1
+        assert solver.Solve(model) == cp_model.OPTIMAL
+        available = project.calendar.available
+        starts, ends = {}, {}
+        for activity in project.activities:
+            start = solver.Value(variables["activities_starts"][activity.id])
+            starts[activity.id] = int(open_time.to_slots(start))
+            ends[activity.id] = starts[activity.id] + activity.duration
+            assert available[starts[activity.id] : ends[activity.id]].all()
+        for constraint in project.starts_after_constraints:
+            from_activities = constraint.from_activity_group.activities
+            from_end = max(ends[a.id] for a in from_activities)
+            to_activities = constraint.to_activity_group.activities
+            to_starts = [starts[a.id] for a in to_activities]
+            if constraint.min_offset is not None:
+                assert min(to_starts) >= from_end + constraint.min_offset
+            if constraint.max_offset is not None:
+                assert max(to_starts) <= from_end + constraint.max_offset
+
+    @staticmethod
+    def test_no_literals(project):
+        with pytest.raises(ValueError):
+            build_model(project, literals={}, open_time=True)
+
+
+def _alternative_rooms(variables):
+    return {
+        room
+        for alternatives in variables["activities_alternative_ressources"].values()
+        for _, rooms in alternatives["rooms"]
+        for room in rooms
+    }
+
+
+class TestRoomsPruning:
+    @staticmethod
+    def test_room_combinations():
+        capacities = {1: 10, 2: 20, 3: UNSET, 4: 30}
+        assert room_combinations([1, 2, 4], 1, capacities, 15) == [(2,), (4,)]
+        assert room_combinations([1, 2, 3], 2, capacities, 25) == [
+            (1, 2),
+            (1, 3),
+            (2, 3),
+        ]
+        assert room_combinations([1, 2, 4], 1, capacities, UNSET, {4}) == [
+            (1,),
+            (2,),
+        ]
+        assert room_combinations([1, 2], 0, capacities, 100) == [()]
+
+    @staticmethod
+    def test_capacities(project):
+        # The 14 students of the TP groups do not fit in the 12 seats of C202
+        room = {r.label: r for r in project.rooms}["A-POLY-C202"]
+        assert room.capacity == 12 and len(room.activities_pools) > 0
+        _, variables = build_model(project, objective=False)
+        assert "A-POLY-C202" not in _alternative_rooms(variables)
+        _, variables = build_model(project, literals={}, objective=False)
+        assert "A-POLY-C202" in _alternative_rooms(variables)
+
+    @staticmethod
+    def test_busy_rooms(session, project):
+        room = {r.label: r for r in project.rooms}["A-POLY-A030"]
+        half = project.horizon // 2
+        for start in (0, half):
+            session.add(
+                StaticActivity(
+                    label="works",
+                    kind="room unavailable",
+                    start=start,
+                    duration=project.horizon - half,
+                    project=project,
+                    allocated_rooms=[room],
+                )
+            )
+        session.commit()
+        _, variables = build_model(project, objective=False)
+        assert "A-POLY-A030" not in _alternative_rooms(variables)
+        # Without any combination left, the static activities make the model
+        # infeasible instead of the builder failing
+        for activity in list(room.activities_pools):
+            activity.room_pool = [room]
+        model, variables = build_model(project, objective=False)
+        assert "A-POLY-A030" in _alternative_rooms(variables)
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = 1
+        assert solver.Solve(model) == cp_model.INFEASIBLE
@@ -0,0 +1,109 @@
+import os
+import shutil
+import pytest
+import yaml
+from automatic_university_scheduler.cli import main
+from automatic_university_scheduler.pipeline import (
+    PIPELINE_STAGES,
+    Stage,
+    run_pipeline,
+    stages_order,
+)
+from conftest import EXAMPLE_DIR
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(EXAMPLE_DIR, "model.yaml"), tmp_path)
+    setup = {
+        "engine": "sqlite:///data.db",
+        "output_dir": "output/",
+        "graph_image_format": "svg",
+        "graph_renderer": "builtin",
+    }
+    with open(tmp_path / "setup.yaml", "w") as f:
+        yaml.safe_dump(setup, f)
+    (tmp_path / "input.txt").write_text("1")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _recording_stages(calls):
+    def stage(name, **kwargs):
+        def run(context):
+            calls.append(name)
+            with open(f"{name}.out", "w") as f:
+                f.write(name)
+
+        return Stage(
+            name=name,
+            run=run,
+            outputs=lambda context: [f"{name}.out"],
+            reads_database=False,
+            **kwargs,
+        )
+
+    return {
+        "a": stage("a", inputs=lambda context: ["input.txt"]),
+        "b": stage("b", depends=("a",)),
+        "c": stage("c", settings=lambda context: context.setup.get("c")),
+        "d": stage("d", depends=("b", "c")),
+    }
+
+
+class TestPipeline:
+    @staticmethod
+    def test_order():
+        stages = _recording_stages([])
+        assert stages_order(stages, ["b"]) == ["a", "b"]
+        order = stages_order(stages)
+        assert order.index("b") < order.index("d")
+        assert order.index("c") < order.index("d")
+        with pytest.raises(ValueError):
+            stages_order(stages, ["z"])
+
+    @staticmethod
+    def test_incremental(workdir):
+        calls = []
+        stages = _recording_stages(calls)
+        run_pipeline(stages=stages)
+        assert sorted(calls) == ["a", "b", "c", "d"]
+
+        calls.clear()
+        reasons = run_pipeline(stages=stages)
+        assert calls == [] and set(reasons.values()) == {None}
+
+        (workdir / "input.txt").write_text("2")
+        run_pipeline(stages=stages)
+        assert calls == ["a", "b", "d"]
+
+        calls.clear()
+        with open("setup.yaml", "a") as f:
+            f.write("c: 1\n")
+        run_pipeline(stages=stages)
+        assert calls == ["c", "d"]
+
+        calls.clear()
+        os.remove("b.out")
+        run_pipeline(["b"], stages=stages, dry_run=True)
+        assert calls == []
+        run_pipeline(["b"], stages=stages)
+        assert calls == ["b"]
+        reasons = run_pipeline(stages=stages, force=["c"])
+        assert reasons == {"a": None, "b": None, "c": "forced", "d": "inputs changed"}
+
+    @staticmethod
+    def test_load_and_analyze(workdir):
+        assert main(["run", "analyze"]) == 0
+        emails = os.listdir("output/validation/emails")
+        assert len(emails) == 2
+        reasons = run_pipeline(["analyze"])
+        assert reasons == {"load": None, "analyze": None}
+        with open("model.yaml", "a") as f:
+            f.write("\n# edited\n")
+        reasons = run_pipeline(["analyze"], dry_run=True)
+        assert reasons == {
+            "load": "inputs changed",
+            "analyze": "dependency out of date",
+        }
+        assert set(PIPELINE_STAGES) == {"load", "analyze", "solve", "postprocess"}
@@ -0,0 +1,108 @@
+import pandas as pd
+import pytest
+from automatic_university_scheduler.database import StaticActivity
+from automatic_university_scheduler.postprocessing import (
+    planification_dataframe,
+    ressources_dataframe,
+    static_planification_dataframe,
+)
+
+
+@pytest.fixture
+def scheduled_project(session, project):
+    """
+    The basic scheduling example with arbitrary starts and allocations.
+    """
+    for i, activity in enumerate(project.activities):
+        if i % 5 != 0:
+            activity.start = 37 * i
+        activity.allocated_teachers = activity.teacher_pool[: activity.teacher_count]
+        activity.allocated_rooms = activity.room_pool[: activity.room_count]
+    session.add(
+        StaticActivity(
+            label="before origin",
+            kind="imported",
+            start=-100,
+            duration=8,
+            project=project,
+            students=project.students_groups[0],
+            allocated_teachers=project.teachers[:2],
+        )
+    )
+    session.commit()
+    return project
+
+
+def _assert_same(bulk, series):
+    reference = pd.concat(series, axis=1).transpose()
+    for column in reference.columns:
+        assert [str(v) for v in bulk[column]] == [
+            str(v) for v in reference[column]
+        ], column
+
+
+class TestPlanificationDataframe:
+    @staticmethod
+    def test_matches_series(scheduled_project):
+        activities = scheduled_project.activities
+        data = planification_dataframe(scheduled_project)
+        assert len(data) == len(activities)
+        scheduled = data["start_slot"].notna().values
+        _assert_same(
+            data[scheduled],
+            [a.planification_to_series for a in activities if a.start is not None],
+        )
+        _assert_same(
+            ressources_dataframe(scheduled_project),
+            [a.ressources_to_series for a in activities],
+        )
+        static_activities = scheduled_project.static_activities
+        data = static_planification_dataframe(scheduled_project)
+        assert len(data) == sum(s.count for s in static_activities)
+        _assert_same(
+            data.drop_duplicates("id"),
+            [s.planification_to_series for s in static_activities],
+        )
+        recurring = next(s for s in static_activities if s.count > 1)
+        starts = data.loc[data["id"] == recurring.id, "start_slot"].tolist()
+        assert starts == recurring.starts
+
+    @staticmethod
+    def test_filters(scheduled_project):
+        activities = scheduled_project.activities
+        course = scheduled_project.courses[0]
+        data = planification_dataframe(scheduled_project, courses=[course.label])
+        assert sorted(data["id"]) == sorted(a.id for a in course.activities)
+
+        teacher = scheduled_project.teachers[0]
+        data = planification_dataframe(scheduled_project, teachers=[teacher.label])
+        assert sorted(data["id"]) == sorted(
+            a.id for a in activities if teacher in a.allocated_teachers
+        )
+
+        room = scheduled_project.rooms[0]
+        data = planification_dataframe(scheduled_project, rooms=[room.label])
+        assert sorted(data["id"]) == sorted(
+            a.id for a in activities if room in a.allocated_rooms
+        )
+
+        group = scheduled_project.students_groups[0]
+        data = planification_dataframe(
+            scheduled_project, students_groups=[group.label], rooms=[room.label]
+        )
+        assert sorted(data["id"]) == sorted(
+            a.id
+            for a in activities
+            if set(a.students.students) & set(group.students)
+            and room in a.allocated_rooms
+        )
+
+        data = static_planification_dataframe(
+            scheduled_project, teachers=[teacher.label]
+        )
+        assert sorted(data["id"]) == sorted(
+            s.id
+            for s in scheduled_project.static_activities
+            if teacher in s.allocated_teachers
+            for _ in s.starts
+        )
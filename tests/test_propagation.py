@@ -0,0 +1,86 @@
+from automatic_university_scheduler.database import StartsAfterConstraint
+from automatic_university_scheduler.propagation import (
+    propagate_start_windows,
+    empty_windows,
+)
+
+
+def _activities(project):
+    return {(a.course.label, a.label): a for a in project.activities}
+
+
+class TestPropagateStartWindows:
+    @staticmethod
+    def test_windows(project):
+        activities = _activities(project)
+        windows, pushed_by = propagate_start_windows(project)
+        assert empty_windows(windows) == []
+        cm1 = activities["MATE001", "CM1"]
+        td1 = activities["MATE001", "TD1-A"]
+        assert windows[cm1.id][0] == cm1.earliest_start_slot
+        # MATH001/CM1 must follow MATE001/CM1 before its own latest start.
+        math_cm1 = activities["MATH001", "CM1"]
+        assert windows[cm1.id][1] == math_cm1.latest_start_slot - cm1.duration
+        # TD1 starts at least 1 day after the end of CM1 and at most 14 days.
+        one_day = project.duration_to_slots("1d")
+        assert windows[td1.id][0] == cm1.earliest_start_slot + cm1.duration + one_day
+        assert windows[td1.id][1] <= cm1.latest_start_slot + cm1.duration + 14 * one_day
+        assert pushed_by[td1.id].to_activity_group.label == "TD1"
+
+    @staticmethod
+    def test_max_offset_pulls_predecessors(project):
+        activities = _activities(project)
+        td3 = activities["MATE001", "TD3-A"]
+        cm3 = activities["MATE001", "CM3"]
+        td3.earliest_start_slot = 4000
+        windows, _ = propagate_start_windows(project)
+        # TD3 starts at most 2 days after the end of CM3.
+        two_days = project.duration_to_slots("2d")
+        assert windows[cm3.id][0] == 4000 - two_days - cm3.duration
+
+    @staticmethod
+    def test_empty_window(project):
+        activities = _activities(project)
+        activities["MATE001", "CM3"].latest_start_slot = 2400
+        windows, _ = propagate_start_windows(project)
+        assert len(empty_windows(windows)) > 0
+
+    @staticmethod
+    def test_all_initial_windows(project):
+        activities = _activities(project)
+        empty = [activities["MATH001", "CM1"], activities["MATE001", "TP1-C2"]]
+        for activity in empty:
+            activity.earliest_start_slot = 2400
+            activity.latest_start_slot = 2300
+        windows, _ = propagate_start_windows(project)
+        assert set(windows) == {a.id for a in project.activities}
+        assert set(empty_windows(windows)) == {a.id for a in empty}
+
+    @staticmethod
+    def test_positive_cycle(session, project):
+        activities = _activities(project)
+        groups = {(g.course.label, g.label): g for g in project.activity_groups}
+        session.add(
+            StartsAfterConstraint(
+                label="starts_after",
+                project=project,
+                min_offset=0,
+                from_activity_group=groups["MATE001", "CM3"],
+                to_activity_group=groups["MATE001", "CM1"],
+            )
+        )
+        session.commit()
+        windows, _ = propagate_start_windows(project)
+        assert activities["MATE001", "CM1"].id in empty_windows(windows)
+
+    @staticmethod
+    def test_slow_positive_cycle(project):
+        # A cycle gaining one slot per sweep is cut by the bound on the passes
+        activities = _activities(project)
+        a, b = activities["MATE001", "CM1"], activities["MATE001", "TP1-A1"]
+        edges = [
+            (None, [a.id], [b.id], 0, None),
+            (None, [b.id], [a.id], 1 - a.duration - b.duration, None),
+        ]
+        windows, _ = propagate_start_windows(project, edges)
+        assert set(empty_windows(windows)) & {a.id, b.id}
@@ -0,0 +1,107 @@
+import datetime
+import numpy as np
+from automatic_university_scheduler.slot_calendar import OpenTime, build_slot_calendar
+
+
+def _calendar(origin, horizon=3 * 672):
+    week_structure = np.zeros((96, 7), dtype=int)
+    week_structure[32:72, :5] = 1
+    origin_monday = datetime.datetime.fromisocalendar(*origin.isocalendar()[:2], 1)
+    origin_monday_slot = -((origin - origin_monday) // datetime.timedelta(minutes=15))
+    return build_slot_calendar(
+        origin,
+        datetime.timedelta(minutes=15),
+        horizon,
+        week_structure,
+        origin_monday_slot,
+    )
+
+
+class TestSlotCalendar:
+    @staticmethod
+    def test_matches_isocalendar():
+        # Crosses the 2020 / 2021 ISO year boundary (2020 has 53 weeks)
+        origin = datetime.datetime(2020, 12, 23, 8)
+        calendar = _calendar(origin)
+        for slot in range(0, calendar.horizon + 1, 37):
+            dt = origin + slot * datetime.timedelta(minutes=15)
+            iso = dt.isocalendar()
+            assert calendar.year[slot] == iso.year
+            assert calendar.week[slot] == iso.week
+            assert calendar.weekday[slot] == iso.weekday
+            assert calendar.daily_slot[slot] == (dt.hour * 60 + dt.minute) // 15
+            assert calendar.available[slot] == (iso.weekday <= 5 and 8 <= dt.hour < 18)
+            assert calendar.clock(slot) == [f"{dt.hour:02d}:{dt.minute:02d}"]
+        assert calendar.week_index[0] == 0
+        assert calendar.week_bounds(0) == (0, 672 + calendar.origin_monday_slot - 1)
+        assert calendar.week_bounds(10) is None
+
+    @staticmethod
+    def test_to_slots():
+        origin = datetime.datetime(2020, 12, 23, 8)
+        calendar = _calendar(origin)
+        slots = np.arange(-700, calendar.horizon + 700, 29)
+        datetimes = [origin + int(s) * datetime.timedelta(minutes=15) for s in slots]
+        year, week, weekday = np.array([dt.isocalendar() for dt in datetimes]).T
+        daily_slot = [(dt.hour * 60 + dt.minute) // 15 for dt in datetimes]
+        assert calendar.to_slots(year, week, weekday, daily_slot).tolist() == (
+            slots.tolist()
+        )
+
+
+class TestOpenTime:
+    @staticmethod
+    def test_coordinates():
+        # Monday at midnight, open 08:00-18:00 on weekdays
+        open_time = OpenTime.from_calendar(_calendar(datetime.datetime(2021, 1, 4)))
+        assert open_time.horizon == 3 * 5 * 40
+        assert open_time.block_starts[:3].tolist() == [0, 40, 80]
+        assert open_time.block_ends[:3].tolist() == [40, 80, 120]
+        assert open_time.to_slots([0, 39, 40]).tolist() == [32, 71, 96 + 32]
+        assert open_time.to_open([0, 32, 72]).tolist() == [0, 0, 40]
+        assert open_time.to_open([0, 72], round="floor").tolist() == [-1, 39]
+        # Friday evening to monday morning
+        assert open_time.to_open(4 * 96 + 72) == open_time.to_open(7 * 96) == 200
+
+    @staticmethod
+    def test_start_intervals():
+        open_time = OpenTime.from_calendar(_calendar(datetime.datetime(2021, 1, 4)))
+        intervals = open_time.start_intervals(8, 10, 100)
+        assert intervals.tolist() == [[10, 32], [40, 72], [80, 100]]
+        assert len(open_time.start_intervals(41)) == 0
+
+    @staticmethod
+    def test_offsets():
+        open_time = OpenTime.from_calendar(_calendar(datetime.datetime(2021, 1, 4)))
+        # Ending at 18:00 (open end 40), one day later is closed: next morning
+        assert open_time.min_offset_starts(96)[40] == 80
+        assert open_time.min_offset_starts(0)[40] == 40
+        assert open_time.min_offset_starts(0).tolist() == list(range(601))
+        # At most one slot after 18:00: the last slot of the day
+        assert open_time.max_offset_starts(1)[40] == 39
+        assert open_time.max_offset_starts(0)[39] == 39
+
+
+class TestProjectCalendar:
+    @staticmethod
+    def test_cached(project):
+        calendar = project.calendar
+        assert project.calendar is calendar
+        assert len(calendar.year) == project.horizon + 1
+        project.horizon = project.horizon + 96
+        assert project.calendar is not calendar
+        assert len(project.calendar.year) == project.horizon + 1
+
+    @staticmethod
+    def test_planification_calendar(project):
+        for start in (0, 1, 700, project.horizon - 1):
+            dt = project.slots_to_datetime(start)
+            end = project.slots_to_datetime(start + 1)
+            iso = dt.isocalendar()
+            assert project.planification_calendar(start, start + 1) == (
+                iso.year,
+                iso.week,
+                iso.weekday,
+                f"{dt.hour:02d}:{dt.minute:02d}",
+                f"{end.hour:02d}:{end.minute:02d}",
+            )
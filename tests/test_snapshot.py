@@ -0,0 +1,71 @@
+import pickle
+import numpy as np
+from automatic_university_scheduler.optimize import build_model
+from automatic_university_scheduler.propagation import precedence_edges
+from automatic_university_scheduler.snapshot import (
+    CSR,
+    ProjectSnapshot,
+    UNSET,
+    project_snapshot,
+)
+
+
+class TestCSR:
+    @staticmethod
+    def test_from_lists():
+        csr = CSR.from_lists([[1, 2], [], [3]])
+        assert len(csr) == 3
+        assert csr[0].tolist() == [1, 2]
+        assert csr[1].tolist() == []
+        assert csr.row_lengths().tolist() == [2, 0, 1]
+        assert csr.tolists() == [[1, 2], [], [3]]
+
+
+class TestProjectSnapshot:
+    @staticmethod
+    def test_from_project(project):
+        snapshot = ProjectSnapshot.from_project(project)
+        assert project_snapshot(snapshot) is snapshot
+        activities = project.activities
+        assert snapshot.activity_ids.tolist() == [a.id for a in activities]
+        assert snapshot.activity_durations.tolist() == [a.duration for a in activities]
+        for i, activity in enumerate(activities):
+            students = snapshot.atomic_student_ids[snapshot.activity_students[i]]
+            assert sorted(students) == sorted(s.id for s in activity.students.students)
+            earliest = snapshot.activity_earliest_starts[i]
+            if activity.earliest_start_slot is None:
+                assert earliest == UNSET
+            else:
+                assert earliest == activity.earliest_start_slot
+        assert snapshot.origin_monday_slot == project.datetime_to_slot(
+            project.setup["ORIGIN_MONDAY"]
+        )
+
+    @staticmethod
+    def test_precedence_edges(project):
+        snapshot = ProjectSnapshot.from_project(project)
+        edges = [
+            (c.id, from_ids, to_ids, min_offset, max_offset)
+            for c, from_ids, to_ids, min_offset, max_offset in precedence_edges(project)
+        ]
+        assert snapshot.precedence_edges() == edges
+
+    @staticmethod
+    def test_static_intervals(project):
+        snapshot = ProjectSnapshot.from_project(project)
+        intervals = snapshot.static_intervals("teachers")
+        for teacher in project.teachers:
+            expected = sorted(
+                (start, start + s.duration)
+                for s in teacher.static_activities_allocations
+                for start in s.starts
+            )
+            assert sorted(intervals.get(teacher.id, [])) == expected
+
+    @staticmethod
+    def test_pickle_and_build(project):
+        snapshot = pickle.loads(pickle.dumps(ProjectSnapshot.from_project(project)))
+        assert np.array_equal(snapshot.week_structure, project.week_structure)
+        model1, _ = build_model(project)
+        model2, _ = build_model(snapshot)
+        assert str(model1.Proto()) == str(model2.Proto())
@@ -0,0 +1,61 @@
+import pytest
+from ortools.sat.python import cp_model
+from automatic_university_scheduler.telemetry import (
+    Telemetry,
+    parse_progress_line,
+    read_telemetry,
+)
+
+
+class TestParseProgressLine:
+    @staticmethod
+    def test_solution():
+        line = "#3       1.25s best:624   next:[300,623]  default_lp"
+        progress = parse_progress_line(line)
+        assert progress == {
+            "kind": "3",
+            "walltime": 1.25,
+            "objective": 624.0,
+            "bound": 300.0,
+        }
+
+    @staticmethod
+    def test_bound():
+        line = "#Bound   0.00s best:inf   next:[105,105]  initial_domain"
+        progress = parse_progress_line(line)
+        assert progress["kind"] == "Bound"
+        assert progress["objective"] is None
+        assert progress["bound"] == 105.0
+
+    @staticmethod
+    def test_other_line():
+        assert parse_progress_line("#Done    0.01s default_lp") is None
+
+
+class TestTelemetry:
+    @staticmethod
+    @pytest.mark.parametrize("filename", ["telemetry.jsonl", "telemetry.db"])
+    def test_run(tmp_path, filename):
+        path = str(tmp_path / filename)
+        telemetry = Telemetry(path, label="test", version=1)
+        model = cp_model.CpModel()
+        with telemetry.phase("build", model):
+            x = model.NewIntVar(0, 10, "x")
+            model.Add(x >= 3)
+        model.Minimize(x)
+        solver = cp_model.CpSolver()
+        telemetry.attach(solver)
+        status = solver.Solve(model)
+        telemetry.status(solver, status)
+        telemetry.close()
+
+        events = read_telemetry(path)
+        assert events.run_id.nunique() == 1
+        run = events[events.event == "run"].iloc[0]
+        assert run.label == "test" and run.version == 1
+        phase = events[events.event == "phase"].iloc[0]
+        assert phase["name"] == "build"
+        assert phase.variables == 1 and phase.constraints == 1
+        assert "log" in set(events.event)
+        status = events[events.event == "status"].iloc[0]
+        assert status.status == "OPTIMAL" and status.objective == 3
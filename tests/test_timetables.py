@@ -0,0 +1,111 @@
+import os
+import zipfile
+import pytest
+from automatic_university_scheduler.database import Room
+from automatic_university_scheduler.timetables import (
+    _ics_line,
+    export_timetables,
+    timetable_memberships,
+)
+
+
+@pytest.fixture
+def scheduled_project(session, project):
+    for i, activity in enumerate(project.activities):
+        activity.start = 700 + 37 * i
+        activity.allocated_teachers = activity.teacher_pool[: activity.teacher_count]
+        activity.allocated_rooms = activity.room_pool[: activity.room_count]
+    session.commit()
+    return project
+
+
+def _events(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        content = f.read()
+    return content, content.count("BEGIN:VEVENT")
+
+
+class TestTimetables:
+    @staticmethod
+    def test_memberships(scheduled_project):
+        memberships = timetable_memberships(scheduled_project)
+        teacher = scheduled_project.teachers[0]
+        rows = memberships[
+            (memberships["ressource_kind"] == "teachers")
+            & (memberships["ressource"] == teacher.label)
+        ]
+        assert sorted(rows[rows["owner"] == "activity"]["id"]) == sorted(
+            a.id for a in teacher.activities_allocations
+        )
+        student = scheduled_project.atomic_students[0]
+        rows = memberships[
+            (memberships["ressource_kind"] == "atomic_students")
+            & (memberships["ressource"] == student.label)
+        ]
+        assert sorted(rows[rows["owner"] == "activity"]["id"]) == sorted(
+            a.id for a in scheduled_project.activities if student in a.students.students
+        )
+
+    @staticmethod
+    def test_export(scheduled_project, tmp_path):
+        paths = export_timetables(scheduled_project, str(tmp_path), max_workers=1)
+        project = scheduled_project
+        n_ressources = (
+            len(project.teachers)
+            + len(project.rooms)
+            + len(project.atomic_students)
+            + len(project.students_groups)
+        )
+        assert len(paths) == 2 * n_ressources
+        assert all(os.path.exists(path) for path in paths)
+        teacher = project.teachers[0]
+        content, n_events = _events(tmp_path / "teachers" / f"{teacher.label}.ics")
+        assert n_events == len(teacher.activities_allocations) + len(
+            [start for s in teacher.static_activities_allocations for start in s.starts]
+        )
+        assert all(len(line.encode()) <= 75 for line in content.split("\r\n"))
+        with zipfile.ZipFile(tmp_path / "teachers" / f"{teacher.label}.xlsx") as f:
+            assert "xl/worksheets/sheet1.xml" in f.namelist()
+
+    @staticmethod
+    def test_process_pool(scheduled_project, tmp_path):
+        serial = export_timetables(
+            scheduled_project, str(tmp_path / "serial"), kinds=["rooms"], max_workers=1
+        )
+        pooled = export_timetables(
+            scheduled_project, str(tmp_path / "pool"), kinds=["rooms"], max_workers=2
+        )
+        assert [os.path.relpath(p, tmp_path / "serial") for p in serial] == [
+            os.path.relpath(p, tmp_path / "pool") for p in pooled
+        ]
+        for path in pooled:
+            if path.endswith(".ics"):
+                reference = path.replace(
+                    str(tmp_path / "pool"), str(tmp_path / "serial")
+                )
+                assert _events(path)[1] == _events(reference)[1]
+
+    @staticmethod
+    def test_colliding_file_names(session, scheduled_project, tmp_path):
+        rooms = [
+            Room(label=label, project=scheduled_project) for label in ("A B", "A/B")
+        ]
+        session.add_all(rooms)
+        session.commit()
+        paths = export_timetables(
+            scheduled_project, str(tmp_path), kinds=["rooms"], max_workers=1
+        )
+        assert len(set(paths)) == len(paths) == 2 * len(scheduled_project.rooms)
+        names = {os.path.basename(path) for path in paths}
+        assert {f"A_B_{room.id}.ics" for room in rooms} <= names
+        # Labels without collision keep their plain file name
+        room = scheduled_project.rooms[0]
+        assert f"{room.label}.ics" in names
+
+    @staticmethod
+    def test_ics_line_folding():
+        line = "DESCRIPTION:" + "é" * 100
+        folded = _ics_line(line)
+        parts = folded[:-2].split("\r\n")
+        assert all(len(part.encode()) <= 75 for part in parts)
+        assert parts[0] + "".join(part[1:] for part in parts[1:]) == line
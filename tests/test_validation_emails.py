@@ -0,0 +1,73 @@
+import email
+import pytest
+from automatic_university_scheduler.graph_rendering import render_graphs
+from automatic_university_scheduler.postprocessing import ressources_dataframe
+from automatic_university_scheduler.validation_emails import (
+    LocalSMTPServer,
+    send_validation_emails,
+    validation_email_tasks,
+    write_validation_emails,
+)
+
+
+@pytest.fixture
+def tasks(project, tmp_path):
+    graphs = {
+        f"course_{course.label}": (course.activity_graph, course.label)
+        for course in project.courses
+    }
+    graphs_paths = render_graphs(
+        graphs,
+        str(tmp_path / "graphs"),
+        formats=("svg",),
+        renderer="builtin",
+        verbose=False,
+    )
+    return validation_email_tasks(
+        project,
+        ressources_dataframe(project),
+        graphs_paths,
+        str(tmp_path / "emails"),
+        "15/11/2024",
+        graph_image_format="svg",
+    )
+
+
+def _parts(message):
+    return [part.get_content_type() for part in message.walk()]
+
+
+class TestValidationEmails:
+    @staticmethod
+    def test_write(project, tasks):
+        assert len(tasks) == len(project.courses)
+        for max_workers in (1, 2):
+            paths = write_validation_emails(tasks, max_workers=max_workers)
+            for course, path in zip(project.courses, paths):
+                with open(path, "rb") as f:
+                    message = email.message_from_bytes(f.read())
+                assert _parts(message) == [
+                    "multipart/related",
+                    "multipart/alternative",
+                    "text/html",
+                    "image/svg+xml",
+                    "application/ics",
+                ]
+                html = message.get_payload(0).get_payload(0)
+                html = html.get_payload(decode=True).decode()
+                assert course.manager.full_name in html
+                assert all(a.label in html for a in course.activities)
+                ics = message.get_payload(2).get_payload(decode=True).decode()
+                assert "DTSTART:20241115T090000Z\r\n" in ics
+
+    @staticmethod
+    def test_local_smtp_server(tasks):
+        with LocalSMTPServer() as server:
+            sent = send_validation_emails(
+                tasks, server.host, server.port, verbose=False
+            )
+        assert sent == len(server.messages) == len(tasks)
+        for task, (mail_from, rcpt_tos, message) in zip(tasks, server.messages):
+            assert task["from"] in mail_from
+            assert [task["to"] in rcpt for rcpt in rcpt_tos] == [True]
+            assert len(_parts(message)) == 5